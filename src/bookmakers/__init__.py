@@ -0,0 +1,29 @@
+import importlib
+
+
+# bookmaker name: "module:class", imported on first use
+BOOKMAKERS = {
+    "Winamax": "bookmakers.winamax:Winamax",
+    "Zebet": "bookmakers.zebet:Zebet",
+    "Netbet": "bookmakers.netbet:Netbet",
+}
+
+
+def get_bookmaker(name: str):
+    """
+    Returns the EventScraper class of a bookmaker, importing its module.
+
+    :param name: The bookmaker name, a key of BOOKMAKERS.
+    :raises ValueError: If the bookmaker is not registered.
+    """
+    if name not in BOOKMAKERS:
+        raise ValueError(f"[ERROR] Unknown bookmaker '{name}', registered: {', '.join(BOOKMAKERS)}")
+    module_name, class_name = BOOKMAKERS[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_bookmakers(names: list = None) -> dict:
+    """
+    Returns {bookmaker name: EventScraper class} of the given bookmakers, all of them if None.
+    """
+    return {name: get_bookmaker(name) for name in (names or BOOKMAKERS)}
@@ -25,30 +25,33 @@ class Netbet(EventScraper):
         }
     }
 
-    def _get_events(self, soup):
+    def _get_events(self, soup, url):
         # from the main page with all the events, we collect the link the all the specific pages
         # specific url game = main url + href url
 
         # for every url game we fetch url to collect the html (like a normal event)
-        # events is a list of html of each event
+        # events is a generator of the html of each event: only one event page is held in memory
 
         events = soup.find_all(self.CSS['tag']['event'], class_=self.CSS['class']['event'])
         if not events:
             self.logger.debug_log("No events found.")
             raise ValueError("No events were found on the page.")
-        self.logger.info_log(f"Found {len(events)} events.")
+        self.logger.info_log(f"Found {len(events)} event links.")
 
-        pages = []
-        for event in events:
-            url_event = "https://www.netbet.fr" + event["href"]
-            html = self.webdriver.fetch_html(url_event, actions=[{"screen_shot": "screen_shot/netbet_"}])
-            pages.append(html)
+        urls = ["https://www.netbet.fr" + event["href"] for event in events]
+        return (self.webdriver.fetch_html(url_event, actions=[{"screen_shot": "screen_shot/netbet_"}])
+                for url_event in urls)
 
-        return pages
+    def _get_event_block(self, event) -> str:
+        # events are whole event pages: only keep the teams, the date and the 1N2 odds
+        blocks = event.find_all(self.CSS['tag']['team'], class_=self.CSS['class']['team'])
+        blocks += event.find_all(self.CSS['tag']['date'], class_=self.CSS['class']['date'])
+        blocks += event.find_all("div", class_="parent-container-event open")[:1]
+        return "".join(block.get_text(" ", strip=True) for block in blocks)
 
     def _get_teams(self, event) -> dict:
         teams_element = event.find_all(self.CSS['tag']['team'], class_=self.CSS['class']['team'])
-        self.logger.debug_log(f"CSS Bloc teams found: {teams_element}")
+        self.logger.debug_log("CSS Bloc teams found: %s", teams_element)
 
         if len(teams_element) != 2:
             raise
@@ -60,13 +63,13 @@ class Netbet(EventScraper):
             "away": teams_element[1].text,
         }
 
-        self.logger.debug_log(f"Teams found: {teams['home short']} {teams['home']} vs {teams['away short']} {teams['away']}")
+        self.logger.debug_log("Teams found: %s %s vs %s %s", teams['home short'], teams['home'], teams['away short'], teams['away'])
         return teams
 
     def _get_match_time(self, event) -> dict:
 
         date_time_element = event.find(self.CSS['tag']['date'], class_=self.CSS['class']['date'])
-        self.logger.debug_log(f"CSS Bloc time found: {date_time_element}")
+        self.logger.debug_log("CSS Bloc time found: %s", date_time_element)
 
         # date_time_element: 'LIVE dans 25 min' 'mar. 24 déc. 02:00'
         return date_time_element.text
@@ -89,13 +92,13 @@ class Netbet(EventScraper):
         elif classic_bet.find("div", class_="over-2"):
             odds = {
                 "home": float(odds_spans[0].get_text(strip=True)),
-                "draw": "",
+                "draw": None,
                 "away": float(odds_spans[2].get_text(strip=True)),
             }
         else:
             raise ValueError(f"Not exactly 3 odds")
 
-        self.logger.debug_log(f"Odds found: {odds}")
+        self.logger.debug_log("Odds found: %s", odds)
         return odds
 
 
@@ -124,7 +127,7 @@ def main():
                 print("\nExtracted Data:")
                 for event in extracted_data:
                     print(event)
-                    db.add_instance(event)
+                db.add_batch(extracted_data)
                 db.save_database()
 
 
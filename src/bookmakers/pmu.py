@@ -31,7 +31,7 @@ class Pmu(EventScraper):
 
     def _get_teams(self, event) -> dict:
         teams_element = event.find_all(self.CSS['tag']['team'], class_=self.CSS['class']['team'])
-        self.logger.debug_log(f"CSS Bloc teams found: {teams_element}")
+        self.logger.debug_log("CSS Bloc teams found: %s", teams_element)
 
         if len(teams_element) != 2:
             raise
@@ -43,7 +43,7 @@ class Pmu(EventScraper):
             "away": teams_element[1].text,
         }
 
-        self.logger.debug_log(f"Teams found: {teams['home short']} {teams['home']} vs {teams['away short']} {teams['away']}")
+        self.logger.debug_log("Teams found: %s %s vs %s %s", teams['home short'], teams['home'], teams['away short'], teams['away'])
         return teams
 
     def _parse_date(self, date_time_element: str) -> datetime:
@@ -86,7 +86,7 @@ class Pmu(EventScraper):
 
     def _get_match_time(self, event) -> dict:
         date_time_element = event.find(self.CSS['tag']['date'], class_=self.CSS['class']['date'])
-        self.logger.debug_log(f"CSS Bloc time found: {date_time_element}")
+        self.logger.debug_log("CSS Bloc time found: %s", date_time_element)
 
         # date_time_element: 'Aujourd’hui à 19:35', 'Demain à 01:00', 'mardi à 01:45' or '29 déc. 2024 à 19:00'
         date_time = self._parse_date(date_time_element.text)
@@ -96,15 +96,15 @@ class Pmu(EventScraper):
             "time": date_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
             "element": date_time_element.text,
         }
-        self.logger.debug_log(f"Date found: {date['time']}")
+        self.logger.debug_log("Date found: %s", date['time'])
         return date
 
     def _get_odds(self, event) -> dict:
         odds_elements = event.find_all(self.CSS['tag']['odd'], class_=self.CSS['class']['odd'])
-        self.logger.debug_log(f"CSS Bloc odds found: {odds_elements}")
+        self.logger.debug_log("CSS Bloc odds found: %s", odds_elements)
 
         if len(odds_elements) != 3:
-            self.logger.debug_log(f"Not exactly 3 odds: {odds_elements}")
+            self.logger.debug_log("Not exactly 3 odds: %s", odds_elements)
 
         odds = {
             "home": float(odds_elements[0].text.replace(',', '.')),
@@ -112,7 +112,7 @@ class Pmu(EventScraper):
             "away": float(odds_elements[2].text.replace(',', '.')),
         }
 
-        self.logger.debug_log(f"Odds found: {odds}")
+        self.logger.debug_log("Odds found: %s", odds)
         return odds
 
 
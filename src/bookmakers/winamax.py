@@ -1,4 +1,7 @@
 import re
+import json
+import datetime
+from zoneinfo import ZoneInfo
 
 from utils.loaders import *
 from utils.class_scraper import EventScraper
@@ -25,12 +28,60 @@ class Winamax(EventScraper):
         }
     }
 
-    def _get_events(self, soup) -> list:
+    # in 'http' mode the events come from the PRELOADED_STATE json of the server page
+    STATE_PATTERN = re.compile(r"PRELOADED_STATE\s*=\s*")
+    URL_IDS_PATTERN = re.compile(r"/sports/(\d+)(?:/(\d+))?(?:/(\d+))?")
+    MONTHS = ("janv.", "févr.", "mars", "avr.", "mai", "juin", "juill.", "août", "sept.", "oct.", "nov.", "déc.")
+    TIMEZONE = ZoneInfo("Europe/Paris")
+
+    def _get_events(self, soup, url) -> list:
+        if self.webdriver.mode == "http":
+            # the url gives the tournament of the events of the PRELOADED_STATE
+            return self._get_state_events(soup, url)
         return soup.find_all(self.CSS['tag']['event'], {"data-testid": re.compile(r"match-card")})
 
+    def _get_state_events(self, soup, url: str) -> list:
+        """
+        Returns the prematch events of the page tournament found in the PRELOADED_STATE script, as dicts
+        {"home", "away", "start", "odds": {outcome code: odd}}.
+
+        :param url: The url of the page, whose sport, category and tournament ids select the matches.
+        """
+        script = soup.find("script", string=self.STATE_PATTERN)
+        if script is None:
+            raise ValueError("No PRELOADED_STATE in the page.")
+        text = script.string
+        state, _ = json.JSONDecoder().raw_decode(text, self.STATE_PATTERN.search(text).end())
+
+        # keep the matches of the most precise id of the url: tournament, category or sport
+        ids = self.URL_IDS_PATTERN.search(url)
+        if ids is None:
+            raise ValueError(f"No sport id in the url {url}.")
+        filters = [(key, int(value)) for key, value in zip(("sportId", "categoryId", "tournamentId"), ids.groups())
+                   if value]
+
+        events = []
+        for match in state.get("matches", {}).values():
+            if match.get("status") != "PREMATCH" or any(match.get(key) != value for key, value in filters[-1:]):
+                continue
+            bet = state.get("bets", {}).get(str(match.get("mainBetId")))
+            if not bet:
+                continue
+            events.append({
+                "home": match["competitor1Name"],
+                "away": match["competitor2Name"],
+                "start": match["matchStart"],
+                "odds": {state["outcomes"][str(outcome)]["code"]: state["odds"].get(str(outcome))
+                         for outcome in bet["outcomes"] if str(outcome) in state.get("outcomes", {})},
+            })
+        return events
+
     def _get_teams(self, event) -> dict:
+        if isinstance(event, dict):
+            return {"home short": "", "home": event["home"], "away short": "", "away": event["away"]}
+
         teams_element = event.find_all(self.CSS['tag']['team'], class_=self.CSS['class']['team'])
-        self.logger.debug_log(f"CSS Bloc teams found: {teams_element}")
+        self.logger.debug_log("CSS Bloc teams found: %s", teams_element)
 
         if len(teams_element) != 2:
             raise
@@ -42,19 +93,31 @@ class Winamax(EventScraper):
             "away": teams_element[1].text,
         }
 
-        self.logger.debug_log(f"Teams found: {teams['home short']} {teams['home']} vs {teams['away short']} {teams['away']}")
+        self.logger.debug_log("Teams found: %s %s vs %s %s", teams['home short'], teams['home'], teams['away short'], teams['away'])
         return teams
 
     def _get_match_time(self, event) -> dict:
+        if isinstance(event, dict):
+            # same text as the match cards: '29 déc. 2024 à 19:00'
+            start = datetime.datetime.fromtimestamp(event["start"], self.TIMEZONE)
+            return f"{start.day} {self.MONTHS[start.month - 1]} {start.year} à {start:%H:%M}"
+
         date_time_element = event.find(self.CSS['tag']['date'], class_=self.CSS['class']['date'])
-        self.logger.debug_log(f"CSS Bloc time found: {date_time_element}")
+        self.logger.debug_log("CSS Bloc time found: %s", date_time_element)
 
         # date_time_element: 'Aujourd’hui à 19:35', 'Demain à 01:00', 'mardi à 01:45' or '29 déc. 2024 à 19:00'
         return date_time_element.text
 
     def _get_odds(self, event) -> dict:
+        if isinstance(event, dict):
+            # outcome codes: '1', 'x' (draw, only in 3 way bets) and '2'
+            odds = event["odds"]
+            if odds.get("1") is None or odds.get("2") is None:
+                raise ValueError(f"Missing odds: {odds}")
+            return {"home": float(odds["1"]), "draw": odds.get("x"), "away": float(odds["2"])}
+
         odds_elements = event.find_all(self.CSS['tag']['odd'], class_=self.CSS['class']['odd'])
-        self.logger.debug_log(f"CSS Bloc odds found: {odds_elements}")
+        self.logger.debug_log("CSS Bloc odds found: %s", odds_elements)
 
         if len(odds_elements) == 3:
             odds = {
@@ -65,14 +128,14 @@ class Winamax(EventScraper):
         elif len(odds_elements) == 2:
             odds = {
                 "home": float(odds_elements[0].text.replace(',', '.')),
-                "draw": "",
+                "draw": None,
                 "away": float(odds_elements[1].text.replace(',', '.')),
             }
         else:
-            self.logger.debug_log(f"Not exactly 3 odds: {odds_elements}")
+            self.logger.debug_log("Not exactly 3 odds: %s", odds_elements)
             raise ValueError(f"Not exactly 3 odds:\n {odds_elements}")
 
-        self.logger.debug_log(f"Odds found: {odds}")
+        self.logger.debug_log("Odds found: %s", odds)
         return odds
 
 
@@ -101,7 +164,7 @@ def main():
                 print("\nExtracted Data:")
                 for event in extracted_data:
                     print(event)
-                    db.add_instance(event)
+                db.add_batch(extracted_data)
                 db.save_database()
 
 
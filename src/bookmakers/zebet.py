@@ -27,7 +27,7 @@ class Zebet(EventScraper):
         }
     }
 
-    def _get_events(self, soup):
+    def _get_events(self, soup, url):
         """
         Extracts all events from the page.
         """
@@ -40,7 +40,7 @@ class Zebet(EventScraper):
     def _get_teams(self, event) -> dict:
 
         teams_element = event.find_all(self.CSS['tag']['team'], class_=self.CSS['class']['team'])
-        self.logger.debug_log(f"CSS Bloc teams found: {teams_element}")
+        self.logger.debug_log("CSS Bloc teams found: %s", teams_element)
 
         if len(teams_element) != 2:
             raise ValueError(f"More than 2 teams detected {teams_element}")
@@ -52,19 +52,19 @@ class Zebet(EventScraper):
             "away": teams_element[1].text,
         }
 
-        self.logger.debug_log(f"Teams found: {teams['home']} vs {teams['away']}")
+        self.logger.debug_log("Teams found: %s vs %s", teams['home'], teams['away'])
         return teams
 
     def _get_match_time(self, event) -> str:
         date_time_element = event.find(self.CSS['tag']['date'], class_=self.CSS['class']['date'])
-        self.logger.debug_log(f"CSS Bloc time found: {date_time_element}")
+        self.logger.debug_log("CSS Bloc time found: %s", date_time_element)
 
         # date_time_element: 'À 02h00', 'Demain à 01H30' or 'Le 18/12 à 01h30'
         return date_time_element.text
 
     def _get_odds(self, event) -> dict:
         odds_elements = event.find_all(self.CSS['tag']['odd'], class_=self.CSS['class']['odd'])
-        self.logger.debug_log(f"CSS Bloc odds found: {odds_elements}")
+        self.logger.debug_log("CSS Bloc odds found: %s", odds_elements)
 
         if len(odds_elements) == 3:
             odds = {
@@ -75,14 +75,14 @@ class Zebet(EventScraper):
         elif len(odds_elements) == 2:
             odds = {
                 "home": float(odds_elements[0].text.replace(',', '.')),
-                "draw": "",
+                "draw": None,
                 "away": float(odds_elements[1].text.replace(',', '.')),
             }
         else:
-            self.logger.debug_log(f"Not exactly 3 odds: {odds_elements}")
+            self.logger.debug_log("Not exactly 3 odds: %s", odds_elements)
             raise ValueError(f"Not exactly 3 odds:\n {odds_elements}")
 
-        self.logger.debug_log(f"Odds found: {odds}")
+        self.logger.debug_log("Odds found: %s", odds)
         return odds
 
 
@@ -111,7 +111,7 @@ def main():
                 print("\nExtracted Data:")
                 for event in extracted_data:
                     print(event)
-                    db.add_instance(event)
+                db.add_batch(extracted_data)
                 db.save_database()
 
 
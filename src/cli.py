@@ -0,0 +1,153 @@
+"""
+Command line entry point.
+
+Every subcommand imports only the modules it needs, so that the short runs (cron jobs, detect,
+match) do not pay for the browser and machine learning libraries.
+
+Usage (from the repository root):
+    python src/cli.py scrape once --sport hockey-sur-glace
+    python src/cli.py scrape serve
+    python src/cli.py discover --bookmakers Zebet
+    python src/cli.py standardise --sport NHL
+    python src/cli.py match --sports hockey
+    python src/cli.py detect --max-skew 20
+"""
+import sys
+import argparse
+
+
+DEFAULT_CONFIG = "config/bookmaker_config.yml"
+
+
+def scrape(args, config: dict):
+    from main import App
+
+    if args.import_only:
+        return
+    app = App(args.config)
+    if args.action == "once":
+        app.collect_games(args.sport, args.bookmakers, args.debug)
+    elif args.action == "serve":
+        app.serve(args.bookmakers, args.debug)
+    elif args.action == "stream":
+        print(app.stream(args.sport, args.bookmakers, args.debug))
+    elif args.action == "sweep":
+        app.sweep([args.sport] if args.sport else None, args.bookmakers, args.debug)
+    elif args.action == "enqueue":
+        print(f"{app.enqueue_jobs(args.sport, args.bookmakers)} jobs queued.")
+    elif args.action == "work":
+        app.work(args.bookmakers, stop_when_empty=args.until_empty, debug=args.debug)
+    elif args.action == "results":
+        print(f"{app.collect_results()} results stored.")
+
+
+def discover(args, config: dict):
+    from spider.spd_discovery import discover as discover_links
+
+    if args.import_only:
+        return
+    discover_links(config, args.bookmakers, save=not args.dry_run)
+
+
+def standardise(args, config: dict):
+    from utils.class_databasemanager import DatabaseManager
+    from utils.class_mapper import Mapper
+    from utils.class_scheduleindex import ScheduleIndex
+
+    if args.import_only:
+        return
+    db = DatabaseManager(config["path"]["database"])
+    mapper = Mapper(config["path"]["mapping"])
+    if "dates" in args.steps:
+        db.standardise_dates(mapper)
+    if "sports" in args.steps:
+        db.standardise_sports(mapper)
+    if "categories" in args.steps:
+        db.standardise_category(mapper)
+    if "teams" in args.steps:
+        db.standardise_team_names(args.sport, mapper)
+    if "event-ids" in args.steps:
+        db.standardise_event_ids(ScheduleIndex(config.get("schedules", {}), mapper))
+
+
+def match(args, config: dict):
+    from utils.class_databasemanager import DatabaseManager
+    from standardisation import group_events
+
+    if args.import_only:
+        return
+    db = DatabaseManager(config["path"]["database"])
+    linked_events = group_events(db.data, args.nb_bookmakers, args.threshold, args.sports, args.jobs)
+
+    sizes = {}
+    for linked_event in linked_events.values():
+        for indices in linked_event:
+            sizes[len(indices)] = sizes.get(len(indices), 0) + 1
+    for size, count in sorted(sizes.items(), reverse=True):
+        print(f"{count:>6} events on {size} bookmaker(s)")
+
+
+def detect(args, config: dict):
+    from utils.class_databasemanager import DatabaseManager
+    from utils.function_esperance import find_arbitrage
+
+    if args.import_only:
+        return
+    max_skew = args.max_skew if args.max_skew is not None else config.get("sweep", {}).get("max_skew")
+    find_arbitrage(DatabaseManager(config["path"]["database"]).data, max_skew)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli", description="Odds scraping and arbitrage detection.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Path of the bookmaker configuration.")
+    parser.add_argument("--debug", action="store_true", help="Enable the debug logs.")
+    # import the modules of the command and exit, for the start time measurements
+    parser.add_argument("--import-only", action="store_true", help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("scrape", help="Scrape the bookmakers.")
+    command.add_argument("action", nargs="?", default="once",
+                         choices=["once", "stream", "serve", "sweep", "enqueue", "work", "results"],
+                         help="once: every tournament once, stream: every tournament once with live arbitrage "
+                              "detection, serve: continuously, sweep: snapshots of the matched events, "
+                              "enqueue/work/results: through the shared job queue.")
+    command.add_argument("--sport", help="Only this sport of the url catalogues.")
+    command.add_argument("--bookmakers", nargs="+", help="Only these bookmakers.")
+    command.add_argument("--until-empty", action="store_true", help="work: stop when the job queue is empty.")
+    command.set_defaults(function=scrape)
+
+    command = commands.add_parser("discover", help="Update the url catalogues of the bookmakers.")
+    command.add_argument("--bookmakers", nargs="+", help="Only these bookmakers.")
+    command.add_argument("--dry-run", action="store_true", help="Report the changes without saving them.")
+    command.set_defaults(function=discover)
+
+    command = commands.add_parser("standardise", help="Standardise the rows of the database.")
+    command.add_argument("--sport", default="NHL", help="Section of the team mapping.")
+    # 'teams' maps every row with the --sport section of the mapping: not a default of a mixed database
+    command.add_argument("--steps", nargs="+", default=["dates", "sports", "categories", "event-ids"],
+                         choices=["dates", "sports", "categories", "teams", "event-ids"])
+    command.set_defaults(function=standardise)
+
+    command = commands.add_parser("match", help="Link the events that are the same game on different bookmakers.")
+    command.add_argument("--sports", nargs="+", help="Only these sports.")
+    command.add_argument("--nb-bookmakers", type=int, default=3)
+    command.add_argument("--threshold", type=float, default=0.6, help="Minimum similarity of the team names.")
+    command.add_argument("--jobs", type=int, default=-1, help="Worker processes, -1 for every core.")
+    command.set_defaults(function=match)
+
+    command = commands.add_parser("detect", help="Search the arbitrages in the database.")
+    command.add_argument("--max-skew", type=float, help="Maximum snapshot skew in seconds (config 'sweep.max_skew').")
+    command.set_defaults(function=detect)
+    return parser
+
+
+def main(argv: list = None):
+    args = get_parser().parse_args(argv)
+    from utils.loaders import load_yaml
+
+    config = load_yaml(args.config)
+    args.function(args, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
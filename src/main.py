@@ -1,9 +1,19 @@
-from bookmakers.netbet import Netbet
-from bookmakers.winamax import Winamax
-from bookmakers.zebet import Zebet
+import time
+from bookmakers import BOOKMAKERS, get_bookmakers
 from utils.class_databasemanager import DatabaseManager
+from utils.class_oddshistory import OddsHistory
 from utils.loaders import load_yaml
 from utils.class_mapper import Mapper
+from utils.class_scrapescheduler import ScrapeScheduler
+from utils.class_workerpool import WorkerPool, get_catalogue
+from utils.class_jobqueue import JobQueue, run_job_worker
+from utils.class_snapshotsweep import SnapshotSweep
+from utils.class_scheduleindex import ScheduleIndex
+from utils.class_arbitragedetector import ArbitrageDetector
+from utils.class_pipeline import StreamingPipeline
+from utils.class_eventbatch import EventBatch
+from utils.class_logger import Logger, JsonLinesSink
+from utils.class_metrics import REGISTRY, MetricsServer
 from utils.function_esperance import find_arbitrage
 
 
@@ -11,33 +21,167 @@ class App:
     def __init__(self, config_path: str):
         self.config_path = config_path
         self.config = load_yaml(self.config_path)
+        Logger.set_sink(JsonLinesSink(self.config["path"]["trace"]))
         self.db = DatabaseManager(self.config["path"]["database"])
         self.mapper = Mapper(self.config["path"]["mapping"])
+        self.history = OddsHistory(self.config["path"]["history"], self.mapper)
+        self.schedule_index = ScheduleIndex(self.config.get("schedules", {}), self.mapper)
+        pipeline_config = self.config.get("pipeline", {})
+        self.detector = ArbitrageDetector(pipeline_config.get("max_quote_age", 300), pipeline_config.get("min_margin", 0),
+                                          max_skew=self.config.get("sweep", {}).get("max_skew"))
+        self.save_interval = pipeline_config.get("save_interval", 60)
+        self.last_save = time.time()
 
-    def collect_games(self, sport: str):
-        scrappers = [
-            Winamax(self.config, sport, debug=False),
-            Zebet(self.config, sport, debug=False),
-            Netbet(self.config, sport, debug=False),
-        ]
+    def create_scrapers(self, bookmakers: list = None, debug: bool = False) -> dict:
+        """
+        Returns {bookmaker name: EventScraper} of the given bookmakers, all the registered ones if None.
+        """
+        return {name: scraper_class(self.config, debug=debug)
+                for name, scraper_class in get_bookmakers(bookmakers).items()}
 
-        extracted_data = []
-        for scrapper in scrappers:
-            extracted_data += scrapper.extract_event_data()
+    @staticmethod
+    def close_scrapers(scrapers: dict):
+        for scraper in scrapers.values():
+            scraper.close()
 
-        for event in extracted_data:
-            print(event)
-            self.db.add_instance(event)
-        self.db.save_database()
+    def collect_games(self, sport: str = None, bookmakers: list = None, debug: bool = False):
+        """
+        Scrapes all the tournaments of the url catalogues once, with one process per shard of
+        each bookmaker. The events are stored by this process only.
+
+        :param sport: Optional sport name to scrape only its tournaments.
+        :param bookmakers: The bookmakers to scrape, all the registered ones if None.
+        """
+        workers_config = self.config.get("workers", {})
+        pool = WorkerPool(
+            self.config,
+            get_bookmakers(bookmakers),
+            on_events=self.store_events,
+            shards=workers_config.get("shards", 1),
+            max_restarts=workers_config.get("max_restarts", 3),
+            debug=debug,
+        )
+        pool.run(sport)
+        self.save()
 
         # self.db.standardise_team_names(sport, self.mapper)
         # self.db.standardise_dates(self.mapper)
 
         # find_arbitrage(self.db.data)
 
+    def store_events(self, bookmaker: str, url: str, events: EventBatch) -> int:
+        """
+        Stores the events of one tournament scrape and checks them for arbitrages. The database and the
+        history are saved every 'pipeline.save_interval' seconds.
+        :return: The number of arbitrages found.
+        """
+        events.event_ids = [self.schedule_index.resolve_event(event) for event in events]
+        self.db.add_batch(events)
+        self.history.add_batch(events)
+        if time.time() - self.last_save >= self.save_interval:
+            self.save()
+        return len(self.detector.update(events))
+
+    def save(self):
+        self.db.save_database()
+        self.history.save_history()
+        self.last_save = time.time()
+
+    def stream(self, sport: str = None, bookmakers: list = None, debug: bool = False) -> dict:
+        """
+        Scrapes all the tournaments of the url catalogues once, through the streaming pipeline: every
+        page is standardised, stored and checked for arbitrages as soon as it is parsed.
+
+        :param sport: Optional sport name to scrape only its tournaments.
+        :param bookmakers: The bookmakers to scrape, all the registered ones if None.
+        :return: The summary of the run, see StreamingPipeline.run.
+        """
+        scrapers = self.create_scrapers(bookmakers, debug)
+        pipeline = StreamingPipeline(scrapers, self.schedule_index, self.db, self.history, self.detector,
+                                     queue_size=self.config.get("pipeline", {}).get("queue_size", 8),
+                                     save_interval=self.save_interval, debug=debug)
+        try:
+            return pipeline.run({name: get_catalogue(self.config, name, sport) for name in scrapers})
+        finally:
+            self.close_scrapers(scrapers)
+
+    def get_job_queue(self) -> JobQueue:
+        queue_config = self.config["job_queue"]
+        return JobQueue(queue_config["path"], queue_config.get("lease_time", 300), queue_config.get("max_attempts", 3))
+
+    def enqueue_jobs(self, sport: str = None, bookmakers: list = None) -> int:
+        """
+        Turns the tournaments of the url catalogues into jobs of the shared job queue.
+        """
+        return self.get_job_queue().enqueue_catalogues(self.config, bookmakers or list(BOOKMAKERS), sport)
+
+    def work(self, bookmakers: list = None, stop_when_empty: bool = False, debug: bool = False) -> int:
+        """
+        Runs a job worker on this host: leases the jobs of the shared queue and reports their events.
+        """
+        scrapers = self.create_scrapers(bookmakers, debug)
+        try:
+            return run_job_worker(self.get_job_queue(), scrapers, stop_when_empty=stop_when_empty, debug=debug)
+        finally:
+            self.close_scrapers(scrapers)
+
+    def collect_results(self) -> int:
+        """
+        Stores the events reported by the job workers.
+
+        :return: The number of results stored.
+        """
+        job_queue = self.get_job_queue()
+        nb_results = 0
+        while True:
+            results = job_queue.collect_results()
+            if not results:
+                return nb_results
+            for bookmaker, url, events in results:
+                self.store_events(bookmaker, url, events)
+            nb_results += len(results)
+            self.save()
+
+    def sweep(self, sports: list = None, bookmakers: list = None, debug: bool = False) -> list:
+        """
+        Refreshes the matched events of the database with snapshots: the pages of a matched event
+        are fetched on all the bookmakers at the same time, then the arbitrages are searched in the
+        snapshots whose skew is below 'sweep.max_skew' (see ArbitrageDetector).
+
+        :param sports: Only refresh the matched events of these sports. All sports if None.
+        :return: The spans of the snapshots, see SnapshotSweep.get_span.
+        """
+        from standardisation import group_events
+
+        scrappers = self.create_scrapers(bookmakers, debug)
+        sweep = SnapshotSweep(scrappers, debug=debug)
+        linked_events = group_events(self.db.data, len(scrappers), sports=sports, n_jobs=-1)
+        try:
+            spans = sweep.run(sweep.plan(self.db.data, linked_events),
+                              on_events=lambda snapshot_id, batches: [
+                                  self.store_events(batch.bookmaker, batch.url, batch) for batch in batches])
+        finally:
+            self.close_scrapers(scrappers)
+        self.save()
+        return spans
+
+    def serve(self, bookmakers: list = None, debug: bool = False):
+        """
+        Scrapes the tournaments of all the url catalogues continuously, hot tournaments first.
+        """
+        scrappers = self.create_scrapers(bookmakers, debug)
+        MetricsServer(REGISTRY, port=self.config["metrics"]["port"]).start()
+        scheduler = ScrapeScheduler(self.config, scrappers, on_events=self.store_events,
+                                    on_unchanged=self.detector.touch, debug=debug)
+        try:
+            scheduler.run_forever()
+        finally:
+            self.close_scrapers(scrappers)
+            self.save()
+
 
 if __name__ == "__main__":
 
     app = App("config/bookmaker_config.yml")
-    app.collect_games(sport="NHL")
+    app.serve()
     # XY!5hw14rkqwX*jj&eV#
\ No newline at end of file
@@ -2,15 +2,14 @@ import pandas
 
 from utils.loaders import *
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.cluster import DBSCAN
-from sklearn.manifold import TSNE
 from utils.class_databasemanager import DatabaseManager
+from utils.class_embeddingcache import EmbeddingCache, AnnIndex
 
 
 def plot_embeddings_2d(embeddings, labels, texts):
+    import matplotlib.pyplot as plt
+    from sklearn.manifold import TSNE
 
     tsne = TSNE(n_components=2, random_state=42, perplexity=5)
     embeddings_2d = tsne.fit_transform(embeddings)
@@ -37,42 +36,78 @@ def ravel(d):
     return d_ravel
 
 
-urls = [
-    load_json("winamax_urls.json"),
-    load_json("zebet_urls.json"),
-    load_json("netbet_urls.json"),
-]
-
-sports = []
-for url in urls:
-    sports += url.keys()
-n = len(sports)
-
-print(sports)
-np.random.seed(42)
-np.random.shuffle(sports)
-sports = list(set(sports))
-"""
-db = DatabaseManager("../../data/database.csv")
-print(db.data.keys())
-sports = db.data["Home Team Unparse"] + pandas.DataFrame([" vs "] * len(db.data.index), columns=["vs"])["vs"] +  db.data["Away Team Unparse"]
-sports = np.unique(list(sports))[:-1]
-print(sports)
-"""
-# model name: 'all-MiniLM-L6-v2', 'paraphrase-albert-small-v2'
-model = SentenceTransformer("../models/all-MiniLM-L6-v2")
-# model.save("../models/all-MiniLM-L6-v2")
-
-embeddings = model.encode(sports)
-clustering = DBSCAN(eps=0.1, min_samples=1, metric='cosine').fit(embeddings)
-
-match = {}
-for sport, label in zip(sports, clustering.labels_):
-    if label not in match.keys():
-        match[label] = []
-    match[label].append(sport)
-
-for id, sport in match.items():
-    print(id, sport)
-
-plot_embeddings_2d(embeddings, clustering.labels_, sports)
+def cluster_embeddings(embeddings: np.ndarray, eps: float = 0.1, k: int = 20) -> np.ndarray:
+    """
+    Clusters the embeddings: two texts are in the same cluster if they are linked by a chain of
+    neighbours closer than 'eps' (cosine distance).
+    This is DBSCAN with min_samples=1, with the neighbours taken from the ANN index instead of
+    the full distance matrix.
+
+    :param embeddings: Normalized embeddings, shape (n, dim).
+    :param eps: Maximum cosine distance between two neighbours.
+    :param k: Maximum number of neighbours looked up per text.
+    :return: The cluster label of each text.
+    """
+    index = AnnIndex(embeddings)
+
+    # union-find over the neighbour graph
+    parents = np.arange(len(embeddings))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i, neighbours in enumerate(index.query(embeddings, k=k, max_distance=eps)):
+        for j, _ in neighbours:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    roots = [find(i) for i in range(len(embeddings))]
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels
+
+
+def main():
+
+    urls = [
+        load_json("urls_winamax.json"),
+        load_json("urls_zebet.json"),
+        load_json("urls_netbet.json"),
+    ]
+
+    tournaments = []
+    for url in urls:
+        tournaments += ravel(url).keys()
+    tournaments = sorted(set(tournaments))
+    print(f"{len(tournaments)} tournaments")
+    """
+    db = DatabaseManager("../../data/database.csv")
+    print(db.data.keys())
+    sports = db.data["Home Team Unparse"] + pandas.DataFrame([" vs "] * len(db.data.index), columns=["vs"])["vs"] +  db.data["Away Team Unparse"]
+    sports = np.unique(list(sports))[:-1]
+    print(sports)
+    """
+    # model name: 'all-MiniLM-L6-v2', 'paraphrase-albert-small-v2'
+    cache = EmbeddingCache("../../data/embeddings", "../models/all-MiniLM-L6-v2")
+    # model.save("../models/all-MiniLM-L6-v2")
+
+    embeddings = cache.encode(tournaments)
+    labels = cluster_embeddings(embeddings, eps=0.1)
+
+    match = {}
+    for tournament, label in zip(tournaments, labels):
+        if label not in match.keys():
+            match[label] = []
+        match[label].append(tournament)
+
+    for id, tournament in match.items():
+        print(id, tournament)
+
+    # plot_embeddings_2d(embeddings, labels, tournaments)
+
+
+if __name__ == "__main__":
+    main()
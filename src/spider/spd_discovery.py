@@ -0,0 +1,173 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.class_webdriver import WebDriver
+from utils.class_logger import Logger
+from utils.loaders import *
+from spider import spd_netbet, spd_winamax, spd_zebet
+
+
+SPIDER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sport pages to crawl and link filters of each bookmaker
+SPIDERS = {
+    "Zebet": {
+        "url": "https://www.zebet.fr",
+        "pages": ["https://www.zebet.fr"],
+        "actions": [
+            {"wait_for_selector": "#popin_tc_privacy_button_2"},
+            {"click_on": "#popin_tc_privacy_button_2"},
+        ],
+        "excluded_sport": ['biathlon', 'formule-1', 'golf', 'moto', 'nascar', 'ski-alpin', 'ski-de-fond'],
+        "path": os.path.join(SPIDER_DIR, "urls_zebet.json"),
+    },
+    "Winamax": {
+        "url": "https://www.winamax.fr/paris-sportifs",
+        "pages": ["https://www.winamax.fr/paris-sportifs"],
+        "actions": None,    # taken from the bookmaker config
+        "excluded_sport": ['Automobile', 'Biathlon', 'Cyclisme', 'Formule 1', 'Golf', 'Moto', 'Ski alpin', 'Ski de fond'],
+        "path": os.path.join(SPIDER_DIR, "urls_winamax.json"),
+    },
+    "Netbet": {
+        "url": "https://www.netbet.fr",
+        "pages": [
+            "https://www.netbet.fr/" + sport for sport in
+            ['football', 'tennis', 'basketball', 'foot-us', 'badminton', 'baseball', 'boxe', 'handball',
+             'hockey-glace', 'mma', 'rugby-a-xiii', 'rugby', 'volleyball']
+        ],
+        "actions": [
+            {"wait_for_selector": "button[data-tid='banner-accept']"},
+            {"click_on": "button[data-tid='banner-accept']"},
+        ],
+        "excluded_sport": [],
+        "path": os.path.join(SPIDER_DIR, "urls_netbet.json"),
+    },
+}
+
+
+def ravel_links(organised_links: dict) -> dict:
+    """
+    Flattens a url catalogue {sport: {category: {tournament: link}}} into {(sport, category, tournament): link}.
+    """
+    return {
+        (sport_name, category_name, tournament_name): link
+        for sport_name, categories in organised_links.items()
+        for category_name, tournaments in categories.items()
+        for tournament_name, link in tournaments.items()
+    }
+
+
+def organise_links(bookmaker: str, soups: list) -> dict:
+    """
+    Extracts the tournament links of all the fetched pages of a bookmaker, deduplicated in a set.
+    """
+    spider = SPIDERS[bookmaker]
+
+    links = set()
+    for soup in soups:
+        if bookmaker == "Zebet":
+            links.update(spd_zebet.get_all_links(soup, spider["url"]))
+        elif bookmaker == "Winamax":
+            links.update(spd_winamax.get_all_links(soup, spider["url"]))
+        elif bookmaker == "Netbet":
+            links.update(spd_netbet.get_all_links(soup, spider["url"]))
+        else:
+            raise ValueError(f"[ERROR] Unknown bookmaker name: {bookmaker}")
+
+    if bookmaker == "Zebet":
+        return spd_zebet.get_organise_links(sorted(links), excluded_sport=spider["excluded_sport"])
+    elif bookmaker == "Winamax":
+        preloaded_state = {"sports": {}, "categories": {}, "tournaments": {}}
+        for soup in soups:
+            state = spd_winamax.get_preloaded_state(soup)
+            for key in preloaded_state:
+                preloaded_state[key].update(state.get(key, {}))
+        return spd_winamax.get_organise_links(sorted(links), preloaded_state, excluded_sport=spider["excluded_sport"])
+    else:
+        return spd_netbet.get_organise_links(sorted(links), excluded_sport=spider["excluded_sport"])
+
+
+def diff_links(old_links: dict, new_links: dict) -> (dict, dict):
+    """
+    Compares two url catalogues.
+
+    :return: (added, removed), two dicts {(sport, category, tournament): link}.
+    """
+    old_links = ravel_links(old_links)
+    new_links = ravel_links(new_links)
+    added = {key: link for key, link in new_links.items() if old_links.get(key) != link}
+    removed = {key: link for key, link in old_links.items() if new_links.get(key) != link}
+    return added, removed
+
+
+def discover(config: dict, bookmakers: list = None, max_workers: int = 8, timeout: int = 90000, save: bool = True) -> dict:
+    """
+    Fetches the sport pages of all the bookmakers in parallel and updates their url catalogues.
+
+    :param config: The bookmaker configuration.
+    :param bookmakers: The bookmakers to crawl. All the bookmakers of SPIDERS if None.
+    :param max_workers: Number of pages fetched at the same time.
+    :param timeout: Timeout of a page fetch (ms).
+    :param save: Save the updated catalogues to the 'urls_*.json' files.
+    :return: {bookmaker: (added, removed)}.
+    """
+    bookmakers = bookmakers or list(SPIDERS.keys())
+
+    webdrivers = {}
+    jobs = []
+    for bookmaker in bookmakers:
+        spider = SPIDERS[bookmaker]
+        logger = Logger(bookmaker)
+        webdrivers[bookmaker] = WebDriver(config, logger, "playwright", False, timeout)
+        actions = spider["actions"] if spider["actions"] is not None else config["bookmakers"][bookmaker]["actions"]
+        jobs += [(bookmaker, page, actions) for page in spider["pages"]]
+
+    soups = {bookmaker: [] for bookmaker in bookmakers}
+    failed = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(webdrivers[bookmaker].fetch_html, page, actions=actions): (bookmaker, page)
+                for bookmaker, page, actions in jobs
+            }
+            for future in as_completed(futures):
+                bookmaker, page = futures[future]
+                try:
+                    soups[bookmaker].append(future.result())
+                except Exception as e:
+                    webdrivers[bookmaker].logger.error_log(f"Discovery failed on {page}: {e}")
+                    failed.add(bookmaker)
+    finally:
+        for webdriver in webdrivers.values():
+            webdriver.close()
+
+    report = {}
+    for bookmaker in bookmakers:
+        spider = SPIDERS[bookmaker]
+        logger = webdrivers[bookmaker].logger
+
+        # a partial crawl would report every tournament of the missing pages as removed
+        if bookmaker in failed:
+            logger.error_log("Catalogue not updated: some sport pages could not be fetched.")
+            continue
+
+        old_links = load_json(spider["path"]) if os.path.exists(spider["path"]) else {}
+        new_links = organise_links(bookmaker, soups[bookmaker])
+        added, removed = diff_links(old_links, new_links)
+        report[bookmaker] = (added, removed)
+
+        logger.info_log(f"{len(added)} tournaments added, {len(removed)} tournaments removed.")
+        for key, link in added.items():
+            logger.info_log(f"+ {' / '.join(key)}: {link}")
+        for key, link in removed.items():
+            logger.info_log(f"- {' / '.join(key)}: {link}")
+
+        if save and (added or removed):
+            save_json(spider["path"], new_links)
+
+    return report
+
+
+if __name__ == "__main__":
+
+    config = load_yaml("../../config/bookmaker_config.yml")
+    discover(config)
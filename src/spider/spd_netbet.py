@@ -2,21 +2,19 @@ from utils.class_webdriver import WebDriver
 from utils.class_logger import Logger
 from utils.function_matchs import clean_keys_in_dict
 from utils.loaders import *
+from bs4 import BeautifulSoup
 
 
-def fetch_multi_soup(webdriver: WebDriver, url: str, actions: list, url_exentions: list,):
+def fetch_multi_soup(webdriver: WebDriver, url: str, actions: list, url_exentions: list,) -> list:
 
-    multi_soup = ""
+    soups = []
     for extention in url_exentions:
+        soups.append(webdriver.fetch_html(url + '/' + extention, actions=actions))
 
-        soup = webdriver.fetch_html(url + '/' + extention, actions=actions)
-        multi_soup += str(soup.contents[1])
-    multi_soup = BeautifulSoup(multi_soup, "html.parser")
+    return soups
 
-    return multi_soup
 
-
-def get_all_links(soup: BeautifulSoup):
+def get_all_links(soup: BeautifulSoup, url: str):
     a_div = soup.find_all("a")
 
     links = []
@@ -76,8 +74,10 @@ if __name__ == "__main__":
 
     logger = Logger("Netbet", debug)
     webdriver = WebDriver(config, logger, mode, debug, timeout)
-    soup = fetch_multi_soup(webdriver, url, actions, sport_list)
+    soups = fetch_multi_soup(webdriver, url, actions, sport_list)
 
-    links = get_all_links(soup)
+    links = set()
+    for soup in soups:
+        links.update(get_all_links(soup, url))
     organise_links = get_organise_links(links)
     save_json("urls_netbet.json", organise_links)
@@ -1,6 +1,7 @@
 from utils.class_webdriver import WebDriver
 from utils.class_logger import Logger
 from utils.loaders import *
+from bs4 import BeautifulSoup
 from utils.function_matchs import clean_keys_in_dict
 import re
 
@@ -17,7 +18,7 @@ def get_preloaded_state(soup: BeautifulSoup) -> dict:
     return preloaded_state
 
 
-def get_all_links(soup: BeautifulSoup) -> list:
+def get_all_links(soup: BeautifulSoup, url: str) -> list:
     a_div = soup.find_all("a")
 
     links = []
@@ -85,7 +86,7 @@ if __name__ == "__main__":
     webdriver = WebDriver(config, logger, mode, debug, timeout)
     soup = webdriver.fetch_html(url, actions=actions)
 
-    links = get_all_links(soup)
+    links = get_all_links(soup, url)
     preloaded_state = get_preloaded_state(soup)
     organise_links = get_organise_links(links, preloaded_state, excluded_sport=excluded_sport)
     save_json("urls_winamax.json", organise_links)
@@ -1,9 +1,10 @@
 from utils.class_webdriver import WebDriver
 from utils.class_logger import Logger
 from utils.loaders import *
+from bs4 import BeautifulSoup
 
 
-def get_all_links(soup: BeautifulSoup) -> list:
+def get_all_links(soup: BeautifulSoup, url: str) -> list:
     a_div = soup.find_all("a")
 
     links = []
@@ -61,6 +62,6 @@ if __name__ == "__main__":
     webdriver = WebDriver(config, logger, mode, debug, timeout)
     soup = webdriver.fetch_html(url, actions=actions)
 
-    links = get_all_links(soup)
+    links = get_all_links(soup, url)
     organise_links = get_organise_links(links, excluded_sport=excluded_sport)
     save_json("urls_zebet.json", organise_links)
\ No newline at end of file
@@ -5,7 +5,10 @@ from difflib import get_close_matches, SequenceMatcher
 from itertools import product, combinations, permutations
 from utils.class_databasemanager import DatabaseManager
 from utils.function_matchs import clean_key
+from utils.class_logger import traced
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
+import os
 
 
 def calc_esperance(odds: list) -> float:
@@ -47,79 +50,188 @@ def analyse_linked_events(linked_events):
         # ---------------------------------------------------------------------------
 
 
-def group_events(data: pandas.DataFrame, nb_bookmakers: int, similarity_threshold: float = 0.6) -> dict:
+def link_bucket(event_group: pandas.DataFrame, nb_bookmakers: int, similarity_threshold: float = 0.6) -> list:
+    """
+    Links the events of one (Date, Sport, Category) bucket that are the same game on different bookmakers.
+
+    :param event_group: The rows of the bucket.
+    :param nb_bookmakers: The maximum number of bookmakers in a linked event.
+    :param similarity_threshold: Minimum similarity of the team names to link events.
+    :return: linked_event, a list of lists of row index.
+    """
+
+    # ---------------------------------------------------------------------------
+    teams_group = []
+    # Populate teams_group for the current group with db index and team names
+    for index, row in event_group.iterrows():
+        team_names = clean_key(row["Home Team Unparse"]) + " - " + clean_key(row["Away Team Unparse"])
+        teams_group.append((index, team_names))
+    # ---------------------------------------------------------------------------
 
     # linked_events is a list of indices, represents the game events that are the same on different bookmaker
     # indices is a tuple of row index of length 'combo_size'
+    linked_event = []
+    # combo_size is a variable between nb_bookmaker and 0, that set the number of bookmakers inside 'team_combo'
+    for combo_size in range(nb_bookmakers, 0, -1):
+
+        # loop through all the combination of team_group until there is no valid combo in the pool
+        combo_found = True
+        while combo_found:
+
+            combo_pool = []
+            for team_combo in combinations(teams_group, combo_size):
+
+                # a valid combo can't use index row that are already use
+                indices, teams = zip(*team_combo)
+                if any(idx in sum(linked_event, []) for idx in indices):
+                    continue
+
+                # a valid combo don't have twice the same bookmaker
+                bookmakers = event_group["Bookmaker"][list(indices)]
+                if len(set(bookmakers)) != len(bookmakers):
+                    continue
+
+                # calculate the similarity score of the combination
+                similarity = get_similarity(teams)
+                combo_pool.append((similarity, team_combo))
+
+            if not combo_pool:
+                break
+
+            # Sort by similarity in descending order
+            combo_pool.sort(key=lambda x: x[0], reverse=True)
+            best_similarity, best_team_combo = combo_pool[0]
+
+            # if the best combination is similar enough, loop again with the same 'combo_size'
+            if best_similarity > similarity_threshold:
+                indices, teams = zip(*best_team_combo)
+                linked_event.append(list(indices))
+            else:
+                combo_found = False
+    return linked_event
+
+
+def link_buckets(buckets: list, nb_bookmakers: int, similarity_threshold: float = 0.6) -> list:
+    """
+    Links a chunk of buckets. This is the task run by each worker process.
+
+    :param buckets: List of (group_id, event_group).
+    :return: List of (group_id, linked_event).
+    """
+    return [(group_id, link_bucket(event_group, nb_bookmakers, similarity_threshold)) for group_id, event_group in buckets]
+
+
+def chunk_buckets(buckets: list, nb_chunks: int) -> list:
+    """
+    Splits the buckets into chunks of about the same estimated cost.
+
+    The cost of a bucket is estimated by its size squared (pairwise matching). The buckets are
+    assigned from the most to the least expensive, each one to the cheapest chunk so far.
+
+    :param buckets: List of (group_id, event_group).
+    :param nb_chunks: The number of chunks.
+    :return: List of chunks, each one a list of (group_id, event_group).
+    """
+    chunks = [[] for _ in range(nb_chunks)]
+    costs = [0] * nb_chunks
+    for group_id, event_group in sorted(buckets, key=lambda bucket: len(bucket[1]) ** 2, reverse=True):
+        i = costs.index(min(costs))
+        chunks[i].append((group_id, event_group))
+        costs[i] += len(event_group) ** 2
+    return [chunk for chunk in chunks if chunk]
+
+
+def join_event_ids(data: pandas.DataFrame) -> dict:
+    """
+    Links the events that have the same canonical event id (see ScheduleIndex): a hash join,
+    without any similarity matching.
+
+    The repeated scrapes of a bookmaker are ranked from the latest: the latest row of each bookmaker
+    are linked together, then the second latest, and so on, so that a linked event never has twice
+    the same bookmaker.
+
+    :param data: The rows with an event id and a Date, Sport and Category.
+    :return: linked_events, a dict {group_id: linked_event}.
+    """
+    rank = (data.sort_values("scrapping_time", ascending=False)
+            .groupby(["Event ID", "Bookmaker"], observed=True).cumcount())
     linked_events = {}
+    for _, rows in data.groupby([data["Event ID"], rank.reindex(data.index)], observed=True):
+        group_id = (rows["Date"].iloc[0], rows["Sport"].iloc[0], rows["Category"].iloc[0])
+        linked_events.setdefault(group_id, []).append(list(rows.index))
+    return linked_events
 
-    # Iterate through each group of event group by parse argument
-    for group_id, event_group in data.groupby(["Date", "Sport", "Category"]):
-        # group_id : ("2025-01-25", "basketball", "allemagne"), ('2025-01-25', 'basketball', 'etats unis')
 
-        if "football" not in group_id:
-            continue
+@traced("match")
+def group_events(data: pandas.DataFrame, nb_bookmakers: int, similarity_threshold: float = 0.6,
+                 sports: list = None, n_jobs: int = 1) -> dict:
+    """
+    Links the events that are the same game on different bookmakers, bucket by bucket.
+
+    :param data: The database.
+    :param nb_bookmakers: The maximum number of bookmakers in a linked event.
+    :param similarity_threshold: Minimum similarity of the team names to link events.
+    :param sports: Only match these sports. All sports if None.
+    :param n_jobs: Number of worker processes. 1 runs serially, None or -1 uses every core.
+    :return: linked_events, a dict {group_id: linked_event} ordered by group_id.
+    """
 
-        # ---------------------------------------------------------------------------
-        teams_group = []
-        # Populate teams_group for the current group with db index and team names
-        for index, row in event_group.iterrows():
-            team_names = clean_key(row["Home Team Unparse"]) + " - " + clean_key(row["Away Team Unparse"])
-            teams_group.append((index, team_names))
-        # ---------------------------------------------------------------------------
+    # the events of the official schedules are linked by their event id, the others by similarity
+    joined = {}
+    if "Event ID" in data.columns:
+        anchored = data["Event ID"].notna() & data[["Date", "Sport", "Category"]].notna().all(axis=1)
+        if sports:
+            anchored &= data["Sport"].isin(sports)
+        joined = join_event_ids(data[anchored])
+        data = data[~anchored]
 
-        # linked_events is a list of indices, represents the game events that are the same on different bookmaker
-        # indices is a tuple of row index of length 'combo_size'
-        linked_event = []
-        # combo_size is a variable between nb_bookmaker and 0, that set the number of bookmakers inside 'team_combo'
-        for combo_size in range(nb_bookmakers, 0, -1):
-
-            # loop through all the combination of team_group until there is no valid combo in the pool
-            combo_found = True
-            while combo_found:
-
-                combo_pool = []
-                for team_combo in combinations(teams_group, combo_size):
-
-                    # a valid combo can't use index row that are already use
-                    indices, teams = zip(*team_combo)
-                    if any(idx in sum(linked_event, []) for idx in indices):
-                        continue
-
-                    # a valid combo don't have twice the same bookmaker
-                    bookmakers = db.data["Bookmaker"][list(indices)]
-                    if len(set(bookmakers)) != len(bookmakers):
-                        continue
-
-                    # calculate the similarity score of the combination
-                    similarity = get_similarity(teams)
-                    combo_pool.append((similarity, team_combo))
-
-                if not combo_pool:
-                    break
-
-                # Sort by similarity in descending order
-                combo_pool.sort(key=lambda x: x[0], reverse=True)
-                best_similarity, best_team_combo = combo_pool[0]
-
-                # if the best combination is similar enough, loop again with the same 'combo_size'
-                if best_similarity > similarity_threshold:
-                    indices, teams = zip(*best_team_combo)
-                    linked_event.append(list(indices))
-                else:
-                    combo_found = False
-        linked_events[group_id] = linked_event
-        # ---------------------------------------------------------------------------
+    # Iterate through each group of event group by parse argument
+    # group_id : ("2025-01-25", "basketball", "allemagne"), ('2025-01-25', 'basketball', 'etats unis')
+    buckets = [
+        (group_id, event_group)
+        for group_id, event_group in data.groupby(["Date", "Sport", "Category"], observed=True)
+        if not sports or group_id[1] in sports
+    ]
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count()
+
+    if n_jobs == 1 or len(buckets) <= 1:
+        results = link_buckets(buckets, nb_bookmakers, similarity_threshold)
+    else:
+        # a few chunks per worker, so that a badly estimated chunk doesn't keep the others waiting
+        chunks = chunk_buckets(buckets, 4 * n_jobs)
+        results = []
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(link_buckets, chunk, nb_bookmakers, similarity_threshold) for chunk in chunks]
+            for future in as_completed(futures):
+                results += future.result()
+
+    for group_id, linked_event in joined.items():
+        results.append((group_id, linked_event))
+
+    # merge in the groupby order, whatever the order the workers finished
+    linked_events = {}
+    for group_id, linked_event in sorted(results, key=lambda result: result[0]):
+        linked_events.setdefault(group_id, []).extend(linked_event)
     return linked_events
 
 
-def find_arbitrage(linked_events):
+@traced("detect")
+def find_arbitrage(linked_events, max_skew: float = None):
     for linked_event in linked_events:
         """
         if linked_event != [621, 1229, 2072]:
             continue
         """
 
+        # phantom arbitrages: odds not scraped in the same snapshot, or too far apart
+        if max_skew is not None and "snapshot_id" in db.data.columns:
+            snapshot = db.data.loc[linked_event, ["snapshot_id", "snapshot_offset"]]
+            skew = snapshot["snapshot_offset"].max() - snapshot["snapshot_offset"].min()
+            if snapshot["snapshot_id"].nunique(dropna=False) != 1 or not skew <= max_skew:
+                continue
+
         if db.data.loc[linked_event, ["Home Odd", "Draw Odd", "Away Odd"]].isna().any(axis=None):
             continue
 
@@ -150,7 +262,7 @@ if __name__ == '__main__':
     nb_bookmakers = 3
     similarity_threshold = 0.6
 
-    linked_events = group_events(db.data, nb_bookmakers, similarity_threshold)
+    linked_events = group_events(db.data, nb_bookmakers, similarity_threshold, n_jobs=-1)
     # analyse_linked_events(linked_events)
     # find_arbitrage(linked_events)
 
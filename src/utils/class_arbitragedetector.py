@@ -0,0 +1,142 @@
+import math
+import datetime
+from utils.class_logger import Logger
+from utils.class_eventbatch import EventBatch
+from utils import class_metrics as metrics
+
+
+class ArbitrageDetector:
+    """
+    Incremental arbitrage detection on the scraped batches.
+
+    The last odds of every bookmaker are kept per canonical event id (see ScheduleIndex). When a
+    batch arrives, only its events are checked: the best odds of each outcome across the
+    bookmakers whose quote is recent enough. The 1N2 (with draw) and 12 (without draw) markets
+    are compared separately. An arbitrage is reported once, until its legs change. A page fetched
+    again without change only refreshes the time of its quotes (touch).
+
+    The events of a snapshot (see SnapshotSweep) are only compared with the quotes of the same
+    snapshot, and only if their pages were fetched within 'max_skew' seconds.
+    """
+
+    OUTCOMES = ("home", "draw", "away")
+
+    def __init__(self, max_age: float = 300, min_margin: float = 0.0, max_skew: float = None, on_alert=None,
+                 debug: bool = False):
+        """
+        :param max_age: Seconds after which a quote is too old to be compared with a new one.
+        :param max_skew: Maximum spread (s) of the fetch times of the quotes of a snapshot. No limit if None.
+        :param min_margin: Minimum profit (1 - sum of the inverse odds) to report an arbitrage.
+        :param on_alert: Optional callback on_alert(alert) for each arbitrage found.
+        """
+        self.max_age = max_age
+        self.min_margin = min_margin
+        self.max_skew = max_skew
+        self.on_alert = on_alert
+        self.logger = Logger("Arbitrage", debug)
+        self.quotes = {}            # {event id: {bookmaker: (timestamp, (home, draw, away), snapshot id)}}
+        self.reported = {}          # {event id: legs of the last arbitrage reported}
+        self.pages = {}             # {(bookmaker, url): event ids of the last batch of the page}
+        self.nb_alerts = 0
+
+    def update(self, batch: EventBatch) -> list:
+        """
+        Records the odds of a batch and checks its events.
+
+        :param batch: A batch whose event ids are set. The events without id are ignored.
+        :return: The new arbitrages: [{"event_id", "market", "margin", "legs": [(outcome, bookmaker, odd)], "time"}].
+        """
+        if not batch.event_ids:
+            return []
+
+        timestamp = self._get_timestamp(batch)
+        # the quotes of a snapshot are timed by the fetch of their own page
+        fetch_times = batch.fetch_times if batch.snapshot_id is not None else [timestamp] * len(batch)
+        alerts = []
+        event_ids = []
+        for event_id, odds, fetch_time in zip(batch.event_ids, zip(batch.home_odds, batch.draw_odds, batch.away_odds),
+                                              fetch_times):
+            if event_id is None:
+                continue
+            event_ids.append(event_id)
+            quotes = self.quotes.setdefault(event_id, {})
+            quotes[batch.bookmaker] = (timestamp if math.isnan(fetch_time) else fetch_time, odds, batch.snapshot_id)
+            alert = self._check(event_id, quotes, timestamp, batch.snapshot_id)
+            if alert is not None:
+                alerts.append(alert)
+        self.pages[(batch.bookmaker, batch.url)] = event_ids
+
+        for alert in alerts:
+            self._report(alert)
+        return alerts
+
+    def touch(self, batch: EventBatch) -> list:
+        """
+        Refreshes the time of the quotes of a page fetched again without change (the batch is empty),
+        and checks its events: its odds were just confirmed.
+
+        :param batch: The empty batch of the unchanged page, its scrapping time being the time of the fetch.
+        :return: The new arbitrages, see update.
+        """
+        timestamp = self._get_timestamp(batch)
+        alerts = []
+        for event_id in self.pages.get((batch.bookmaker, batch.url), []):
+            quotes = self.quotes.get(event_id, {})
+            if batch.bookmaker not in quotes:
+                continue
+            # a refreshed quote is no longer part of its snapshot
+            quotes[batch.bookmaker] = (timestamp, quotes[batch.bookmaker][1], None)
+            alert = self._check(event_id, quotes, timestamp)
+            if alert is not None:
+                alerts.append(alert)
+
+        for alert in alerts:
+            self._report(alert)
+        return alerts
+
+    def _get_timestamp(self, batch: EventBatch) -> float:
+        return datetime.datetime.strptime(batch.scrapping_time, batch.DATETIME_FORMAT).timestamp()
+
+    def _check(self, event_id: str, quotes: dict, now: float, snapshot_id: str = None) -> dict:
+        if snapshot_id is not None:
+            quotes = {bookmaker: quote for bookmaker, quote in quotes.items() if quote[2] == snapshot_id}
+            fetch_times = [timestamp for timestamp, _, _ in quotes.values()]
+            if self.max_skew is not None and fetch_times and max(fetch_times) - min(fetch_times) > self.max_skew:
+                return None
+        if len(quotes) < 2:
+            return None
+
+        # only the recent quotes, split by market
+        markets = {"1N2": [], "12": []}
+        for bookmaker, (timestamp, odds, _) in quotes.items():
+            if self.max_age is None or now - timestamp <= self.max_age:
+                markets["12" if math.isnan(odds[1]) else "1N2"].append((bookmaker, odds))
+
+        for market, market_quotes in markets.items():
+            if len(market_quotes) < 2:
+                continue
+            outcomes = (0, 1, 2) if market == "1N2" else (0, 2)
+            legs = []
+            for outcome in outcomes:
+                bookmaker, odds = max(market_quotes, key=lambda quote: quote[1][outcome])
+                legs.append((self.OUTCOMES[outcome], bookmaker, odds[outcome]))
+            if any(not odd > 1 for _, _, odd in legs):
+                continue
+
+            margin = 1 - sum(1 / odd for _, _, odd in legs)
+            if margin > self.min_margin and self.reported.get(event_id) != legs:
+                self.reported[event_id] = legs
+                return {"event_id": event_id, "market": market, "margin": margin, "legs": legs, "time": now}
+        return None
+
+    def _report(self, alert: dict):
+        self.nb_alerts += 1
+        metrics.ARBITRAGES.inc(market=alert["market"])
+        self.logger.info_log("Arbitrage on %s (%s): %.2f %% with %s", alert["event_id"], alert["market"],
+                             100 * alert["margin"],
+                             ", ".join(f"{outcome} {odd} at {bookmaker}" for outcome, bookmaker, odd in alert["legs"]))
+        if self.on_alert is not None:
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                self.logger.error_log(f"Error in the arbitrage callback: {e}")
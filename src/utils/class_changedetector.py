@@ -0,0 +1,55 @@
+import hashlib
+
+
+class ChangeDetector:
+    """
+    Detects the tournament pages whose content did not change since their last fetch.
+
+    The content of a page (its event blocks) is reduced to a hash, kept per url. A hit is a page
+    identical to the last fetch, a miss is a new or changed page. Counters are kept per bookmaker.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.counters = {}
+
+    def digest(self, blocks: list) -> str:
+        """
+        Hashes a list of content blocks (strings).
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for block in blocks:
+            h.update(block.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def has_changed(self, bookmaker: str, url: str, blocks: list) -> bool:
+        """
+        Checks the content of a page against its last fetch and remembers it.
+
+        :param bookmaker: The bookmaker name, for the counters.
+        :param url: The url of the page.
+        :param blocks: The content blocks of the page.
+        :return: True if the content is new or changed.
+        """
+        digest = self.digest(blocks)
+        counters = self.counters.setdefault(bookmaker, {"hit": 0, "miss": 0})
+
+        if self.hashes.get(url) == digest:
+            counters["hit"] += 1
+            return False
+
+        counters["miss"] += 1
+        self.hashes[url] = digest
+        return True
+
+    def forget(self, url: str):
+        """
+        Forgets the content of a page, so that its next fetch is processed whatever its content.
+        """
+        self.hashes.pop(url, None)
+
+    def get_hit_ratio(self, bookmaker: str) -> float:
+        counters = self.counters.get(bookmaker, {"hit": 0, "miss": 0})
+        total = counters["hit"] + counters["miss"]
+        return counters["hit"] / total if total else 0.0
@@ -2,104 +2,225 @@ import os
 import pandas as pd
 from utils.loaders import load_yaml, load_pandas, save_pandas
 from utils.class_mapper import Mapper
+from utils.class_logger import traced
+from utils.class_eventbatch import EventBatch
+
+
+# compact schema of the database: the repeated strings are categoricals (the url, team names and dates
+# are stored once per distinct value), the odds float32 and the scrape times datetime64
+CATEGORY_COLUMNS = [
+    "Bookmaker", "Date", "Home Team Unparse", "Away Team Unparse", "Date Unparse", "Sport", "Home Team Std",
+    "Away Team Std", "Sport Unparse", "Category Unparse", "Tournament Unparse", "url", "Category", "Event ID",
+]
+FLOAT_COLUMNS = ["Home Odd", "Draw Odd", "Away Odd", "snapshot_offset"]
+TIME_COLUMNS = ["scrapping_time"]
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def compact(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the columns of the database to the compact schema, in place.
+
+    :return: The same DataFrame.
+    """
+    for column in data.columns.intersection(CATEGORY_COLUMNS):
+        if not isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = data[column].astype("category")
+    for column in data.columns.intersection(FLOAT_COLUMNS):
+        data[column] = pd.to_numeric(data[column], errors="coerce").astype("float32")
+    for column in data.columns.intersection(TIME_COLUMNS):
+        data[column] = pd.to_datetime(data[column], format=DATETIME_FORMAT, errors="coerce")
+    return data
 
 
 class DatabaseManager:
     """
     A class to handle all interactions with the CSV database.
+
+    The rows are kept in the compact schema (see compact). The rows added by add_instance and the
+    batches added by add_batch are buffered and appended in one concat, the next time 'data' is read.
     """
     def __init__(self, path: str):
         self.path = path
-        self.data = load_pandas(self.path)
+        self.pending = []           # frames added since the last concat
+        self.pending_rows = []      # rows added since the last concat
+        self.pending_batches = []   # batches added since the last concat
+        # the strings are read straight into categoricals, without a column of Python objects first
+        self._data = compact(load_pandas(self.path, dtype={column: "category" for column in CATEGORY_COLUMNS}))
+
+    def _flush_rows(self):
+        if self.pending_rows:
+            self.pending.append(compact(pd.DataFrame(self.pending_rows)))
+            self.pending_rows = []
+
+    def _flush_batches(self):
+        if self.pending_batches:
+            self.pending.append(EventBatch.concat_frames(self.pending_batches))
+            self.pending_batches = []
+
+    @property
+    def data(self) -> pd.DataFrame:
+        # only one of them is not empty, see add_instance and add_batch
+        self._flush_rows()
+        self._flush_batches()
+        if self.pending:
+            frames = [self._data] + self.pending
+            self.pending = []
+            # concat the categoricals on the same categories, they would fall back to object otherwise. The new
+            # values are appended to the categories of the database, so that its codes are kept as they are
+            columns = set().union(*(frame.columns for frame in frames))
+            for column in [column for column in CATEGORY_COLUMNS if column in columns]:
+                base = self._data[column].cat.categories if column in self._data.columns else pd.Index([])
+                categories = base
+                for frame in frames[1:]:
+                    if column in frame.columns:
+                        added = frame[column].astype("category").cat.categories
+                        categories = categories.append(added[~added.isin(categories)])
+                for frame in frames:
+                    if frame is self._data and column in frame.columns:
+                        frame[column] = frame[column].cat.add_categories(categories[len(base):])
+                    else:
+                        values = frame[column] if column in frame.columns else [None] * len(frame.index)
+                        frame[column] = pd.Categorical(values, categories=categories)
+            self._data = compact(pd.concat(frames, ignore_index=True))
+        return self._data
+
+    @data.setter
+    def data(self, data: pd.DataFrame):
+        self.pending = []
+        self.pending_rows = []
+        self.pending_batches = []
+        self._data = compact(data)
 
     def _isnan(self, x) -> bool:
         # return True if x is nan
         return x != x
 
+    def _set_values(self, column: str, values: pd.Series):
+        """
+        Sets the values of some rows of a column, adding the new values to its categories.
+
+        :param values: The new values, indexed by the rows.
+        """
+        if column not in self.data.columns:
+            self.data[column] = pd.Series(index=self.data.index, dtype="category")
+        series = self.data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.cat.add_categories(pd.Index(values.dropna().unique()).difference(series.cat.categories))
+        series = series.copy()
+        series.loc[values.index] = values
+        self.data[column] = series
+
     def add_instance(self, instance: dict):
-        self.data = pd.concat([self.data, pd.DataFrame([instance])], ignore_index=True)
+        # keep the order of the added rows
+        self._flush_batches()
+        self.pending_rows.append(instance)
+
+    def add_batch(self, batch: EventBatch):
+        """
+        Adds the events of a scraped page.
+        """
+        if len(batch):
+            # keep the order of the added rows
+            self._flush_rows()
+            self.pending_batches.append(batch)
 
     def save_database(self):
         self.data.drop_duplicates(inplace=True)  # Remove duplicates before saving
-        save_pandas(self.data, self.path)
-
-    def standardise_team_names(self, sport: str, mapper: Mapper):
-
-        for index, event in self.data.iterrows():
-            try:
-                home_team_standard = mapper.map_team_name(sport, event["Home Team Unparse"])
-                away_team_standard = mapper.map_team_name(sport, event["Away Team Unparse"])
-
-                self.data.at[index, "Home Team Std"] = home_team_standard
-                self.data.at[index, "Away Team Std"] = away_team_standard
-            except Exception as e:
-                raise e
+        save_pandas(self.data, self.path, date_format=DATETIME_FORMAT)
+
+    def get_memory_report(self) -> pd.DataFrame:
+        """
+        Returns the memory footprint of the database per column: dtype, number of distinct values and
+        bytes (deep), with a 'Total' row.
+        """
+        data = self.data
+        report = pd.DataFrame({
+            "dtype": data.dtypes.astype(str),
+            "distinct": data.nunique(),
+            "bytes": data.memory_usage(index=False, deep=True),
+        })
+        report.loc["Total"] = ["", len(data.index), int(data.memory_usage(index=True, deep=True).sum())]
+        report["MB"] = (report["bytes"] / 2 ** 20).round(2)
+        return report
+
+    @traced("standardise", "Database")
+    def standardise_team_names(self, sport: str, mapper: Mapper, resolver=None):
+        """
+        Maps the team names of every row to their standard names.
+
+        :param sport: The sport category of the mapping (e.g., NHL, AHL).
+        :param mapper: The Mapper.
+        :param resolver: Optional TeamResolver, to map the unknown team names in one batch first.
+        """
+        if resolver is not None:
+            team_names = pd.concat([self.data["Home Team Unparse"], self.data["Away Team Unparse"]]).dropna().unique()
+            resolver.resolve(sport, list(team_names))
+
+        # map each distinct name once, an unknown name raises as before (a missing one stays empty)
+        for column in ("Home Team", "Away Team"):
+            names = self.data[f"{column} Unparse"]
+            standard_names = {name: mapper.map_team_name(sport, name) for name in names.dropna().unique()}
+            self._set_values(f"{column} Std", names.astype(object).map(standard_names))
         self.save_database()
 
+    @traced("standardise", "Database")
     def standardise_dates(self, mapper: Mapper):
 
-        for index, event in self.data.iterrows():
-            try:
-                bookmaker = event["Bookmaker"]
-                date_unparse = event["Date Unparse"]
-                scrapping_time = event["scrapping_time"]
-
-                if self._isnan(date_unparse):
-                    continue
-
-                date = mapper.map_date_unparse(bookmaker, date_unparse, scrapping_time)
-                self.data.at[index, "Date"] = date
-
-            except KeyError as ke:
-                print(f"data row {index}: KeyError 'scrapping_time', 'Date Unparse' or 'Bookmaker' not found {list(event.keys())}")
-                raise ke
-            except Exception as e:
-                print(e)
-                raise e
+        for column in ("Bookmaker", "Date Unparse", "scrapping_time"):
+            if column not in self.data.columns:
+                print(f"KeyError '{column}' not found {list(self.data.columns)}")
+                raise KeyError(column)
+
+        rows = self.data[self.data["Date Unparse"].notna()]
+        dates = {}
+        for bookmaker, date_unparse, scrapping_time in zip(rows["Bookmaker"], rows["Date Unparse"],
+                                                           rows["scrapping_time"]):
+            key = (bookmaker, date_unparse, scrapping_time)
+            if key not in dates:
+                dates[key] = mapper.map_date_unparse(bookmaker, date_unparse, scrapping_time)
+        self._set_values("Date", pd.Series(
+            [dates[key] for key in zip(rows["Bookmaker"], rows["Date Unparse"], rows["scrapping_time"])],
+            index=rows.index, dtype=object))
 
         self.save_database()
 
+    @traced("standardise", "Database")
     def standardise_sports(self, mapper: Mapper):
 
-        for index, event in self.data.iterrows():
-            try:
-                sport_unparse = event["Sport Unparse"]
-
-                if self._isnan(sport_unparse):
-                    continue
-
-                self.data.at[index, "Sport"] = mapper.map_sport_unparse(sport_unparse)
-
-            except KeyError as ke:
-                print(f"data row {index}: Key value not found {event.keys()}")
-                raise ke
-            except Exception as e:
-                print(e)
-                raise e
+        sports_unparse = self.data["Sport Unparse"].dropna()
+        sports = {sport_unparse: mapper.map_sport_unparse(sport_unparse) for sport_unparse in sports_unparse.unique()}
+        self._set_values("Sport", sports_unparse.astype(object).map(sports))
 
         self.save_database()
 
+    @traced("standardise", "Database")
     def standardise_category(self, mapper: Mapper):
 
-        for index, event in self.data.iterrows():
-            try:
-                category_unparse = event["Category Unparse"]
-
-                if self._isnan(category_unparse):
-                    continue
+        categories_unparse = self.data["Category Unparse"].dropna()
+        categories = {category_unparse: mapper.map_category_unparse(category_unparse)
+                      for category_unparse in categories_unparse.unique()}
+        self._set_values("Category", categories_unparse.astype(object).map(categories))
 
-                self.data.at[index, "Category"] = mapper.map_category_unparse(category_unparse)
+        self.save_database()
 
-            except KeyError as ke:
-                print(f"data row {index}: Key value not found {event.keys()}")
-                raise ke
-            except Exception as e:
-                print(e)
-                raise e
+    @traced("standardise", "Database")
+    def standardise_event_ids(self, schedule_index):
+        """
+        Gives the rows with a standard date and team names the canonical id of their game in the
+        official schedules (see ScheduleIndex). The rows out of the schedules keep an empty id.
+        """
+        rows = self.data[self.data[["Date", "Home Team Std", "Away Team Std"]].notna().all(axis=1)]
+        keys = list(zip(rows["Date"], rows["Home Team Std"], rows["Away Team Std"]))
+        event_ids = {}
+        for key in keys:
+            if key not in event_ids:
+                event_ids[key] = schedule_index.get_event_id(*key)
+        event_ids = pd.Series([event_ids[key] for key in keys], index=rows.index, dtype=object)
+        self._set_values("Event ID", event_ids.dropna())
 
         self.save_database()
 
-
 if __name__ == "__main__":
     config = load_yaml("../../config/bookmaker_config.yml")
     sport = "NHL"
@@ -114,3 +235,4 @@ if __name__ == "__main__":
     # db.standardise_dates(mapper)
     db.standardise_sports(mapper)
     db.standardise_category(mapper)
+    print(db.get_memory_report().to_string())
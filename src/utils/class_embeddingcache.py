@@ -0,0 +1,166 @@
+import os
+import json
+import numpy as np
+from utils.function_matchs import clean_key
+
+
+class EmbeddingCache:
+    """
+    A persistent cache of sentence embeddings.
+
+    The embeddings are keyed by the normalized text (`clean_key`) and stored per model as a
+    float32 matrix on disk, read back through memory-mapping. Only the texts that are not in
+    the cache yet are encoded, and the model is only loaded when there is something to encode.
+    """
+
+    def __init__(self, cache_dir: str, model_path: str, model_name: str = None):
+        """
+        :param cache_dir: Directory of the cache, one sub-directory per model.
+        :param model_path: Path (or name) of the SentenceTransformer model.
+        :param model_name: Name of the model in the cache. Defaults to the base name of the model path.
+        """
+        self.model_path = model_path
+        self.model_name = model_name or os.path.basename(os.path.normpath(model_path))
+        self.cache_dir = os.path.join(cache_dir, self.model_name)
+        self.keys_path = os.path.join(self.cache_dir, "keys.json")
+        self.matrix_path = os.path.join(self.cache_dir, "embeddings.f32")
+
+        self.model = None
+        self.dim = None
+        self.keys = []
+        self.positions = {}
+        self.matrix = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, text: str) -> bool:
+        return clean_key(text) in self.positions
+
+    def _load(self):
+        if not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.dim = index["dim"]
+        self.keys = index["keys"]
+        self.positions = {key: row for row, key in enumerate(self.keys)}
+        self._open_matrix()
+
+    def _open_matrix(self):
+        if self.keys:
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.keys), self.dim))
+
+    def _get_model(self):
+        if self.model is None:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_path)
+        return self.model
+
+    def _append(self, keys: list, embeddings: np.ndarray):
+        """
+        Appends new rows to the matrix file, then rewrites the key index.
+        The index is written last, so an interrupted write only leaves unindexed rows behind.
+        """
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+
+        # release the current mapping before growing the file
+        self.matrix = None
+        with open(self.matrix_path, "r+b" if os.path.exists(self.matrix_path) else "wb") as f:
+            f.seek(len(self.keys) * self.dim * 4)
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+            f.truncate()
+
+        for key in keys:
+            self.positions[key] = len(self.keys)
+            self.keys.append(key)
+
+        tmp_path = self.keys_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "keys": self.keys}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.keys_path)
+        self._open_matrix()
+
+    def encode(self, texts: list, batch_size: int = 256) -> np.ndarray:
+        """
+        Returns the normalized embeddings of the texts, encoding only the ones missing from the cache.
+
+        :param texts: List of texts.
+        :param batch_size: Batch size of the model.
+        :return: float32 array of shape (len(texts), dim).
+        """
+        keys = [clean_key(text) for text in texts]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.positions))
+
+        if missing:
+            embeddings = self._get_model().encode(missing, batch_size=batch_size, normalize_embeddings=True)
+            self._append(missing, np.asarray(embeddings, dtype=np.float32))
+            print(f"[INFO] {len(missing)} new embeddings encoded with '{self.model_name}'")
+
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.matrix[[self.positions[key] for key in keys]])
+
+
+class AnnIndex:
+    """
+    Approximate nearest neighbour index for normalized embeddings.
+
+    Random hyperplane LSH: each table hashes a vector to the sign pattern of its projections
+    on 'nb_bits' random hyperplanes. The candidates of a query are the vectors sharing a bucket
+    with it in at least one table, then they are ranked with the exact cosine similarity.
+    """
+
+    def __init__(self, embeddings: np.ndarray, nb_tables: int = 8, nb_bits: int = 10, seed: int = 42):
+        """
+        :param embeddings: float32 array of normalized vectors, shape (n, dim).
+        :param nb_tables: Number of hash tables. More tables give a better recall.
+        :param nb_bits: Number of hyperplanes per table. More bits give smaller buckets.
+        :param seed: Seed of the random hyperplanes.
+        """
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((nb_tables, self.embeddings.shape[1], nb_bits)).astype(np.float32)
+        self.bit_weights = 1 << np.arange(nb_bits, dtype=np.int64)
+
+        self.tables = []
+        for codes in self._hash(self.embeddings):
+            order = np.argsort(codes, kind="stable")
+            buckets, starts = np.unique(codes[order], return_index=True)
+            ends = np.append(starts[1:], len(order))
+            self.tables.append({bucket: order[start:end] for bucket, start, end in zip(buckets, starts, ends)})
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        # codes of shape (nb_tables, n)
+        return ((np.einsum("nd,tdb->tnb", vectors, self.planes) > 0) @ self.bit_weights).astype(np.int64)
+
+    def query(self, vectors: np.ndarray, k: int = 10, max_distance: float = None) -> list:
+        """
+        Finds the approximate nearest neighbours of the query vectors.
+
+        :param vectors: float32 array of normalized vectors, shape (m, dim).
+        :param k: Maximum number of neighbours per query.
+        :param max_distance: Maximum cosine distance of a neighbour. No limit if None.
+        :return: For each query, a list of (index, cosine distance) sorted by distance.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = self._hash(vectors)
+        empty = np.empty(0, dtype=np.int64)
+
+        neighbours = []
+        for i, vector in enumerate(vectors):
+            candidates = np.unique(np.concatenate([table.get(codes[t, i], empty) for t, table in enumerate(self.tables)]))
+            if not len(candidates):
+                neighbours.append([])
+                continue
+
+            distances = 1 - self.embeddings[candidates] @ vector
+            order = np.argsort(distances, kind="stable")[:k]
+            neighbours.append([(int(candidates[j]), float(distances[j])) for j in order
+                               if max_distance is None or distances[j] <= max_distance])
+        return neighbours
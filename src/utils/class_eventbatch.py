@@ -0,0 +1,250 @@
+import array
+import datetime
+
+
+class EventRecord:
+    """
+    One scraped event. The attributes are typed: the odds are floats (nan when the market has no
+    draw) and the event id a str or None.
+    """
+    __slots__ = ("bookmaker", "sport", "category", "tournament", "home_team", "away_team", "home_odd", "draw_odd",
+                 "away_odd", "date", "scrapping_time", "url", "event_id", "snapshot_id", "snapshot_offset")
+
+    # attribute: database column
+    COLUMNS = {
+        "bookmaker": "Bookmaker",
+        "sport": "Sport Unparse",
+        "category": "Category Unparse",
+        "tournament": "Tournament Unparse",
+        "home_team": "Home Team Unparse",
+        "away_team": "Away Team Unparse",
+        "home_odd": "Home Odd",
+        "draw_odd": "Draw Odd",
+        "away_odd": "Away Odd",
+        "date": "Date Unparse",
+        "scrapping_time": "scrapping_time",
+        "url": "url",
+        "event_id": "Event ID",
+        "snapshot_id": "snapshot_id",
+        "snapshot_offset": "snapshot_offset",
+    }
+
+    def __init__(self, bookmaker: str, sport: str, category: str, tournament: str, home_team: str, away_team: str,
+                 home_odd: float, draw_odd: float, away_odd: float, date: str, scrapping_time: str, url: str,
+                 event_id: str = None, snapshot_id: str = None, snapshot_offset: float = None):
+        self.bookmaker = bookmaker
+        self.sport = sport
+        self.category = category
+        self.tournament = tournament
+        self.home_team = home_team
+        self.away_team = away_team
+        self.home_odd = home_odd
+        self.draw_odd = draw_odd
+        self.away_odd = away_odd
+        self.date = date
+        self.scrapping_time = scrapping_time
+        self.url = url
+        self.event_id = event_id
+        self.snapshot_id = snapshot_id
+        self.snapshot_offset = snapshot_offset
+
+    def to_dict(self) -> dict:
+        """
+        Returns the event as a database row, without the unset optional columns.
+        """
+        optional = ("event_id", "snapshot_id", "snapshot_offset")
+        return {column: getattr(self, attribute) for attribute, column in self.COLUMNS.items()
+                if attribute not in optional or getattr(self, attribute) is not None}
+
+    def __repr__(self) -> str:
+        return f"EventRecord({self.bookmaker}: {self.home_team} - {self.away_team} " \
+               f"{self.home_odd}/{self.draw_odd}/{self.away_odd} {self.date})"
+
+
+class EventBatch:
+    """
+    The events of one scraped page, stored by columns.
+
+    The fields shared by the page (bookmaker, tournament keys, url, scrape time and snapshot) are
+    stored once, the odds and the fetch times in float arrays and the other fields in lists. The batch is what the
+    scrapers return and what the database, the odds history and the scheduler consume: the rows
+    are only built as a DataFrame (to_frame) or as EventRecords (iteration) when needed.
+    """
+    __slots__ = ("bookmaker", "sport", "category", "tournament", "url", "scrapping_time", "home_teams", "away_teams",
+                 "home_odds", "draw_odds", "away_odds", "dates", "fetch_times", "event_ids", "snapshot_id",
+                 "snapshot_start")
+
+    DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+    NAN = float("nan")
+
+    def __init__(self, bookmaker: str, keys: dict, url: str, scrapping_time: str = None):
+        """
+        :param keys: The sport, category and tournament names of the page.
+        :param scrapping_time: The time of the fetch, now by default.
+        """
+        self.bookmaker = bookmaker
+        self.sport = keys.get("sport")
+        self.category = keys.get("category")
+        self.tournament = keys.get("tournament")
+        self.url = url
+        self.scrapping_time = scrapping_time or datetime.datetime.now().strftime(self.DATETIME_FORMAT)
+        self.home_teams = []
+        self.away_teams = []
+        self.home_odds = array.array("d")
+        self.draw_odds = array.array("d")
+        self.away_odds = array.array("d")
+        self.dates = []
+        self.fetch_times = array.array("d")     # epoch time of the fetch of the page holding each event
+        self.event_ids = None           # list of canonical event ids, see ScheduleIndex
+        self.snapshot_id = None
+        self.snapshot_start = None      # epoch time of the start of the snapshot, see SnapshotSweep
+
+    def append(self, home_team: str, away_team: str, home_odd: float, draw_odd: float, away_odd: float, date: str,
+               fetch_time: float = None):
+        """
+        Adds an event. A missing odd (None or "") is stored as nan.
+
+        :param fetch_time: Epoch time of the fetch of the event, nan if unknown.
+        :raises ValueError: If an odd is not a number, the batch is then left unchanged.
+        """
+        # converted first: a bad odd must not leave the columns at different lengths
+        odds = [float(odd) if odd not in (None, "") else self.NAN for odd in (home_odd, draw_odd, away_odd)]
+        fetch_time = float(fetch_time) if fetch_time is not None else self.NAN
+
+        self.home_teams.append(home_team)
+        self.away_teams.append(away_team)
+        self.home_odds.append(odds[0])
+        self.draw_odds.append(odds[1])
+        self.away_odds.append(odds[2])
+        self.dates.append(date)
+        self.fetch_times.append(fetch_time)
+
+    def __len__(self) -> int:
+        return len(self.home_teams)
+
+    def __iter__(self):
+        event_ids = self.event_ids or [None] * len(self)
+        offsets = self.get_snapshot_offsets() or [None] * len(self)
+        for i in range(len(self)):
+            yield EventRecord(self.bookmaker, self.sport, self.category, self.tournament, self.home_teams[i],
+                              self.away_teams[i], self.home_odds[i], self.draw_odds[i], self.away_odds[i],
+                              self.dates[i], self.scrapping_time, self.url, event_ids[i], self.snapshot_id,
+                              offsets[i])
+
+    def __repr__(self) -> str:
+        return f"EventBatch({self.bookmaker} {self.url}: {len(self)} events at {self.scrapping_time})"
+
+    def get_snapshot_offsets(self) -> list:
+        """
+        Returns the seconds between the start of the snapshot and the fetch of each event, None if the
+        batch is not part of a snapshot.
+        """
+        if self.snapshot_start is None:
+            return None
+        return [fetch_time - self.snapshot_start for fetch_time in self.fetch_times]
+
+    def get_odds(self) -> "np.ndarray":
+        """
+        Returns the odds as an array of shape (n, 3): home, draw and away.
+        """
+        import numpy as np
+        return np.column_stack([np.frombuffer(odds, dtype=np.float64)
+                                for odds in (self.home_odds, self.draw_odds, self.away_odds)]).reshape(-1, 3)
+
+    def to_frame(self) -> "pd.DataFrame":
+        """
+        Returns the events as database rows, in the compact schema of the database.
+        """
+        return self.concat_frames([self])
+
+    @classmethod
+    def concat_frames(cls, batches: list) -> "pd.DataFrame":
+        """
+        Returns the events of several batches as database rows, in the compact schema of the database:
+        the columns are concatenated first, and the DataFrame built once.
+        """
+        # imported on use: the scraper processes only build the batches
+        import itertools
+        import numpy as np
+        import pandas as pd
+
+        lengths = np.array([len(batch) for batch in batches], dtype=np.int64)
+
+        def repeat(values: list) -> pd.Categorical:
+            # one value per batch, repeated for each of its events
+            categories = pd.Index([value for value in dict.fromkeys(values) if value is not None])
+            codes = np.array([categories.get_loc(value) if value is not None else -1 for value in values],
+                             dtype=np.int32)
+            return pd.Categorical.from_codes(np.repeat(codes, lengths), categories=categories)
+
+        def chain(attribute: str) -> list:
+            return list(itertools.chain.from_iterable(getattr(batch, attribute) for batch in batches))
+
+        def odds(attribute: str) -> np.ndarray:
+            return np.concatenate([np.frombuffer(getattr(batch, attribute), dtype=np.float64) for batch in batches]
+                                  + [np.empty(0)]).astype(np.float32)
+
+        times = [np.datetime64(datetime.datetime.strptime(batch.scrapping_time, cls.DATETIME_FORMAT), "us")
+                 for batch in batches]
+        columns = {
+            "Bookmaker": repeat([batch.bookmaker for batch in batches]),
+            "Sport Unparse": repeat([batch.sport for batch in batches]),
+            "Category Unparse": repeat([batch.category for batch in batches]),
+            "Tournament Unparse": repeat([batch.tournament for batch in batches]),
+            "Home Team Unparse": pd.Categorical(chain("home_teams")),
+            "Away Team Unparse": pd.Categorical(chain("away_teams")),
+            "Home Odd": odds("home_odds"),
+            "Draw Odd": odds("draw_odds"),
+            "Away Odd": odds("away_odds"),
+            "Date Unparse": pd.Categorical(chain("dates")),
+            "scrapping_time": np.repeat(np.array(times, dtype="datetime64[us]"), lengths),
+            "url": repeat([batch.url for batch in batches]),
+        }
+        if any(batch.event_ids is not None for batch in batches):
+            columns["Event ID"] = pd.Categorical(list(itertools.chain.from_iterable(
+                batch.event_ids or [None] * len(batch) for batch in batches)))
+        if any(batch.snapshot_id is not None for batch in batches):
+            columns["snapshot_id"] = np.repeat(np.array([batch.snapshot_id for batch in batches], dtype=object),
+                                               lengths)
+            columns["snapshot_offset"] = np.concatenate(
+                [np.frombuffer(batch.fetch_times, dtype=np.float64)
+                 - (batch.snapshot_start if batch.snapshot_start is not None else np.nan) for batch in batches]
+                + [np.empty(0)]).astype(np.float32)
+        return pd.DataFrame(columns)
+
+    # ------------------------------ serialisation ---------------------------------------------------------------------
+    def to_dict(self) -> dict:
+        """
+        Returns the batch as a JSON serialisable dict (missing odds as null).
+        """
+        def odds(values):
+            return [None if value != value else value for value in values]
+
+        return {
+            "bookmaker": self.bookmaker,
+            "keys": {"sport": self.sport, "category": self.category, "tournament": self.tournament},
+            "url": self.url,
+            "scrapping_time": self.scrapping_time,
+            "home_teams": self.home_teams,
+            "away_teams": self.away_teams,
+            "home_odds": odds(self.home_odds),
+            "draw_odds": odds(self.draw_odds),
+            "away_odds": odds(self.away_odds),
+            "dates": self.dates,
+            "fetch_times": odds(self.fetch_times),
+            "event_ids": self.event_ids,
+            "snapshot_id": self.snapshot_id,
+            "snapshot_start": self.snapshot_start,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EventBatch":
+        batch = cls(data["bookmaker"], data["keys"], data["url"], data["scrapping_time"])
+        fetch_times = data.get("fetch_times") or [None] * len(data["home_teams"])
+        for event in zip(data["home_teams"], data["away_teams"], data["home_odds"], data["draw_odds"],
+                         data["away_odds"], data["dates"], fetch_times):
+            batch.append(*event)
+        batch.event_ids = data.get("event_ids")
+        batch.snapshot_id = data.get("snapshot_id")
+        batch.snapshot_start = data.get("snapshot_start")
+        return batch
@@ -0,0 +1,183 @@
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a fetch is refused because the circuit breaker of the bookmaker is open.
+    """
+
+
+class RetryPolicy:
+    """
+    Retries with exponential backoff and full jitter: the delay before the retry n is drawn
+    uniformly between 0 and min(max_delay, base_delay * 2^n).
+    """
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a site that keeps failing.
+
+    After 'failure_threshold' consecutive failures the circuit opens and every call is refused
+    for 'recovery_time' seconds. Then a single trial call is let through (half-open): its success
+    closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.recovery_time:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Returns True if a call can go through.
+        """
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self.trial = False
+
+
+class RateLimiter:
+    """
+    Keeps at least 'min_interval' seconds between the start of two requests to the same domain.
+    """
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url: str):
+        if self.min_interval <= 0:
+            return
+
+        domain = urlparse(url).netloc
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_slot.get(domain, now))
+            self.next_slot[domain] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FetchPolicy:
+    """
+    Retry, circuit breaker and rate limiting policy of the fetches of one bookmaker.
+
+    The circuit breakers are shared by all the fetch policies of a bookmaker, and the rate
+    limiters by all the fetch policies, so that several WebDrivers respect the same limits.
+    """
+
+    DEFAULTS = {
+        "max_retries": 2,
+        "base_delay": 1.0,
+        "max_delay": 30.0,
+        "failure_threshold": 5,
+        "recovery_time": 300.0,
+        "min_interval": 0.0,
+    }
+
+    _breakers = {}
+    _rate_limiters = {}
+    _lock = threading.Lock()
+
+    def __init__(self, bookmaker: str, settings: dict = None):
+        """
+        :param bookmaker: The bookmaker name, the key of its circuit breaker.
+        :param settings: Overrides of the DEFAULTS.
+        """
+        self.bookmaker = bookmaker
+        self.settings = dict(self.DEFAULTS, **(settings or {}))
+        self.retry = RetryPolicy(self.settings["max_retries"], self.settings["base_delay"], self.settings["max_delay"])
+
+        with self._lock:
+            if bookmaker not in self._breakers:
+                self._breakers[bookmaker] = CircuitBreaker(self.settings["failure_threshold"],
+                                                           self.settings["recovery_time"])
+            if self.settings["min_interval"] not in self._rate_limiters:
+                self._rate_limiters[self.settings["min_interval"]] = RateLimiter(self.settings["min_interval"])
+        self.breaker = self._breakers[bookmaker]
+        self.rate_limiter = self._rate_limiters[self.settings["min_interval"]]
+
+    @classmethod
+    def from_config(cls, config: dict, bookmaker: str) -> "FetchPolicy":
+        """
+        Builds the policy of a bookmaker from the 'fetch_policy' section of the config,
+        overridden by the 'fetch_policy' section of the bookmaker.
+        """
+        settings = dict(config.get("fetch_policy") or {})
+        settings.update(config.get("bookmakers", {}).get(bookmaker, {}).get("fetch_policy") or {})
+        return cls(bookmaker, settings)
+
+    def call(self, url: str, fetch, logger=None, on_retry=None):
+        """
+        Calls fetch(url) with the policy.
+
+        :param url: The url to fetch.
+        :param fetch: The fetch function.
+        :param logger: Optional Logger.
+        :param on_retry: Optional callback on_retry(attempt, exception) before each retry.
+        :return: The result of fetch(url).
+        :raises CircuitOpenError: If the circuit breaker of the bookmaker is open.
+        """
+        for attempt in range(self.retry.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self.bookmaker}: {url} not fetched")
+
+            self.rate_limiter.wait(url)
+            try:
+                result = fetch(url)
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt == self.retry.max_retries:
+                    raise
+                delay = self.retry.get_delay(attempt)
+                if logger:
+                    logger.info_log("Fetch failed (%s), retry %s/%s in %.1f s.", e, attempt + 1,
+                                    self.retry.max_retries, delay)
+                if on_retry:
+                    on_retry(attempt, e)
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
@@ -0,0 +1,238 @@
+import json
+import time
+import socket
+import sqlite3
+import os
+from utils.class_logger import Logger
+from utils.class_workerpool import get_catalogue
+from utils.class_eventbatch import EventBatch
+
+
+class JobQueue:
+    """
+    A scrape job queue shared by several worker hosts, stored in a SQLite file.
+
+    Every tournament url is a job. A worker leases a job for 'lease_time' seconds, scrapes it and
+    reports its events. A job whose lease expired (dead or stuck worker) goes back to the queue, and
+    the report of a worker that lost its lease is ignored, so that each scrape is stored once.
+    The events are kept in the results table until the collector (the single writer) reads them.
+
+    The lease operations only need an atomic read-and-update: the SQLite file can be swapped for a
+    Redis-like store with the same methods.
+    """
+
+    def __init__(self, path: str, lease_time: float = 300, max_attempts: int = 3):
+        """
+        :param path: Path of the SQLite file, on a volume shared by the hosts.
+        :param lease_time: Seconds a worker keeps a job before it is given to another worker.
+        :param max_attempts: Number of leases of a job before it is marked as failed.
+        """
+        self.path = path
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                bookmaker TEXT NOT NULL,
+                url TEXT NOT NULL,
+                keys TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                UNIQUE (bookmaker, url)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                job_id INTEGER NOT NULL,
+                bookmaker TEXT NOT NULL,
+                url TEXT NOT NULL,
+                events TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                finished_at REAL NOT NULL
+            );
+        """)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock first: two workers cannot lease the same job
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    # ------------------------------ producer --------------------------------------------------------------------------
+    def enqueue(self, bookmaker: str, tournaments: list) -> int:
+        """
+        Adds the tournaments of a bookmaker to the queue. The finished or failed jobs of these
+        tournaments are queued again, the pending and leased ones are left as they are.
+
+        :param tournaments: [(keys, url)].
+        :return: The number of jobs queued.
+        """
+        self._transaction()
+        try:
+            nb_jobs = 0
+            for keys, url in tournaments:
+                cursor = self.connection.execute(
+                    "INSERT INTO jobs (bookmaker, url, keys) VALUES (?, ?, ?) "
+                    "ON CONFLICT (bookmaker, url) DO UPDATE SET status = 'pending', attempts = 0, error = NULL, "
+                    "keys = excluded.keys WHERE status IN ('done', 'failed')",
+                    (bookmaker, url, json.dumps(keys)))
+                nb_jobs += cursor.rowcount
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return nb_jobs
+
+    def enqueue_catalogues(self, config: dict, bookmakers: list, sport: str = None) -> int:
+        return sum(self.enqueue(bookmaker, get_catalogue(config, bookmaker, sport)) for bookmaker in bookmakers)
+
+    # ------------------------------ worker ----------------------------------------------------------------------------
+    def lease(self, worker: str, bookmakers: list = None) -> dict:
+        """
+        Leases the next pending job, or a job whose lease expired.
+
+        :param worker: The worker id.
+        :param bookmakers: Optional bookmakers the worker can scrape.
+        :return: {"id", "bookmaker", "url", "keys", "attempts"} or None if there is no job.
+        """
+        now = time.time()
+        query = ("SELECT * FROM jobs WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?))")
+        params = [now]
+        if bookmakers:
+            query += f" AND bookmaker IN ({', '.join('?' * len(bookmakers))})"
+            params += list(bookmakers)
+        query += " ORDER BY attempts, id LIMIT 1"
+
+        self._transaction()
+        try:
+            row = self.connection.execute(query, params).fetchone()
+            if row is not None and row["attempts"] >= self.max_attempts:
+                # leased too many times without a report
+                self.connection.execute("UPDATE jobs SET status = 'failed', error = 'lease expired' WHERE id = ?",
+                                        (row["id"],))
+                self.connection.execute("COMMIT")
+                return self.lease(worker, bookmakers)
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", (worker, now + self.lease_time, row["id"]))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return {"id": row["id"], "bookmaker": row["bookmaker"], "url": row["url"], "keys": json.loads(row["keys"]),
+                "attempts": row["attempts"] + 1}
+
+    def complete(self, job: dict, worker: str, events: EventBatch) -> bool:
+        """
+        Reports the events of a leased job.
+
+        :return: False if the worker lost the lease of the job (the report is ignored).
+        """
+        self._transaction()
+        try:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL WHERE id = ? AND status = 'leased' AND worker = ?",
+                (job["id"], worker))
+            if cursor.rowcount:
+                self.connection.execute(
+                    "INSERT INTO results (job_id, bookmaker, url, events, worker, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job["id"], job["bookmaker"], job["url"], json.dumps(events.to_dict()), worker, time.time()))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return bool(cursor.rowcount)
+
+    def fail(self, job: dict, worker: str, error: str):
+        """
+        Gives a leased job back to the queue, or marks it as failed after 'max_attempts' attempts.
+        """
+        self.connection.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_until = NULL, error = ? WHERE id = ? AND status = 'leased' AND worker = ?",
+            (self.max_attempts, error, job["id"], worker))
+
+    # ------------------------------ collector -------------------------------------------------------------------------
+    def collect_results(self, limit: int = 100) -> list:
+        """
+        Pops the oldest reported results.
+
+        :return: [(bookmaker, url, EventBatch)].
+        """
+        self._transaction()
+        try:
+            rows = self.connection.execute("SELECT * FROM results ORDER BY id LIMIT ?", (limit,)).fetchall()
+            if rows:
+                self.connection.execute("DELETE FROM results WHERE id <= ?", (rows[-1]["id"],))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return [(row["bookmaker"], row["url"], EventBatch.from_dict(json.loads(row["events"]))) for row in rows]
+
+    def get_stats(self) -> dict:
+        """
+        Returns the number of jobs per status and the number of results not collected yet.
+        """
+        stats = {row["status"]: row["count"] for row in
+                 self.connection.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+        stats["results"] = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
+
+    def close(self):
+        self.connection.close()
+
+
+def run_job_worker(job_queue: JobQueue, scrapers: dict, worker: str = None, idle_sleep: float = 10,
+                   stop_when_empty: bool = False, debug: bool = False) -> int:
+    """
+    Leases and scrapes jobs until interrupted (or until the queue is empty).
+
+    :param job_queue: The shared job queue.
+    :param scrapers: {bookmaker name: EventScraper} that this worker can run.
+    :param worker: The worker id, '<host>-<pid>' by default.
+    :param idle_sleep: Seconds to wait when there is no job.
+    :param stop_when_empty: Stop when there is no job instead of waiting.
+    :return: The number of jobs done.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    logger = Logger("JobWorker", debug)
+    nb_jobs = 0
+    try:
+        while True:
+            job = job_queue.lease(worker, list(scrapers))
+            if job is None:
+                if stop_when_empty:
+                    break
+                time.sleep(idle_sleep)
+                continue
+
+            scraper = scrapers[job["bookmaker"]]
+            try:
+                events = scraper.extract_event_data(job["keys"], job["url"])
+                if scraper.last_failed:
+                    # the page could not be fetched: not an empty page, the job is retried
+                    raise RuntimeError(scraper.last_error)
+            except Exception as e:
+                logger.error_log(f"Job {job['id']} ({job['url']}) failed: {e}")
+                job_queue.fail(job, worker, str(e))
+                continue
+
+            if job_queue.complete(job, worker, events):
+                nb_jobs += 1
+            else:
+                logger.info_log("Lease of job %s lost, its events are dropped.", job["id"])
+    except KeyboardInterrupt:
+        logger.info_log("Worker %s stopped.", worker)
+    logger.info_log("Worker %s did %s jobs.", worker, nb_jobs)
+    return nb_jobs
@@ -1,13 +1,64 @@
 import logging
 import os
+import time
+import json
+import atexit
 import datetime
+import threading
+import functools
+import contextlib
+
+
+class JsonLinesSink:
+    """
+    Buffered JSON-lines sink for the structured log records and the timing spans.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1000):
+        """
+        :param path: Path of the '.jsonl' file. Records are appended.
+        :param buffer_size: Number of records kept in memory before writing them.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        atexit.register(self.flush)
+
+    def write(self, record: dict):
+        with self.lock:
+            self.buffer.append(record)
+            if len(self.buffer) < self.buffer_size:
+                return
+            records, self.buffer = self.buffer, []
+        self._write(records)
+
+    def flush(self):
+        with self.lock:
+            records, self.buffer = self.buffer, []
+        self._write(records)
+
+    def _write(self, records: list):
+        if not records:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records))
 
 
 class Logger:
     """
     Base class for logging functionality.
+
+    Messages are formatted lazily: `debug_log("Odds found: %s", odds)` only builds the string
+    when debugging is enabled. When a sink is set (see `Logger.set_sink`), every message and
+    every timing span (see `span`) is also written as a structured record.
     """
 
+    sink = None
+
     def __init__(self, bookmaker: str, debug: bool = False, datetime_format: str = "%Y-%m-%d %H:%M:%S"):
         """
         Initialize the Logger class.
@@ -18,37 +69,131 @@ class Logger:
         self.bookmaker = bookmaker
         self.debug = debug
         self.datetime_format = datetime_format
+        self._datetime_second = None
+        self._datetime_str = ""
 
-    def debug_log(self, message: str):
+    @classmethod
+    def set_sink(cls, sink: JsonLinesSink):
+        """
+        Sets the structured sink shared by all the loggers. None to disable it.
+        """
+        cls.sink = sink
+
+    def debug_log(self, message: str, *args):
         """
         Logs debug messages if debugging is enabled.
 
-        :param message: The debug message to log.
+        :param message: The debug message to log, formatted with `message % args`.
         """
         if self.debug:
-            print(f"[DEBUG] {self._get_datetime()} - {self.bookmaker.upper()} - {message}")
+            self._log("DEBUG", message, args)
 
-    def info_log(self, message: str):
+    def info_log(self, message: str, *args):
         """
         Logs informational messages.
 
-        :param message: The informational message to log.
+        :param message: The informational message to log, formatted with `message % args`.
         """
-        print(f"[INFO] {self._get_datetime()} - {self.bookmaker.upper()} - {message}")
+        self._log("INFO", message, args)
 
-    def error_log(self, message: str):
+    def error_log(self, message: str, *args):
         """
         Logs error messages.
 
-        :param message: The error message to log.
+        :param message: The error message to log, formatted with `message % args`.
         """
-        print(f"[ERROR] {self._get_datetime()} - {self.bookmaker.upper()} - {message}")
+        self._log("ERROR", message, args)
+
+    def _log(self, level: str, message: str, args: tuple):
+        if args:
+            message = message % args
+        print(f"[{level}] {self._get_datetime()} - {self.bookmaker.upper()} - {message}")
+        if self.sink is not None:
+            self.sink.write({"type": "log", "time": time.time(), "level": level,
+                             "source": self.bookmaker, "message": message})
+
+    @contextlib.contextmanager
+    def span(self, name: str, **fields):
+        """
+        Times a block of code and writes it to the sink as a span record.
+
+        Example:
+            >> with logger.span("fetch", url=url):
+            ..     html = fetch(url)
+
+        :param name: Name of the stage (fetch, parse, extract, standardise, match, detect).
+        :param fields: Extra fields of the record.
+        """
+        if self.sink is None:
+            yield
+            return
+
+        start_time = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {"type": "span", "time": start_time, "name": name, "source": self.bookmaker,
+                      "duration_ms": 1000 * (time.perf_counter() - start)}
+            if error:
+                record["error"] = error
+            record.update(fields)
+            self.sink.write(record)
 
     def _get_datetime(self) -> str:
         """
-        Returns the current datetime as a formatted string.
+        Returns the current datetime as a formatted string, formatted once per second.
         """
-        return datetime.datetime.now().strftime(self.datetime_format)
+        now = time.time()
+        if int(now) != self._datetime_second:
+            self._datetime_second = int(now)
+            self._datetime_str = datetime.datetime.fromtimestamp(now).strftime(self.datetime_format)
+        return self._datetime_str
+
+
+def traced(name: str, source: str = "Pipeline"):
+    """
+    Decorator timing every call of a function as a span (see `Logger.span`).
+
+    :param name: Name of the stage (standardise, match, detect...).
+    :param source: Source of the span records.
+    """
+    logger = Logger(source)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with logger.span(name, function=function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarise_trace(path: str) -> dict:
+    """
+    Sums the spans of a JSON-lines trace by stage.
+
+    :param path: Path of the trace written by a JsonLinesSink.
+    :return: {span name: {"count", "total_ms", "mean_ms", "max_ms"}}, slowest stage first.
+    """
+    summary = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("type") != "span":
+                continue
+            stats = summary.setdefault(record["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += record["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], record["duration_ms"])
+
+    for stats in summary.values():
+        stats["mean_ms"] = stats["total_ms"] / stats["count"]
+    return dict(sorted(summary.items(), key=lambda item: item[1]["total_ms"], reverse=True))
 
 
 def setup_logger(log_file: str = "logs/arbitrage_analysis.log"):
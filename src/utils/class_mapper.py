@@ -1,23 +1,86 @@
 from utils.loaders import *
 from utils.function_matchs import clean_key
+import os
+import hashlib
 import datetime
 
 
 class Mapper:
-    def __init__(self, mapping_file: str = "team_mapping.yaml"):
+    CACHE_VERSION = 1
+
+    def __init__(self, mapping_file: str = "team_mapping.yaml", cache_file: str = None):
         """
         Initialize the TeamNameMapper with a mapping file.
         :param mapping_file: Path to the YAML file containing team name mappings.
+        :param cache_file: Path of the compiled mapping (pickle), '<mapping_file>.cache' by default.
         """
         self.mapping_file = mapping_file
-        self.mapper = load_yaml(self.mapping_file)
+        self.cache_file = cache_file or mapping_file + ".cache"
+        self.date_format = "%Y-%m-%d"
+        self.datetime_format = "%Y-%m-%d %H:%M:%S"
+        self.nb_pending = 0         # mappings added since the last save
+        self._load()
+
+    # ------------------------------ compiled mapping ------------------------------------------------------------------
+    def _load(self):
+        """
+        Loads the compiled mapping if it was compiled from the current mapping file (same hash),
+        otherwise parses the YAML file and compiles it.
+        """
+        with open(self.mapping_file, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+        compiled = None
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "rb") as f:
+                    compiled = pickle.load(f)
+            except Exception as e:
+                print(f"[INFO] Mapping cache {self.cache_file} unreadable, rebuilt: {e}")
+        if not compiled or compiled.get("version") != self.CACHE_VERSION or compiled.get("hash") != digest:
+            with open(self.mapping_file, "r", encoding="utf-8") as f:
+                mapper = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+            compiled = self._compile(mapper, digest)
+
+        self.mapper = compiled["mapper"]
+        self.team_index = compiled["team_index"]
+        self.sport_index = compiled["sport_index"]
+        self.category_index = compiled["category_index"]
         self.team_mapper = self.mapper["teams"]
         self.date_mapper = self.mapper["date"]
         self.sport_mapper = self.mapper["sports"]
         self.category_mapper = self.mapper["category"]
-        self.date_format = "%Y-%m-%d"
-        self.datetime_format = "%Y-%m-%d %H:%M:%S"
 
+    @staticmethod
+    def _reverse(mapping: dict) -> dict:
+        # {standard name: [variations]} -> {variation: standard name}, the first standard name wins
+        index = {}
+        for standard_name, variations in mapping.items():
+            for variation in variations or []:
+                index.setdefault(variation, standard_name)
+        return index
+
+    def _compile(self, mapper: dict, digest: str) -> dict:
+        """
+        Builds the reverse indexes of a parsed mapping and saves them in the cache file.
+        """
+        compiled = {
+            "version": self.CACHE_VERSION,
+            "hash": digest,
+            "mapper": mapper,
+            "team_index": {sport: self._reverse(teams) for sport, teams in mapper["teams"].items()},
+            "sport_index": self._reverse(mapper["sports"]),
+            "category_index": self._reverse(mapper["category"]),
+        }
+        try:
+            with open(self.cache_file + ".tmp", "wb") as f:
+                pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.cache_file + ".tmp", self.cache_file)
+        except OSError as e:
+            print(f"[INFO] Mapping cache {self.cache_file} not saved: {e}")
+        return compiled
+
+    # ------------------------------ team mapping ----------------------------------------------------------------------
     def map_team_name(self, sport: str, team_name: str) -> str:
         """
         Map a given team name to its standardized equivalent.
@@ -25,15 +88,12 @@ class Mapper:
         :param team_name: The team name to map.
         :return: The standardized team name.
         """
-        if sport not in self.team_mapper:
+        if sport not in self.team_index:
             raise ValueError(f"[ERROR] Sport '{sport}' not found in the mappings.")
 
-        for standard_name, variations in self.team_mapper[sport].items():
-            # check if the variation list is not empty for this standard name
-            if not variations:
-                continue
-            if team_name in variations:
-                return standard_name
+        standard_name = self.team_index[sport].get(team_name)
+        if standard_name is not None:
+            return standard_name
 
         # If no mapping exists, log and optionally add it
         raise ValueError(f"[ERROR] Mapper unrecognized team name: {team_name} for '{sport}'")
@@ -57,8 +117,8 @@ class Mapper:
             2. Attempts to map each team name using `map_team_name`.
             3. If a `ValueError` is raised (indicating no mapping exists):
                - Prompts the user to input a standard team name.
-               - Adds the new mapping using `_add_mapping`.
-               - Reloads the mapping from the YAML file using `_load_mapping`.
+               - Adds the new mapping using `_add_mapping`, without saving.
+            4. Saves all the new mappings at once with `save_mapper`.
 
         Example:
             >> update_mapper("NHL", ["Sharks", "Jets", "Avs"])
@@ -71,44 +131,68 @@ class Mapper:
                 self.map_team_name(sport, team_name)
             except ValueError:
                 standard_name = input(f"[Input] The standard team name for '{team_name}':")
-                self._add_mapping(sport, standard_name, team_name)
-                self.team_mapper = load_yaml(self.mapping_file)
+                self._add_mapping(sport, standard_name, team_name, save=False)
+        self.save_mapper()
         print("[INFO] All the current team names are mapped")
 
-    def _add_mapping(self, sport: str, standard_name: str, variation_name: list, allow_new_standard_name: bool = False):
+    def _add_mapping(self, sport: str, standard_name: str, variation_name: list, allow_new_standard_name: bool = False,
+                     save: bool = True):
         """
         Add a new mapping or update an existing one.
         :param allow_new_standard_name: bool variable to accept to create a new standard team name
         :param sport: The sport category (e.g., NHL, AHL).
         :param standard_name: The standardized name.
         :param variation_name: A new variation of the standardized name.
+        :param save: Save the mapping file. Use False to add several mappings then call `save_mapper` once.
         """
         if sport not in self.team_mapper:
             print(f"[INFO] New sport {sport} is added to the mapping file")
             self.team_mapper[sport] = {}
+            self.team_index[sport] = {}
 
         if standard_name in self.team_mapper[sport]:
-            # if there is no variation yet
-            if not self.team_mapper[sport][standard_name]:
-                self.team_mapper[sport][standard_name] = [variation_name]
-            else:
-                self.team_mapper[sport][standard_name].append(variation_name)
-
-            # Remove duplicates
-            self.team_mapper[sport][standard_name] = list(set(self.team_mapper[sport][standard_name]))
+            variations = self.team_mapper[sport][standard_name] or []
+            if variation_name not in variations:
+                variations.append(variation_name)
+            self.team_mapper[sport][standard_name] = variations
+            self.team_index[sport].setdefault(variation_name, standard_name)
+            self.nb_pending += 1
             print(f"[INFO] New variation name '{variation_name}' add for the team '{standard_name}'")
         else:
             if allow_new_standard_name:
                 self.team_mapper[sport][standard_name] = [variation_name]
+                self.team_index[sport].setdefault(variation_name, standard_name)
+                self.nb_pending += 1
             print(f"[INFO] Variation name '{variation_name}' is not added: standard team '{standard_name}' is not recognize")
 
-        save_yaml(self.team_mapper, self.mapping_file)
+        if save:
+            self.save_mapper()
+
+    def save_mapper(self):
+        """
+        Save the whole mapping (teams, dates, sports and categories) to the mapping file, in one
+        atomic write, and compile it again.
+        """
+        tmp_file = self.mapping_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            # the C dumper (libyaml) is ~10x faster on large mappings
+            yaml.dump(self.mapper, f, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), default_flow_style=False,
+                      allow_unicode=True)
+        os.replace(tmp_file, self.mapping_file)
+
+        with open(self.mapping_file, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        self._compile(self.mapper, digest)
+        self.nb_pending = 0
 
     # ------------------------------ Date parser -----------------------------------------------------------------------
-    def map_date_unparse(self, bookmaker: str, date_unparse: str, scrapping_time: str = None) -> str:
+    def map_date_unparse(self, bookmaker: str, date_unparse: str, scrapping_time=None) -> str:
 
         if scrapping_time is None:
             date_ref = datetime.datetime.now()
+        elif isinstance(scrapping_time, datetime.datetime):
+            # the database keeps the scrape times as datetime64 (pandas.Timestamp)
+            date_ref = scrapping_time
         else:
             date_ref = datetime.datetime.strptime(scrapping_time, self.datetime_format)
 
@@ -194,17 +278,15 @@ class Mapper:
     # ------------------------------ sport parser ----------------------------------------------------------------------
     def map_sport_unparse(self, sport_unparse: str) -> str:
 
-        for standard_name, variations in self.sport_mapper.items():
-            if sport_unparse in variations:
-                return standard_name
+        if sport_unparse in self.sport_index:
+            return self.sport_index[sport_unparse]
 
         raise ValueError(f"[ERROR] Sport '{sport_unparse}' not found in the mappings.")
 
     def map_category_unparse(self, category_unparse: str) -> str:
 
-        for standard_name, variations in self.category_mapper.items():
-            if category_unparse in variations:
-                return standard_name
+        if category_unparse in self.category_index:
+            return self.category_index[category_unparse]
 
         raise ValueError(f"[ERROR] Category '{category_unparse}' not found in the mappings.")
 
@@ -0,0 +1,186 @@
+import time
+import bisect
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class Metric:
+    """
+    Base class of the metrics: a value per combination of label values.
+    """
+
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        """
+        :param name: Name of the metric, e.g. 'scraper_fetch_total'.
+        :param help: Description of the metric.
+        :param labelnames: Names of the labels, e.g. ('bookmaker', 'status').
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"[ERROR] Metric '{self.name}' expects the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), function=None):
+        """
+        :param function: Optional function(value) applied at render time, e.g. to turn a timestamp into an age.
+        """
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def render(self) -> list:
+        if self.function is None:
+            return super().render()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{self._format_labels(key)} {self.function(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The set of metrics exposed by the metrics endpoint.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"[ERROR] Metric '{metric.name}' is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves the metrics of a registry on http://<host>:<port>/metrics from a background thread.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9108, host: str = "127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+REGISTRY = MetricsRegistry()
+
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    "scraper_fetch_seconds", "Page fetch latency.", ("bookmaker", "mode")))
+FETCH_TOTAL = REGISTRY.register(Counter(
+    "scraper_fetch_total", "Page fetches by result (ok, timeout, error, circuit_open).", ("bookmaker", "status")))
+FETCH_RETRIES = REGISTRY.register(Counter(
+    "scraper_fetch_retries_total", "Page fetches retried after a failure.", ("bookmaker",)))
+NAVIGATIONS = REGISTRY.register(Counter(
+    "scraper_navigations_total", "Tournaments opened on a kept page, in the app (in_app) or by a full load (full).",
+    ("bookmaker", "kind")))
+EVENTS_PARSED = REGISTRY.register(Counter(
+    "scraper_events_parsed_total", "Events extracted from the pages.", ("bookmaker",)))
+EVENTS_FAILED = REGISTRY.register(Counter(
+    "scraper_events_failed_total", "Events that could not be extracted.", ("bookmaker",)))
+ARBITRAGES = REGISTRY.register(Counter(
+    "scraper_arbitrages_total", "Arbitrages detected while scraping.", ("market",)))
+NEWEST_ODDS = REGISTRY.register(Gauge(
+    "scraper_newest_odds_timestamp_seconds", "Time of the newest extracted odds.", ("bookmaker",)))
+NEWEST_ODDS_AGE = REGISTRY.register(Gauge(
+    "scraper_newest_odds_age_seconds", "Age of the newest extracted odds.", ("bookmaker",),
+    function=lambda timestamp: round(time.time() - timestamp, 3)))
@@ -0,0 +1,306 @@
+import os
+import array
+import calendar
+import datetime
+import numpy as np
+import pandas as pd
+from utils.loaders import load_pandas
+from utils.class_eventbatch import EventBatch
+
+
+class PriceSeries:
+    """
+    The price history of one (event, bookmaker, market) key.
+
+    Only the price changes are stored. Timestamps (in seconds) and odds (in hundredths) are
+    delta-encoded: the first point is absolute, the following points are the difference with
+    the previous one. Missing odds (e.g. no draw) are encoded as 0.
+    """
+    __slots__ = ("time_deltas", "odds_deltas", "last_time", "last_odds")
+
+    def __init__(self, nb_outcomes: int):
+        self.time_deltas = array.array("q")
+        self.odds_deltas = array.array("i")
+        self.last_time = None
+        self.last_odds = (0,) * nb_outcomes
+
+    def __len__(self) -> int:
+        return len(self.time_deltas)
+
+    def append(self, timestamp: int, odds: tuple) -> bool:
+        """
+        Appends a point if the odds changed since the last one.
+
+        :param timestamp: Epoch time in seconds.
+        :param odds: Odds encoded as integers (hundredths).
+        :return: True if a new point was stored.
+        """
+        if self.last_time is not None:
+            # the history is append-only: older points are already folded in
+            if timestamp < self.last_time or odds == self.last_odds:
+                return False
+
+        self.time_deltas.append(timestamp - (self.last_time or 0))
+        self.odds_deltas.extend(new - old for new, old in zip(odds, self.last_odds))
+        self.last_time = timestamp
+        self.last_odds = odds
+        return True
+
+    def decode(self) -> (np.ndarray, np.ndarray):
+        """
+        Decodes the series.
+
+        :return: (timestamps, odds) with shapes (n,) and (n, nb_outcomes).
+        """
+        nb_outcomes = len(self.last_odds)
+        times = np.cumsum(np.frombuffer(self.time_deltas, dtype=np.int64))
+        odds = np.cumsum(np.frombuffer(self.odds_deltas, dtype=np.int32).reshape(-1, nb_outcomes), axis=0)
+        return times, odds
+
+    @classmethod
+    def from_arrays(cls, time_deltas: np.ndarray, odds_deltas: np.ndarray) -> "PriceSeries":
+        series = cls(odds_deltas.shape[1])
+        series.time_deltas.frombytes(time_deltas.astype(np.int64).tobytes())
+        series.odds_deltas.frombytes(odds_deltas.astype(np.int32).tobytes())
+        series.last_time = int(time_deltas.sum())
+        series.last_odds = tuple(int(x) for x in odds_deltas.sum(axis=0))
+        return series
+
+
+class OddsHistory:
+    """
+    A time-series store for the odds history.
+
+    Instead of appending a full database row on every scrape, only one point per
+    (event, bookmaker, market) price change is kept, in compact delta-encoded arrays.
+    """
+
+    MARKET = "1N2"
+    ODDS_COLUMNS = ["Home Odd", "Draw Odd", "Away Odd"]
+    ODD_SCALE = 100
+
+    def __init__(self, path: str, mapper=None):
+        """
+        :param path: Path of the '.npz' history file. It is loaded if it already exists.
+        :param mapper: The Mapper, to parse the dates of the scraped batches (see add_batch).
+        """
+        self.path = path
+        self.mapper = mapper
+        self.datetime_format = "%Y-%m-%d %H:%M:%S"
+        self.series = {}
+        self.events = {}
+
+        if os.path.exists(self.path):
+            self.load_history()
+
+    # ------------------------------ encoding --------------------------------------------------------------------------
+    def _isnan(self, x) -> bool:
+        # return True if x is nan
+        return x != x
+
+    def get_event_key(self, instance: dict) -> str:
+        """
+        Builds the event key: the canonical event id when available (see ScheduleIndex), 'date|home|away'
+        otherwise, using the standard team names when available.
+        """
+        event_id = instance.get("Event ID")
+        if event_id and not self._isnan(event_id):
+            return event_id
+        home = instance.get("Home Team Std")
+        away = instance.get("Away Team Std")
+        if not home or not away or self._isnan(home) or self._isnan(away):
+            home = instance["Home Team Unparse"]
+            away = instance["Away Team Unparse"]
+        date = instance.get("Date")
+        if not date or self._isnan(date):
+            # not standardised yet
+            date = self._parse_date(instance["Bookmaker"], instance.get("Date Unparse", ""),
+                                    instance.get("scrapping_time"))
+        return self._make_event_key(date, home, away)
+
+    def _make_event_key(self, date: str, home: str, away: str) -> str:
+        return f"{date}|{home}|{away}"
+
+    def _encode_time(self, scrapping_time) -> int:
+        if isinstance(scrapping_time, datetime.datetime):
+            date = scrapping_time
+        else:
+            date = datetime.datetime.strptime(scrapping_time, self.datetime_format)
+        return calendar.timegm(date.timetuple())
+
+    def _encode_odds(self, odds: list) -> tuple:
+        return tuple(0 if odd == "" or odd is None or self._isnan(odd) else int(round(float(odd) * self.ODD_SCALE))
+                     for odd in odds)
+
+    # ------------------------------ writing ---------------------------------------------------------------------------
+    def add_instance(self, instance: dict) -> bool:
+        """
+        Adds a scraped event to the history if its odds changed since the last scrape.
+
+        :param instance: A database row (dict with the database columns).
+        :return: True if a new point was stored.
+        """
+        key = (self.get_event_key(instance), instance["Bookmaker"], self.MARKET)
+        timestamp = self._encode_time(instance["scrapping_time"])
+        odds = self._encode_odds([instance[column] for column in self.ODDS_COLUMNS])
+
+        if key not in self.series:
+            self.series[key] = PriceSeries(len(self.ODDS_COLUMNS))
+            self.events.setdefault(key[0], []).append(key)
+        return self.series[key].append(timestamp, odds)
+
+    def add_batch(self, batch: EventBatch) -> int:
+        """
+        Adds the events of a scraped page, keyed like get_event_key: by their event id when set, by their
+        date and unparsed team names otherwise (the team names are not standardised yet).
+
+        :return: The number of points stored.
+        """
+        timestamp = self._encode_time(batch.scrapping_time)
+        event_ids = batch.event_ids or [None] * len(batch)
+        nb_points = 0
+        for home, away, date, event_id, odds in zip(batch.home_teams, batch.away_teams, batch.dates, event_ids,
+                                                    zip(batch.home_odds, batch.draw_odds, batch.away_odds)):
+            event_key = event_id or self._make_event_key(
+                self._parse_date(batch.bookmaker, date, batch.scrapping_time), home, away)
+            key = (event_key, batch.bookmaker, self.MARKET)
+            if key not in self.series:
+                self.series[key] = PriceSeries(len(self.ODDS_COLUMNS))
+                self.events.setdefault(key[0], []).append(key)
+            nb_points += self.series[key].append(timestamp, self._encode_odds(odds))
+        return nb_points
+
+    def _parse_date(self, bookmaker: str, date_unparse: str, scrapping_time) -> str:
+        # the 'Date' column of the database, the unparsed date if it can't be parsed
+        if self.mapper is None:
+            return date_unparse
+        try:
+            return self.mapper.map_date_unparse(bookmaker, date_unparse, scrapping_time)
+        except Exception:
+            return date_unparse
+
+    def add_dataframe(self, data: pd.DataFrame) -> int:
+        """
+        Adds all the rows of a DataFrame, in chronological order.
+
+        :return: The number of points stored.
+        """
+        # rows without scrapping time can't be placed in the history
+        data = data.dropna(subset=["scrapping_time"])
+        data = data.sort_values(by="scrapping_time", kind="stable")
+        nb_points = 0
+        for instance in data.to_dict("records"):
+            nb_points += self.add_instance(instance)
+        return nb_points
+
+    def save_history(self):
+        """
+        Saves all the series in a single '.npz' file made of flat arrays and offsets.
+        """
+        keys = list(self.series.keys())
+        lengths = np.array([len(self.series[key]) for key in keys], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        time_deltas = np.concatenate([np.frombuffer(self.series[key].time_deltas, dtype=np.int64) for key in keys]
+                                     or [np.empty(0, dtype=np.int64)])
+        odds_deltas = np.concatenate([np.frombuffer(self.series[key].odds_deltas, dtype=np.int32) for key in keys]
+                                     or [np.empty(0, dtype=np.int32)])
+
+        np.savez_compressed(
+            self.path,
+            keys=np.array(["\t".join(key) for key in keys], dtype=str),
+            offsets=offsets,
+            time_deltas=time_deltas,
+            odds_deltas=odds_deltas.reshape(-1, len(self.ODDS_COLUMNS)),
+        )
+        print(f"[INFO] Odds history saved: {len(keys)} series, {offsets[-1]} points")
+
+    def load_history(self):
+        with np.load(self.path) as history:
+            keys = history["keys"]
+            offsets = history["offsets"]
+            time_deltas = history["time_deltas"]
+            odds_deltas = history["odds_deltas"]
+
+        self.series = {}
+        self.events = {}
+        for i, key in enumerate(keys):
+            key = tuple(str(key).split("\t"))
+            start, end = offsets[i], offsets[i + 1]
+            self.series[key] = PriceSeries.from_arrays(time_deltas[start:end], odds_deltas[start:end])
+            self.events.setdefault(key[0], []).append(key)
+
+    # ------------------------------ queries ---------------------------------------------------------------------------
+    def get_price_path(self, event: str, bookmaker: str = None, start: datetime.datetime = None,
+                       end: datetime.datetime = None, market: str = MARKET) -> pd.DataFrame:
+        """
+        Returns the price path of an event between two dates.
+
+        :param event: The event key, event id or 'date|home|away' (see `get_event_key`).
+        :param bookmaker: Restrict the path to a single bookmaker. All bookmakers if None.
+        :param start: Start of the range, included. No lower bound if None.
+        :param end: End of the range, included. No upper bound if None.
+        :param market: The market of the odds.
+        :return: DataFrame with the columns 'Bookmaker', 'scrapping_time' and the odds columns.
+        """
+        start_time = calendar.timegm(start.timetuple()) if start else None
+        end_time = calendar.timegm(end.timetuple()) if end else None
+
+        frames = []
+        for key in self.events.get(event, []):
+            _, bookmaker_key, market_key = key
+            series = self.series[key]
+            if market_key != market:
+                continue
+            if bookmaker and bookmaker_key != bookmaker:
+                continue
+
+            times, odds = series.decode()
+            first = 0
+            if start_time is not None:
+                # the price at 'start' is the last change before it
+                first = max(np.searchsorted(times, start_time, side="right") - 1, 0)
+            last = len(times) if end_time is None else np.searchsorted(times, end_time, side="right")
+            if first >= last:
+                continue
+
+            frame = pd.DataFrame(np.where(odds[first:last] == 0, np.nan, odds[first:last] / self.ODD_SCALE),
+                                 columns=self.ODDS_COLUMNS)
+            frame.insert(0, "scrapping_time", pd.to_datetime(times[first:last], unit="s"))
+            frame.insert(0, "Bookmaker", bookmaker_key)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=["Bookmaker", "scrapping_time"] + self.ODDS_COLUMNS)
+        return pd.concat(frames, ignore_index=True).sort_values(by="scrapping_time", ignore_index=True)
+
+    def get_last_hours(self, event: str, hours: float = 6, now: datetime.datetime = None, **kwargs) -> pd.DataFrame:
+        """
+        Returns the price path of an event over the last hours.
+        The times are naive, on the same clock as 'scrapping_time'.
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        return self.get_price_path(event, start=now - datetime.timedelta(hours=hours), end=now, **kwargs)
+
+
+def compact_database(database_path: str, history_path: str, mapper=None) -> OddsHistory:
+    """
+    Folds the CSV database history into the odds history store.
+
+    :param database_path: Path to the CSV database.
+    :param history_path: Path to the '.npz' history file.
+    :param mapper: The Mapper, to date the rows not standardised yet.
+    :return: The updated OddsHistory.
+    """
+    data = load_pandas(database_path)
+    history = OddsHistory(history_path, mapper)
+
+    nb_points = history.add_dataframe(data)
+    print(f"[INFO] {len(data.index)} database rows folded into {nb_points} price changes")
+    history.save_history()
+    return history
+
+
+if __name__ == "__main__":
+    compact_database("../../data/database.csv", "../../data/odds_history.npz")
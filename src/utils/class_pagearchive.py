@@ -0,0 +1,175 @@
+import os
+import json
+import mmap
+import zlib
+import queue
+import atexit
+import hashlib
+import threading
+import datetime
+from utils.class_logger import Logger
+
+try:
+    import zstandard
+except ImportError:         # zlib fallback, the archive stays readable by both
+    zstandard = None
+
+
+class PageArchive:
+    """
+    An archive of the raw pages (HTML or JSON) fetched by the WebDriver.
+
+    The pages are compressed (zstd, zlib if zstandard is not installed) and stored once per content,
+    under their blake2b hash: root/objects/ab/abcdef....zst. Every fetch adds a line (bookmaker, url,
+    timestamp, hash) to root/index.jsonl. The pages are written by a background thread so that the
+    scrapers never wait for the disk, and read back through a memory map.
+    """
+
+    def __init__(self, root: str, level: int = 3, queue_size: int = 1000):
+        """
+        :param root: The directory of the archive.
+        :param level: The compression level.
+        :param queue_size: Maximum number of pages waiting to be written. Beyond it the pages are dropped.
+        """
+        self.root = root
+        self.level = level
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.logger = Logger("Archive")
+        self.index = None           # {(bookmaker, url): [(timestamp, hash)]}, loaded on first read
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._writer, name="PageArchive", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    # ------------------------------ write -----------------------------------------------------------------------------
+    def put(self, bookmaker: str, url: str, content, timestamp: str = None) -> bool:
+        """
+        Queues a page for the writer thread, without blocking.
+
+        :param content: The page, str or bytes.
+        :param timestamp: The fetch time, now by default.
+        :return: False if the queue is full and the page was dropped.
+        """
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self.queue.put_nowait((bookmaker, url, timestamp, content))
+            return True
+        except queue.Full:
+            self.logger.error_log(f"Archive queue full, page of {url} dropped.")
+            return False
+
+    def flush(self):
+        """
+        Waits until the queued pages are written.
+        """
+        self.queue.join()
+
+    def _writer(self):
+        while True:
+            bookmaker, url, timestamp, content = self.queue.get()
+            try:
+                if isinstance(content, str):
+                    content = content.encode("utf-8")
+                self.write(bookmaker, url, timestamp, content)
+            except Exception as e:
+                self.logger.error_log(f"Error while archiving the page of {url}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _get_object_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.{extension}")
+
+    def _find_object(self, digest: str) -> str:
+        for extension in ("zst", "z"):
+            path = self._get_object_path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def write(self, bookmaker: str, url: str, timestamp: str, content: bytes) -> str:
+        """
+        Stores a page (if its content is new) and indexes it. Called by the writer thread.
+
+        :return: The hash of the content.
+        """
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if self._find_object(digest) is None:
+            if zstandard is not None:
+                path = self._get_object_path(digest, "zst")
+                data = zstandard.ZstdCompressor(level=self.level).compress(content)
+            else:
+                path = self._get_object_path(digest, "z")
+                data = zlib.compress(content, self.level)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+        entry = {"bookmaker": bookmaker, "url": url, "timestamp": timestamp, "hash": digest}
+        with self.lock:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            if self.index is not None:
+                self.index.setdefault((bookmaker, url), []).append((timestamp, digest))
+        return digest
+
+    # ------------------------------ read ------------------------------------------------------------------------------
+    def _load_index(self):
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    index.setdefault((entry["bookmaker"], entry["url"]), []).append((entry["timestamp"], entry["hash"]))
+        for versions in index.values():
+            versions.sort()
+        self.index = index
+
+    def get_versions(self, bookmaker: str, url: str) -> list:
+        """
+        Returns the archived fetches of a page: [(timestamp, hash)] from the oldest.
+        """
+        with self.lock:
+            if self.index is None:
+                self._load_index()
+            return list(self.index.get((bookmaker, url), []))
+
+    def load(self, digest: str) -> bytes:
+        """
+        Reads a page by its hash.
+        """
+        path = self._find_object(digest)
+        if path is None:
+            raise FileNotFoundError(f"[ERROR] Page {digest} not found in the archive {self.root}")
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if path.endswith(".z"):
+                return zlib.decompress(data)
+            if zstandard is None:
+                raise ImportError("[ERROR] zstandard is needed to read the page " + path)
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def load_page(self, bookmaker: str, url: str, timestamp: str = None) -> str:
+        """
+        Reads the last fetch of a page, or the last one at or before 'timestamp'.
+        """
+        versions = [version for version in self.get_versions(bookmaker, url)
+                    if timestamp is None or version[0] <= timestamp]
+        if not versions:
+            raise FileNotFoundError(f"[ERROR] No page of {bookmaker} {url} in the archive {self.root}")
+        return self.load(versions[-1][1]).decode("utf-8")
+
+
+_archives = {}
+
+
+def get_archive(root: str) -> PageArchive:
+    """
+    Returns the archive of a directory, shared by all the WebDrivers of the process.
+    """
+    if root not in _archives:
+        _archives[root] = PageArchive(root)
+    return _archives[root]
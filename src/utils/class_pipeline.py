@@ -0,0 +1,162 @@
+import time
+import queue
+import threading
+from utils.class_logger import Logger
+
+
+_DONE = object()        # end of the tournaments of a fetcher thread
+
+
+class StreamingPipeline:
+    """
+    A streaming pipeline: fetch -> parse -> standardise -> store -> detect.
+
+    Every stage is a generator of EventBatch, one batch per scraped page, so that a page goes down
+    the whole pipeline as soon as it is parsed. The pages are fetched by one thread per bookmaker
+    into a bounded queue: when the storage or the detection lags, the fetchers wait (backpressure)
+    and at most 'queue_size' parsed pages are held in memory.
+    """
+
+    def __init__(self, scrapers: dict, schedule_index, db, history, detector, queue_size: int = 8,
+                 save_interval: float = 60, debug: bool = False):
+        """
+        :param scrapers: {bookmaker name: EventScraper}.
+        :param schedule_index: The ScheduleIndex giving the canonical event ids.
+        :param db: The DatabaseManager.
+        :param history: The OddsHistory.
+        :param detector: The ArbitrageDetector.
+        :param queue_size: Maximum number of parsed pages waiting to be stored.
+        :param save_interval: Seconds between two saves of the database and the history.
+        """
+        self.scrapers = scrapers
+        self.schedule_index = schedule_index
+        self.db = db
+        self.history = history
+        self.detector = detector
+        self.queue_size = queue_size
+        self.save_interval = save_interval
+        self.logger = Logger("Pipeline", debug)
+        self.first_alert_time = None
+
+    # ------------------------------ stages ----------------------------------------------------------------------------
+    def fetch(self, tournaments: dict):
+        """
+        Fetches and parses the pages, one thread per bookmaker.
+
+        :param tournaments: {bookmaker: [(keys, url)]}.
+        :return: A generator of EventBatch, in the order the pages are parsed.
+        """
+        results = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(item):
+            # blocks while the queue is full, unless the consumer stopped
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetcher(bookmaker: str, pages: list):
+            try:
+                scraper = self.scrapers[bookmaker]
+                for keys, url in pages:
+                    if stop.is_set():
+                        return
+                    batch = scraper.extract_event_data(keys, url)
+                    put((batch, scraper.last_unchanged))
+            except Exception as e:
+                self.logger.error_log(f"Fetcher {bookmaker} stopped: {e}")
+            finally:
+                self.scrapers[bookmaker].close()
+                put(_DONE)
+
+        threads = [threading.Thread(target=fetcher, args=(bookmaker, pages), name=f"Fetch-{bookmaker}", daemon=True)
+                   for bookmaker, pages in tournaments.items() if bookmaker in self.scrapers]
+        for thread in threads:
+            thread.start()
+        try:
+            nb_done = 0
+            while nb_done < len(threads):
+                item = results.get()
+                if item is _DONE:
+                    nb_done += 1
+                    continue
+                batch, unchanged = item
+                if unchanged:
+                    # the odds of the page are confirmed: its quotes are still fresh
+                    self.detector.touch(batch)
+                elif len(batch):
+                    yield batch
+        finally:
+            # the consumer may stop early: release the fetchers
+            stop.set()
+
+    def standardise(self, batches):
+        """
+        Gives the events their canonical event id.
+        """
+        for batch in batches:
+            batch.event_ids = [self.schedule_index.resolve_event(event) for event in batch]
+            yield batch
+
+    def store(self, batches):
+        """
+        Adds the batches to the database and to the odds history, saved every 'save_interval' seconds
+        and at the end of the stream.
+        """
+        last_save = time.time()
+        try:
+            for batch in batches:
+                self.db.add_batch(batch)
+                self.history.add_batch(batch)
+                if time.time() - last_save >= self.save_interval:
+                    self.save()
+                    last_save = time.time()
+                yield batch
+        finally:
+            self.save()
+
+    def detect(self, batches):
+        """
+        Checks the events of each batch for arbitrages, see ArbitrageDetector.
+        """
+        for batch in batches:
+            if self.detector.update(batch) and self.first_alert_time is None:
+                self.first_alert_time = time.time()
+            yield batch
+
+    def save(self):
+        self.db.save_database()
+        self.history.save_history()
+
+    # ------------------------------ run -------------------------------------------------------------------------------
+    def run(self, tournaments: dict) -> dict:
+        """
+        Runs the pipeline over the tournaments.
+
+        :param tournaments: {bookmaker: [(keys, url)]}.
+        :return: Summary {"pages", "events", "arbitrages", "first_alert", "seconds"}, 'first_alert' being the
+            seconds from the start to the first arbitrage (None if there was none).
+        """
+        start_time = time.time()
+        nb_alerts = self.detector.nb_alerts
+        self.first_alert_time = None
+        nb_pages = 0
+        nb_events = 0
+        for batch in self.detect(self.store(self.standardise(self.fetch(tournaments)))):
+            nb_pages += 1
+            nb_events += len(batch)
+
+        summary = {
+            "pages": nb_pages,
+            "events": nb_events,
+            "arbitrages": self.detector.nb_alerts - nb_alerts,
+            "first_alert": round(self.first_alert_time - start_time, 3) if self.first_alert_time else None,
+            "seconds": round(time.time() - start_time, 3),
+        }
+        self.logger.info_log("%s pages, %s events, %s arbitrages in %.0f s (first alert after %s s).",
+                             summary["pages"], summary["events"], summary["arbitrages"], summary["seconds"],
+                             summary["first_alert"])
+        return summary
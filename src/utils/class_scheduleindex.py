@@ -0,0 +1,78 @@
+import os
+import datetime
+import pandas as pd
+from utils.class_mapper import Mapper
+from utils.class_eventbatch import EventRecord
+
+
+class ScheduleIndex:
+    """
+    An index of the official fixtures, to give every scraped event a canonical event id.
+
+    The index is keyed by (league, date, home abbreviation, away abbreviation), the abbreviations
+    being the prefix of the standard team names of the mapping ("ANA - Anaheim Ducks"). The date of a
+    bookmaker is a French date while the schedule date is the local date of the game: the date is
+    looked up as is, then the day before and the day after.
+    """
+
+    DATE_OFFSETS = (0, -1, 1)
+
+    def __init__(self, schedules: dict, mapper: Mapper):
+        """
+        :param schedules: {league: path of its schedule CSV}, the leagues being sections of the team mapping.
+        :param mapper: The Mapper.
+        """
+        self.mapper = mapper
+        self.index = {}
+        for league, path in schedules.items():
+            if not os.path.exists(path):
+                continue
+            schedule = pd.read_csv(path, dtype=str, keep_default_na=False)
+            for date, home, away in zip(schedule["Date"], schedule["Home Team Abbreviation"],
+                                        schedule["Away Team Abbreviation"]):
+                self.index[(league, date, home, away)] = f"{league}:{date}:{home}-{away}"
+
+        self.leagues = [league for league in schedules if league in mapper.team_mapper]
+        # standard team name: league
+        self.team_leagues = {standard_name: league for league in self.leagues
+                             for standard_name in mapper.team_mapper[league]}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @staticmethod
+    def get_abbreviation(standard_name: str) -> str:
+        return standard_name.split(" - ")[0]
+
+    def get_event_id(self, date: str, home_team_std: str, away_team_std: str) -> str:
+        """
+        Returns the canonical id of a game from its date and standard team names, or None if the
+        game is not in the schedules.
+        """
+        league = self.team_leagues.get(home_team_std)
+        if league is None or self.team_leagues.get(away_team_std) != league:
+            return None
+
+        home = self.get_abbreviation(home_team_std)
+        away = self.get_abbreviation(away_team_std)
+        day = datetime.datetime.strptime(date, self.mapper.date_format).date()
+        for offset in self.DATE_OFFSETS:
+            event_id = self.index.get((league, str(day + datetime.timedelta(days=offset)), home, away))
+            if event_id is not None:
+                return event_id
+        return None
+
+    def resolve_event(self, event: EventRecord) -> str:
+        """
+        Returns the canonical id of a scraped event, from its unparsed team names and date, or None
+        if its teams are not in the mapping or the game is not in the schedules.
+        """
+        for league in self.leagues:
+            try:
+                home_team_std = self.mapper.map_team_name(league, event.home_team)
+                away_team_std = self.mapper.map_team_name(league, event.away_team)
+                date = self.mapper.map_date_unparse(event.bookmaker, event.date, event.scrapping_time)
+            except Exception:
+                continue
+            return self.get_event_id(date, home_team_std, away_team_std)
+        return None
@@ -1,24 +1,66 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import json
+import time
+import hashlib
+import threading
 import datetime
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+
+SCHEDULE_COLUMNS = ["Date", "Away Team", "Away Team Abbreviation", "Home Team", "Home Team Abbreviation", "Venue",
+                    "Start Time (UTC)"]
+GAME_KEY = ["Date", "Home Team Abbreviation", "Away Team Abbreviation"]
+
+
+def create_session(pool_size: int = 16) -> requests.Session:
+    """
+    Creates an HTTP session keeping up to 'pool_size' connections alive per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class ScheduleFetcher:
     """
     A class to fetch and manage game schedules from the official API.
+
+    The API returns the game week starting at the requested date. The weeks of a date range are
+    fetched concurrently through a pooled session, and the responses are cached on disk with their
+    ETag / Last-Modified headers, so that a refresh only downloads the weeks that changed.
     """
 
-    def __init__(self, url_base: str, schedule_path: str, debug: bool = False):
+    WEEK_DAYS = 7
+
+    def __init__(self, url_base: str, schedule_path: str, debug: bool = False, session: requests.Session = None,
+                 cache_dir: str = None, max_workers: int = 8):
         """
         Initialize the ScheduleFetcher with API details and configuration.
         :param url_base: The base URL of the API.
         :param schedule_path: The file path to store the game schedule CSV.
         :param debug: Enable or disable debug logging.
+        :param session: The HTTP session, can be shared by the fetchers of several leagues.
+        :param cache_dir: Directory of the cached responses. No cache if None.
+        :param max_workers: Number of concurrent requests.
         """
         self.url_base = url_base
         self.schedule_path = schedule_path
         self.debug = debug
+        self.session = session or create_session(max_workers)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.games = None               # {(Date, Home abbrev, Away abbrev): game}, loaded on first merge
+        self.changed = False
+        self.stats = {"requests": 0, "not_modified": 0}
+        self.stats_lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
 
     def debug_log(self, message: str):
         """
@@ -28,6 +70,10 @@ class ScheduleFetcher:
         if self.debug:
             print(f"[DEBUG] {message}")
 
+    # ------------------------------ fetch -----------------------------------------------------------------------------
+    def _get_cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
     def fetch_json(self, date: str) -> dict:
         """
         Fetches the game schedule JSON for the specified date.
@@ -36,11 +82,30 @@ class ScheduleFetcher:
         """
         url = f"{self.url_base}/{date}/"
         self.debug_log(f"Fetching JSON data from URL: {url}")
+
+        cached = None
+        headers = {}
+        if self.cache_dir and os.path.exists(self._get_cache_path(url)):
+            with open(self._get_cache_path(url), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, headers=headers, timeout=10)
+            not_modified = response.status_code == 304 and cached is not None
+            with self.stats_lock:
+                self.stats["requests"] += 1
+                self.stats["not_modified"] += not_modified
+            if not_modified:
+                self.debug_log("JSON data not modified, cached response used.")
+                return cached["data"]
+
             response.raise_for_status()  # Raise an exception for HTTP errors
+            data = response.json()
             self.debug_log("JSON data fetched successfully.")
-            return response.json()
         except requests.Timeout:
             self.debug_log("Request timed out.")
             raise RuntimeError(f"Timeout error while fetching data from {url}")
@@ -48,6 +113,40 @@ class ScheduleFetcher:
             self.debug_log(f"Error fetching data: {e}")
             raise RuntimeError(f"HTTP error occurred while fetching data from {url}: {e}")
 
+        if self.cache_dir and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            cache_path = self._get_cache_path(url)
+            with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                           "data": data}, f)
+            os.replace(cache_path + ".tmp", cache_path)
+        return data
+
+    def get_week_dates(self, start_date: str, end_date: str) -> list:
+        """
+        Returns the first day of every game week between two dates (included).
+        """
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+        dates = []
+        while start <= end:
+            dates.append(start.strftime("%Y-%m-%d"))
+            start += datetime.timedelta(days=self.WEEK_DAYS)
+        return dates
+
+    def fetch_range(self, start_date: str, end_date: str) -> list:
+        """
+        Fetches the games of a date range, one request per game week, concurrently.
+        :return: A list of dictionaries, each representing a game, sorted by date.
+        """
+        dates = self.get_week_dates(start_date, end_date)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            responses = list(executor.map(self.fetch_json, dates))
+
+        games = []
+        for data in responses:
+            games += [game for game in self.extract_games(data) if start_date <= game["Date"] <= end_date]
+        return games
+
     def extract_games(self, data: dict) -> list:
         """
         Extracts game details from the JSON response.
@@ -79,46 +178,114 @@ class ScheduleFetcher:
             self.debug_log(f"Error processing JSON data: {e}")
             raise RuntimeError("An error occurred while processing the JSON data.")
 
-    def update_schedule_csv(self, new_games: list):
+    # ------------------------------ schedule --------------------------------------------------------------------------
+    def _load_schedule(self):
+        self.games = {}
+        if not os.path.exists(self.schedule_path):
+            return
+        try:
+            old_games_df = pd.read_csv(self.schedule_path, dtype=str, keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            self.debug_log("The CSV file is empty or corrupted. Creating a new file.")
+            return
+        for game in old_games_df.to_dict("records"):
+            self.games[tuple(game[column] for column in GAME_KEY)] = game
+
+    def merge_games(self, new_games: list) -> int:
         """
-        Updates or creates a CSV file with the game schedule.
-        :param new_games: The list of new game data to update.
+        Merges games into the schedule kept in memory: a game is identified by its date and teams,
+        and a rescheduled game (new start time or venue) replaces the old one.
+        :param new_games: The list of new game data.
+        :return: The number of new or updated games.
         """
-        self.debug_log("Updating the schedule CSV file...")
-        try:
-            new_games_df = pd.DataFrame(new_games)
+        if self.games is None:
+            self._load_schedule()
 
-            # Check if the CSV file exists
-            if os.path.exists(self.schedule_path):
-                old_games_df = pd.read_csv(self.schedule_path)
-                updated_df = pd.concat([old_games_df, new_games_df]).drop_duplicates()
-            else:
-                updated_df = new_games_df
+        nb_updates = 0
+        for game in new_games:
+            key = tuple(game[column] for column in GAME_KEY)
+            if self.games.get(key) != game:
+                self.games[key] = game
+                nb_updates += 1
+        self.changed |= nb_updates > 0
+        return nb_updates
 
-            updated_df.to_csv(self.schedule_path, index=False)
+    def save_schedule(self):
+        """
+        Writes the schedule CSV if it changed since the last save.
+        """
+        if not self.changed:
+            self.debug_log("Schedule unchanged, CSV not written.")
+            return
+        try:
+            games = sorted(self.games.values(), key=lambda game: (game["Date"], game["Start Time (UTC)"]))
+            pd.DataFrame(games, columns=SCHEDULE_COLUMNS).to_csv(self.schedule_path + ".tmp", index=False)
+            os.replace(self.schedule_path + ".tmp", self.schedule_path)
+            self.changed = False
             self.debug_log(f"Schedule CSV updated successfully at {self.schedule_path}.")
-        except pd.errors.EmptyDataError:
-            self.debug_log("The CSV file is empty or corrupted. Creating a new file.")
-            new_games_df.to_csv(self.schedule_path, index=False)
         except Exception as e:
             self.debug_log(f"Error updating the schedule CSV: {e}")
             raise RuntimeError(f"An error occurred while updating the CSV file: {e}")
 
-    def run(self, date: str):
+    def update_schedule_csv(self, new_games: list):
         """
-        Fetches, extracts, and updates the schedule for the specified date.
+        Updates or creates a CSV file with the game schedule.
+        :param new_games: The list of new game data to update.
+        """
+        self.debug_log("Updating the schedule CSV file...")
+        self.merge_games(new_games)
+        self.save_schedule()
+
+    def run(self, date: str, end_date: str = None):
+        """
+        Fetches, extracts, and updates the schedule for the specified date, or date range.
         :param date: The date in 'YYYY-MM-DD' format.
+        :param end_date: Optional last date of the range in 'YYYY-MM-DD' format.
         """
         try:
             self.debug_log("Starting the schedule fetching process...")
-            json_data = self.fetch_json(date)
-            games = self.extract_games(json_data)
+            if end_date is None:
+                games = self.extract_games(self.fetch_json(date))
+            else:
+                games = self.fetch_range(date, end_date)
             self.update_schedule_csv(games)
             self.debug_log("Schedule fetching process completed successfully.")
         except RuntimeError as e:
             self.debug_log(f"Process failed: {e}")
 
 
+def refresh_schedules(leagues: dict, start_date: str, end_date: str, cache_dir: str = None, max_workers: int = 16,
+                      debug: bool = False) -> dict:
+    """
+    Refreshes the schedules of several leagues over a date range, all the requests sharing one
+    pooled session and running concurrently.
+
+    :param leagues: {league name: {"url_base": ..., "schedule_path": ...}}.
+    :param cache_dir: Directory of the cached responses, one sub-directory per league.
+    :param max_workers: Number of concurrent requests, shared by the leagues.
+    :return: {league name: number of new or updated games}.
+    """
+    session = create_session(max_workers)
+    league_workers = max(1, max_workers // len(leagues))
+    fetchers = {
+        league: ScheduleFetcher(settings["url_base"], settings["schedule_path"], debug, session,
+                                os.path.join(cache_dir, league) if cache_dir else None, league_workers)
+        for league, settings in leagues.items()
+    }
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+        games = dict(zip(fetchers, executor.map(lambda f: f.fetch_range(start_date, end_date), fetchers.values())))
+
+    updates = {}
+    for league, fetcher in fetchers.items():
+        updates[league] = fetcher.merge_games(games[league])
+        fetcher.save_schedule()
+    if debug:
+        print(f"[DEBUG] {len(fetchers)} schedules refreshed in {time.time() - start_time:.2f} s: {updates}")
+    return updates
+
+
 def main():
     """
     Main function to run the ScheduleFetcher for the current date.
@@ -1,9 +1,12 @@
-import datetime
+import time
 from bs4 import BeautifulSoup
 import os
 from utils.loaders import save_html
 from utils.class_logger import Logger
 from utils.class_webdriver import WebDriver
+from utils.class_changedetector import ChangeDetector
+from utils.class_eventbatch import EventBatch
+from utils import class_metrics as metrics
 
 
 class EventScraper:
@@ -28,6 +31,10 @@ class EventScraper:
 
         self.logger = Logger(self.get_bookmaker_name(), debug, self.datetime_format)
         self.webdriver = WebDriver(config, self.logger, self._get_driver_mode(), self.debug, self.timeout)
+        self.change_detector = ChangeDetector()
+        self.last_unchanged = False     # True if the last page was skipped by the change detector
+        self.last_failed = False        # True if the last page could not be fetched (empty batch, not an empty page)
+        self.last_error = None          # the error of the last failed fetch
 
     def _get_driver_mode(self) -> str:
         return self.config["bookmakers"][self.get_bookmaker_name()]["mode"]
@@ -36,56 +43,120 @@ class EventScraper:
         if "actions" in self.config["bookmakers"][self.get_bookmaker_name()].keys():
             return self.config["bookmakers"][self.get_bookmaker_name()]["actions"]
 
-    def extract_event_data(self, keys, url) -> list:
+    def extract_event_data(self, keys, url) -> EventBatch:
         """
         Extracts event data by invoking subclass-specific methods.
         :param: keys is a dictionary of all the filter name
         :param: url is the link associated to the keys
-        :return: event_data, a list of dictionaries containing event data.
+        :return: event_data, an EventBatch of the events of the page (empty on error or if unchanged, see
+            'last_failed' and 'last_unchanged').
         """
-        event_data = []
+        bookmaker = self.get_bookmaker_name()
+        event_data = EventBatch(bookmaker, keys, url)
+        self.last_unchanged = False
+        self.last_failed = False
+        self.last_error = None
 
         try:
             soup = self.webdriver.fetch_html(url, actions=self.actions)
-            events = self._get_events(soup)
-            self.logger.info_log(f"Found {len(events)} events.")
+            fetch_time = time.time()
+            events = self._get_events(soup, url)
         except Exception as e:
             self.logger.error_log(f"Unexpected error while collecting events: {e}")
+            self._set_failed(e)
             return event_data
 
-        for index, event in enumerate(events, start=1):
+        if isinstance(events, list):
+            self.logger.info_log(f"Found {len(events)} events.")
+            # skip the parsing and the storage if the events are the same as the last fetch
+            blocks = [self._get_event_block(event) for event in events]
+            if not self._has_changed(url, blocks):
+                return event_data
+
+            # one scrape time for the whole page
+            event_data.scrapping_time = time.strftime(self.datetime_format)
+            with self.logger.span("extract", url=url, events=len(events)):
+                for index, event in enumerate(events, start=1):
+                    self._parse_event(event_data, index, event, fetch_time)
+            nb_events = len(events)
+        else:
+            # lazy events (a generator, e.g. one page per event): each one is parsed and released as
+            # soon as it is fetched, with its own fetch time, the change is checked once they are all seen
+            blocks = []
+            event_data.scrapping_time = time.strftime(self.datetime_format)
             try:
-                teams = self._get_teams(event)
-                date = self._get_match_time(event)
-                odds = self._get_odds(event)
-
-                data = {
-                    "Bookmaker": self.get_bookmaker_name(),
-                    "Sport Unparse": keys["sport"],
-                    "Category Unparse": keys["category"],
-                    "Tournament Unparse": keys["tournament"],
-                    "Home Team Unparse": teams["home"],
-                    "Away Team Unparse": teams["away"],
-                    "Home Odd": odds["home"],
-                    "Draw Odd": odds["draw"],
-                    "Away Odd": odds["away"],
-                    "Date Unparse": date,
-                    "scrapping_time": datetime.datetime.now().strftime(self.datetime_format),
-                    "url": url,
-                }
-                event_data.append(data)
-                # self.logger.info_log(f"Processed event {index}: {data}")
-
-            except KeyError as key_err:
-                self.logger.debug_log(f"Missing key in event {index}: {key_err}")
+                with self.logger.span("extract", url=url):
+                    for index, event in enumerate(events, start=1):
+                        blocks.append(self._get_event_block(event))
+                        self._parse_event(event_data, index, event, time.time())
             except Exception as e:
-                self.logger.debug_log(f"Error processing event {index}: {e}")
-
+                self.logger.error_log(f"Unexpected error while collecting events: {e}")
+                self._set_failed(e)
+                return EventBatch(bookmaker, keys, url)
+            nb_events = len(blocks)
+            self.logger.info_log(f"Found {nb_events} events.")
+            if not self._has_changed(url, blocks):
+                return EventBatch(bookmaker, keys, url)
+
+        metrics.EVENTS_PARSED.inc(len(event_data), bookmaker=bookmaker)
+        metrics.EVENTS_FAILED.inc(nb_events - len(event_data), bookmaker=bookmaker)
+        if event_data:
+            metrics.NEWEST_ODDS.set(time.time(), bookmaker=bookmaker)
+            metrics.NEWEST_ODDS_AGE.set(time.time(), bookmaker=bookmaker)
         return event_data
 
-    def _get_events(self, soup):
+    def close(self):
+        """
+        Closes the browser session and the http client of the scraper.
+        """
+        self.webdriver.close()
+
+    def _set_failed(self, error: Exception):
+        self.last_failed = True
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def _has_changed(self, url: str, blocks: list) -> bool:
+        bookmaker = self.get_bookmaker_name()
+        if self.change_detector.has_changed(bookmaker, url, blocks):
+            return True
+        self.last_unchanged = True
+        # the odds of the last extraction are confirmed
+        metrics.NEWEST_ODDS.set(time.time(), bookmaker=bookmaker)
+        metrics.NEWEST_ODDS_AGE.set(time.time(), bookmaker=bookmaker)
+        self.logger.info_log(f"Events unchanged since the last fetch, skipped "
+                             f"(hit ratio {self.change_detector.get_hit_ratio(bookmaker):.0%}).")
+        return False
+
+    def _parse_event(self, event_data: EventBatch, index: int, event, fetch_time: float):
+        """
+        Parses an event element and appends it to the batch. The errors are logged and the event skipped.
+        """
+        try:
+            teams = self._get_teams(event)
+            date = self._get_match_time(event)
+            odds = self._get_odds(event)
+            event_data.append(teams["home"], teams["away"], odds["home"], odds["draw"], odds["away"], date,
+                              fetch_time)
+            # self.logger.info_log(f"Processed event {index}: {teams}")
+
+        except KeyError as key_err:
+            self.logger.debug_log("Missing key in event %s: %s", index, key_err)
+        except Exception as e:
+            self.logger.debug_log("Error processing event %s: %s", index, e)
+
+    def _get_event_block(self, event) -> str:
+        """
+        Returns the part of an event element that identifies its content (teams, date and odds).
+        Can be overridden in subclasses when the event element holds volatile markup.
         """
-        Finds and returns all event elements. Should be overridden in subclasses.
+        return str(event)
+
+    def _get_events(self, soup, url: str):
+        """
+        Finds and returns all event elements, as a list or as a generator when each event needs its own
+        fetch. Should be overridden in subclasses.
+
+        :param url: The url of the page.
         """
         raise NotImplementedError("Subclasses must implement `_get_events`.")
 
@@ -0,0 +1,241 @@
+import os
+import math
+import time
+import heapq
+import datetime
+from utils.loaders import load_json, save_json
+from utils.class_mapper import Mapper
+from utils.class_logger import Logger
+from utils.class_eventbatch import EventBatch, EventRecord
+
+
+class TournamentState:
+    """
+    The scraping statistics of one tournament url of one bookmaker.
+    """
+
+    def __init__(self, bookmaker: str, keys: dict, url: str):
+        self.bookmaker = bookmaker
+        self.keys = keys
+        self.url = url
+        self.next_run = 0.0
+        self.last_run = None
+        self.nb_events = None           # None until the first scrape
+        self.next_kickoff = None        # days until the closest event
+        self.volatility = 0.0           # moving average of the implied probability changes
+        self.arbitrage_hits = 0.0       # decayed count of the arbitrages found
+        self.last_odds = {}             # {"home - away": implied probabilities}
+        self.failures = 0               # consecutive failed fetches
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TournamentState":
+        state = cls(data["bookmaker"], data["keys"], data["url"])
+        state.__dict__.update(data)
+        return state
+
+
+class ScrapeScheduler:
+    """
+    A long-running scheduler of the tournament scrapes.
+
+    Every tournament url of the bookmaker catalogues is kept in a priority queue ordered by its
+    next run time. After each scrape the tournament is scored from its upcoming kickoffs, its odds
+    volatility, its past arbitrage hits and its number of events: the hot tournaments come back
+    after 'min_interval', the empty ones after 'max_interval'. A failed fetch leaves the statistics
+    as they are and is retried after 'min_interval', doubled at each consecutive failure.
+    """
+
+    WEIGHTS = {"kickoff": 0.4, "volatility": 0.25, "arbitrage": 0.2, "events": 0.15}
+
+    def __init__(self, config: dict, scrapers: dict, on_events=None, on_unchanged=None, debug: bool = False):
+        """
+        :param config: The bookmaker configuration.
+        :param scrapers: {bookmaker name: EventScraper}.
+        :param on_events: Callback on_events(bookmaker, url, events) called after each scrape, with the EventBatch.
+            It returns the number of arbitrages found with these events (or None).
+        :param on_unchanged: Callback on_unchanged(events) called after a scrape skipped by the change detector,
+            with the empty EventBatch of the page (bookmaker, url and fetch time).
+        :param debug: Enable or disable debug logging.
+        """
+        self.config = config
+        self.scrapers = scrapers
+        self.on_events = on_events
+        self.on_unchanged = on_unchanged
+        self.logger = Logger("Scheduler", debug)
+        self.mapper = Mapper(config["path"]["mapping"])
+
+        scheduler_config = config.get("scheduler", {})
+        self.min_interval = scheduler_config.get("min_interval", 300)
+        self.max_interval = scheduler_config.get("max_interval", 86400)
+        self.state_path = scheduler_config.get("state", "data/scheduler_state.json")
+        self.volatility_scale = scheduler_config.get("volatility_scale", 0.02)
+        self.arbitrage_decay = scheduler_config.get("arbitrage_decay", 0.9)
+        self.hot_score = scheduler_config.get("hot_score", 0.5)
+
+        self.states = {}
+        self.queue = []
+        self._load_states()
+        self._load_catalogues()
+
+    # ------------------------------ queue -----------------------------------------------------------------------------
+    def _load_catalogues(self):
+        """
+        Adds the tournaments of the url catalogues that are not tracked yet, and drops the removed ones.
+        """
+        catalogue_urls = set()
+        for bookmaker in self.scrapers:
+            dict_urls = load_json(self.config["bookmakers"][bookmaker]["url_path"])
+            for sport_name in dict_urls.keys():
+                for category_name in dict_urls[sport_name].keys():
+                    for tournament_name, url in dict_urls[sport_name][category_name].items():
+                        keys = {"sport": sport_name, "category": category_name, "tournament": tournament_name}
+                        catalogue_urls.add((bookmaker, url))
+                        if (bookmaker, url) not in self.states:
+                            self.states[(bookmaker, url)] = TournamentState(bookmaker, keys, url)
+
+        self.states = {key: state for key, state in self.states.items() if key in catalogue_urls}
+        self.queue = [(state.next_run, key) for key, state in self.states.items()]
+        heapq.heapify(self.queue)
+        self.logger.info_log(f"{len(self.queue)} tournaments scheduled.")
+
+    def _load_states(self):
+        if os.path.exists(self.state_path):
+            for data in load_json(self.state_path):
+                state = TournamentState.from_dict(data)
+                self.states[(state.bookmaker, state.url)] = state
+
+    def save_states(self):
+        save_json(self.state_path, [state.to_dict() for state in self.states.values()])
+
+    # ------------------------------ scoring ---------------------------------------------------------------------------
+    def _implied_probabilities(self, event: EventRecord) -> list:
+        # a missing odd is nan, and nan > 0 is False
+        return [1 / odd for odd in (event.home_odd, event.draw_odd, event.away_odd) if odd > 0]
+
+    def update_state(self, state: TournamentState, events: EventBatch, nb_arbitrages: int = 0):
+        """
+        Updates the statistics of a tournament with the events of its last scrape.
+        """
+        state.nb_events = len(events)
+        state.arbitrage_hits = state.arbitrage_hits * self.arbitrage_decay + (nb_arbitrages or 0)
+
+        kickoffs = []
+        changes = []
+        last_odds = {}
+        for event in events:
+            try:
+                date = self.mapper.map_date_unparse(event.bookmaker, event.date, event.scrapping_time)
+                days = (datetime.datetime.strptime(date, self.mapper.date_format).date() - datetime.date.today()).days
+                kickoffs.append(max(days, 0))
+            except Exception as e:
+                self.logger.debug_log("Unparsed date '%s': %s", event.date, e)
+
+            name = f"{event.home_team} - {event.away_team}"
+            last_odds[name] = self._implied_probabilities(event)
+            previous = state.last_odds.get(name)
+            if previous and len(previous) == len(last_odds[name]):
+                changes.append(max(abs(a - b) for a, b in zip(previous, last_odds[name])))
+
+        state.next_kickoff = min(kickoffs) if kickoffs else None
+        if changes:
+            state.volatility = 0.5 * state.volatility + 0.5 * sum(changes) / len(changes)
+        state.last_odds = last_odds
+
+    def score(self, state: TournamentState) -> float:
+        """
+        Scores a tournament between 0 (cold) and 1 (hot).
+        """
+        if state.nb_events is None:
+            # never scraped: as hot as possible to learn about it
+            return 1.0
+        if state.nb_events == 0:
+            return 0.0
+
+        scores = {
+            "kickoff": 1 / (1 + state.next_kickoff) if state.next_kickoff is not None else 0.0,
+            "volatility": min(state.volatility / self.volatility_scale, 1.0),
+            "arbitrage": 1 - math.exp(-state.arbitrage_hits),
+            "events": min(math.log1p(state.nb_events) / math.log1p(20), 1.0),
+        }
+        return sum(self.WEIGHTS[name] * value for name, value in scores.items())
+
+    def get_retry_interval(self, state: TournamentState) -> float:
+        """
+        Returns the delay before retrying a tournament whose last fetches failed.
+        """
+        return min(self.min_interval * 2 ** (state.failures - 1), self.max_interval)
+
+    def get_interval(self, state: TournamentState) -> float:
+        """
+        Returns the delay before the next scrape, from 'max_interval' (score 0) to 'min_interval'
+        (score 'hot_score' and above) on a log scale.
+        """
+        ratio = min(self.score(state) / self.hot_score, 1.0)
+        return self.max_interval * (self.min_interval / self.max_interval) ** ratio
+
+    # ------------------------------ service ---------------------------------------------------------------------------
+    def run_once(self) -> TournamentState:
+        """
+        Waits for the next due tournament, scrapes it and schedules it again.
+        """
+        next_run, key = heapq.heappop(self.queue)
+        state = self.states[key]
+        delay = next_run - time.time()
+        if delay > 0:
+            self.logger.debug_log("Next scrape in %.0f s: %s %s", delay, state.bookmaker, state.url)
+            time.sleep(delay)
+
+        scraper = self.scrapers[state.bookmaker]
+        events = scraper.extract_event_data(state.keys, state.url)
+        if getattr(scraper, "last_failed", False):
+            # the page could not be fetched: nothing is known about the tournament, retry soon
+            state.failures += 1
+            state.last_run = time.time()
+            state.next_run = state.last_run + self.get_retry_interval(state)
+            heapq.heappush(self.queue, (state.next_run, key))
+            self.logger.info_log(f"{state.bookmaker} {state.url}: fetch failed {state.failures} time(s), "
+                                 f"retry in {state.next_run - state.last_run:.0f} s")
+            return state
+
+        state.failures = 0
+        if getattr(scraper, "last_unchanged", False):
+            # same events as the last scrape: the odds did not move
+            state.volatility *= 0.5
+            if self.on_unchanged:
+                self.on_unchanged(events)
+        else:
+            nb_arbitrages = self.on_events(state.bookmaker, state.url, events) if self.on_events else 0
+            self.update_state(state, events, nb_arbitrages)
+
+        state.last_run = time.time()
+        state.next_run = state.last_run + self.get_interval(state)
+        heapq.heappush(self.queue, (state.next_run, key))
+        self.logger.info_log(f"{state.bookmaker} {state.url}: {state.nb_events} events, "
+                             f"score {self.score(state):.2f}, next scrape in {state.next_run - state.last_run:.0f} s")
+        return state
+
+    def run_forever(self, save_every: int = 20, reload_every: float = 3600):
+        """
+        Runs the scheduler until interrupted.
+
+        :param save_every: Save the tournament states every 'save_every' scrapes.
+        :param reload_every: Reload the url catalogues every 'reload_every' seconds.
+        """
+        nb_runs = 0
+        last_reload = time.time()
+        try:
+            while self.queue:
+                self.run_once()
+                nb_runs += 1
+                if nb_runs % save_every == 0:
+                    self.save_states()
+                if time.time() - last_reload > reload_every:
+                    self._load_catalogues()
+                    last_reload = time.time()
+        except KeyboardInterrupt:
+            self.logger.info_log("Scheduler stopped.")
+        finally:
+            self.save_states()
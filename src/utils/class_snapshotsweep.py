@@ -0,0 +1,106 @@
+import time
+import datetime
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from utils.class_logger import Logger
+
+
+class SnapshotSweep:
+    """
+    Scrapes the pages of the same matched events on all the bookmakers at the same time.
+
+    The matched events (linked rows of the database) are reduced to their set of pages, one page
+    per bookmaker: a snapshot. The pages of a snapshot are fetched in parallel, one thread per
+    bookmaker, and every event scraped gets the snapshot id and its offset: the seconds between the
+    start of the snapshot and the fetch of the page holding the event (its own page for the
+    bookmakers with one page per event). The skew of a matched event is the spread of the offsets of
+    its legs: the arbitrage detection only compares the odds of one snapshot whose skew is small enough.
+    """
+
+    def __init__(self, scrapers: dict, debug: bool = False):
+        """
+        :param scrapers: {bookmaker name: EventScraper}.
+        :param debug: Enable or disable debug logging.
+        """
+        self.scrapers = scrapers
+        self.logger = Logger("Sweep", debug)
+
+    def plan(self, data: pd.DataFrame, linked_events: dict) -> list:
+        """
+        Returns the snapshots to take to refresh the matched events.
+
+        :param data: The database.
+        :param linked_events: {group_id: [[row index]]}, see standardisation.group_events.
+        :return: [{bookmaker: (keys, url)}] of at least two bookmakers, without duplicates.
+        """
+        snapshots = {}
+        for linked_event in linked_events.values():
+            for indices in linked_event:
+                pages = {}
+                for _, row in data.loc[indices].iterrows():
+                    if row["Bookmaker"] not in self.scrapers or pd.isna(row["url"]):
+                        continue
+                    keys = {"sport": row["Sport Unparse"], "category": row["Category Unparse"],
+                            "tournament": row["Tournament Unparse"]}
+                    pages[row["Bookmaker"]] = (keys, row["url"])
+                if len(pages) >= 2:
+                    # the pages of a tournament hold many matched events: one snapshot for all of them
+                    snapshots.setdefault(tuple(sorted((bookmaker, url) for bookmaker, (_, url) in pages.items())), pages)
+        return list(snapshots.values())
+
+    def _scrape(self, bookmaker: str, keys: dict, url: str) -> tuple:
+        scraper = self.scrapers[bookmaker]
+        # a snapshot needs the events even if the page did not change
+        scraper.change_detector.forget(url)
+        start_time = time.time()
+        return start_time, scraper.extract_event_data(keys, url)
+
+    def take_snapshot(self, pages: dict, snapshot_id: str) -> list:
+        """
+        Fetches the pages of one snapshot in parallel.
+
+        :param pages: {bookmaker: (keys, url)}.
+        :param snapshot_id: The id given to the events.
+        :return: The EventBatch of each page, with their 'snapshot_id' and 'snapshot_start'.
+        """
+        with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+            futures = [executor.submit(self._scrape, bookmaker, keys, url) for bookmaker, (keys, url) in pages.items()]
+            results = [future.result() for future in futures]
+
+        start_time = min(start for start, _ in results)
+        batches = []
+        for _, batch in results:
+            batch.snapshot_id = snapshot_id
+            batch.snapshot_start = start_time
+            batches.append(batch)
+        self.logger.info_log("Snapshot %s: %s events from %s pages, span %.1f s.", snapshot_id,
+                             sum(len(batch) for batch in batches), len(pages), self.get_span(batches))
+        return batches
+
+    @staticmethod
+    def get_span(batches: list) -> float:
+        """
+        Returns the seconds between the start of a snapshot and its last event fetched. The skew of
+        each matched event is at most this span.
+        """
+        offsets = [offset for batch in batches for offset in batch.get_snapshot_offsets() or [] if offset == offset]
+        return round(max(offsets), 3) if offsets else 0.0
+
+    def run(self, snapshots: list, on_events=None) -> list:
+        """
+        Takes the snapshots one after the other.
+
+        :param snapshots: [{bookmaker: (keys, url)}], see plan.
+        :param on_events: Optional callback on_events(snapshot_id, batches) after each snapshot.
+        :return: The spans of the snapshots, see get_span.
+        """
+        sweep_id = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        spans = []
+        for index, pages in enumerate(snapshots):
+            snapshot_id = f"{sweep_id}-{index:04d}"
+            batches = self.take_snapshot(pages, snapshot_id)
+            if any(batches):
+                spans.append(self.get_span(batches))
+            if on_events:
+                on_events(snapshot_id, batches)
+        return spans
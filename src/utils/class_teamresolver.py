@@ -0,0 +1,93 @@
+import numpy as np
+from utils.class_mapper import Mapper
+from utils.class_embeddingcache import EmbeddingCache
+
+
+class TeamResolver:
+    """
+    Batch resolver of the unknown team names.
+
+    All the team names the Mapper does not know are embedded in one batch and compared with the
+    known names (standard names and their variations) through a single similarity matrix. The
+    matches above the threshold are added to the mapping, which is saved once at the end.
+    """
+
+    def __init__(self, mapper: Mapper, cache: EmbeddingCache, threshold: float = 0.85):
+        """
+        :param mapper: The Mapper to update.
+        :param cache: The embedding cache.
+        :param threshold: Minimum cosine similarity to accept a match automatically.
+        """
+        self.mapper = mapper
+        self.cache = cache
+        self.threshold = threshold
+
+    def get_unmapped(self, sport: str, team_names: list) -> list:
+        """
+        Returns the unique team names that the Mapper can't map.
+        """
+        unmapped = []
+        for team_name in dict.fromkeys(team_names):
+            try:
+                self.mapper.map_team_name(sport, team_name)
+            except ValueError:
+                unmapped.append(team_name)
+        return unmapped
+
+    def _get_known_names(self, sport: str) -> (list, list):
+        """
+        Returns the known names of a sport and, for each one, its standard name.
+        """
+        texts, standard_names = [], []
+        for standard_name, variations in self.mapper.team_mapper.get(sport, {}).items():
+            # standard names look like "ANA - Mighty Ducks of Anaheim/Anaheim Ducks"
+            full_name = standard_name.split(" - ", 1)[-1]
+            for text in [standard_name] + full_name.split("/") + (variations or []):
+                texts.append(text)
+                standard_names.append(standard_name)
+        return texts, standard_names
+
+    def resolve(self, sport: str, team_names: list) -> (dict, dict):
+        """
+        Maps the unknown team names to the closest standard names.
+
+        :param sport: The sport category of the mapping (e.g., NHL, AHL).
+        :param team_names: The team names to resolve.
+        :return: (accepted, rejected), two dicts {team name: (standard name, similarity)}.
+        """
+        unmapped = self.get_unmapped(sport, team_names)
+        known_texts, standard_names = self._get_known_names(sport)
+        if not unmapped or not known_texts:
+            return {}, {name: (None, 0.0) for name in unmapped}
+
+        embeddings = self.cache.encode(unmapped + known_texts)
+        similarities = embeddings[:len(unmapped)] @ embeddings[len(unmapped):].T
+        best = similarities.argmax(axis=1)
+        best_similarities = similarities[np.arange(len(unmapped)), best]
+
+        accepted, rejected = {}, {}
+        for team_name, index, similarity in zip(unmapped, best, best_similarities):
+            match = (standard_names[index], float(similarity))
+            if similarity >= self.threshold:
+                accepted[team_name] = match
+                self.mapper._add_mapping(sport, standard_names[index], team_name, save=False)
+            else:
+                rejected[team_name] = match
+
+        if accepted:
+            self.mapper.save_mapper()
+        print(f"[INFO] Team resolver: {len(accepted)} team names mapped, {len(rejected)} left for review")
+        for team_name, (standard_name, similarity) in rejected.items():
+            print(f"[INFO] Unresolved team name '{team_name}', closest '{standard_name}' ({similarity:.2f})")
+
+        return accepted, rejected
+
+
+if __name__ == "__main__":
+    from utils.class_databasemanager import DatabaseManager
+
+    db = DatabaseManager("../../data/database.csv")
+    mapper = Mapper("../../data/mapping.yml")
+    cache = EmbeddingCache("../../data/embeddings", "../models/all-MiniLM-L6-v2")
+
+    db.standardise_team_names("NHL", mapper, TeamResolver(mapper, cache))
@@ -1,26 +1,45 @@
 import time
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from playwright.sync_api import sync_playwright
-import playwright._impl._errors as playwright_error
 from utils.class_logger import Logger
-from utils.loaders import save_html
+from utils.class_fetchpolicy import FetchPolicy, CircuitOpenError
+from utils.class_pagearchive import get_archive
+from utils import class_metrics as metrics
 
 
 class WebDriver:
     """
-    A class to handle web scraping using Selenium and Playwright.
+    A class to handle web scraping using Selenium and Playwright, or a plain HTTP client for the
+    bookmakers whose pages hold the odds without running JavaScript.
     """
 
-    def __init__(self, config, logger, mode="playwright", debug=False, timeout=5000):
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) " \
+                 "Chrome/114.0.0.0 Safari/537.36"
+    HTTP_POOL_SIZE = 4          # keep-alive connections per host in 'http' mode
+
+    # in-app navigation: marks the events of the current page, then routes the app to the url
+    NAVIGATE_SCRIPT = """([url, selector]) => {
+        document.querySelectorAll(selector).forEach(node => node.setAttribute("data-stale", ""));
+        history.pushState(history.state, "", url);
+        window.dispatchEvent(new PopStateEvent("popstate", {state: history.state}));
+    }"""
+
+    def __init__(self, config, logger, mode="playwright", debug=False, timeout=5000, fetch_policy=None):
         """
         Initializes the WebDriver.
 
         :param config: Configuration dictionary for paths and settings.
-        :param mode: The mode of operation ('selenium' or 'playwright').
+        :param mode: The mode of operation ('selenium', 'playwright' or 'http').
         :param debug: Whether to enable debug logging and headless mode.
         :param timeout: Timeout in milliseconds for page interactions.
+        :param fetch_policy: The retry, circuit breaker and rate limiting policy. Built from the
+            'fetch_policy' sections of the config if None.
+
+        In 'playwright' mode, a 'navigation' section in the config of the bookmaker keeps one page
+        open: the next urls are opened by the client-side routing of the site instead of a full load.
         """
 
         self.config = config
@@ -28,38 +47,79 @@ class WebDriver:
         self.mode = mode
         self.debug = debug
         self.timeout = timeout
+        self.fetch_policy = fetch_policy or FetchPolicy.from_config(config, logger.bookmaker)
+        archive_path = config.get("path", {}).get("archive")
+        self.archive = get_archive(archive_path) if archive_path else None
+        self.http_client = None         # opened on the first fetch in 'http' mode, then reused
+        self.http_timeouts = ()         # timeout exceptions of the http client
+        self.navigation = config.get("bookmakers", {}).get(logger.bookmaker, {}).get("navigation")
+        self.session = None             # the page kept open for the in-app navigation, see _run_navigator
+        self.navigator = None           # (thread, task queue) of the in-app navigation
+        self.navigator_lock = threading.Lock()
 
     def fetch_html(self, url: str, actions: list = None) -> BeautifulSoup:
         """
-        Fetches HTML content from a URL using the specified mode.
+        Fetches HTML content from a URL using the specified mode, with the retries, circuit
+        breaker and rate limiting of the fetch policy.
 
         :param url: The URL to fetch content from.
         :param actions: Optional list of actions to perform on the page.
         :return: A BeautifulSoup object of the fetched HTML.
         :raises ValueError: If HTML content is empty.
+        :raises CircuitOpenError: If the bookmaker kept failing and its circuit breaker is open.
         """
+        bookmaker = self.logger.bookmaker
         try:
-            self.logger.info_log(f"Fetching data from {url} using {self.mode}...")
+            return self.fetch_policy.call(
+                url, lambda u: self._fetch_html_once(u, actions), self.logger,
+                on_retry=lambda attempt, e: metrics.FETCH_RETRIES.inc(bookmaker=bookmaker))
+        except CircuitOpenError as e:
+            metrics.FETCH_TOTAL.inc(bookmaker=bookmaker, status="circuit_open")
+            self.logger.debug_log("%s", e)
+            raise
+
+    def _fetch_html_once(self, url: str, actions: list = None) -> BeautifulSoup:
+        """
+        Fetches HTML content from a URL once.
+        """
+        bookmaker = self.logger.bookmaker
+        fetched = False
+        try:
+            self.logger.info_log("Fetching data from %s using %s...", url, self.mode)
             start_time = time.time()
 
-            if self.mode == "selenium":
-                html = self._fetch_with_selenium(url)
-            elif self.mode == "playwright":
-                html = self._fetch_with_playwright(url, actions)
-            else:
-                raise ValueError(f"Unsupported mode: {self.mode}")
+            with self.logger.span("fetch", url=url, mode=self.mode):
+                if self.mode == "selenium":
+                    html = self._fetch_with_selenium(url)
+                elif self.mode == "playwright" and self.navigation:
+                    html = self._fetch_with_navigation(url, actions)
+                elif self.mode == "playwright":
+                    html = self._fetch_with_playwright(url, actions)
+                elif self.mode == "http":
+                    html = self._fetch_with_http(url, actions)
+                else:
+                    raise ValueError(f"Unsupported mode: {self.mode}")
 
             if not html:
                 raise ValueError("HTML content is empty.")
+            if self.archive is not None:
+                self.archive.put(bookmaker, url, html)
 
-            self.logger.info_log(f"HTML fetched successfully in {time.time() - start_time:.2f} seconds.")
-            return BeautifulSoup(html, "html.parser")
+            fetched = True
+            metrics.FETCH_SECONDS.observe(time.time() - start_time, bookmaker=bookmaker, mode=self.mode)
+            metrics.FETCH_TOTAL.inc(bookmaker=bookmaker, status="ok")
+            self.logger.info_log("HTML fetched successfully in %.2f seconds.", time.time() - start_time)
+            with self.logger.span("parse", url=url, size=len(html)):
+                return BeautifulSoup(html, "html.parser")
 
-        except playwright_error.TimeoutError as te:
-            self.logger.debug_log(f"Timeout error fetching HTML: {te}")
+        except TimeoutError as te:
+            metrics.FETCH_TOTAL.inc(bookmaker=bookmaker, status="timeout")
+            self.logger.debug_log("Timeout error fetching HTML: %s", te)
             raise TimeoutError(f"Timeout error fetching HTML: {te}")
         except Exception as e:
-            self.logger.debug_log(f"Error fetching HTML: {e}")
+            if not fetched:
+                metrics.FETCH_TOTAL.inc(bookmaker=bookmaker, status="error")
+            self.logger.debug_log("Error fetching HTML: %s", e)
             raise
 
     def _fetch_with_selenium(self, url: str) -> str:
@@ -70,6 +130,10 @@ class WebDriver:
         :return: The HTML content as a string.
         :raises Exception: For any Selenium-related errors.
         """
+        # the browser libraries are imported by the mode that uses them
+        from selenium import webdriver
+        from selenium.webdriver.firefox.service import Service
+
         try:
             service = Service(self.config["path"]["geckodriver"])
             options = webdriver.FirefoxOptions()
@@ -82,7 +146,7 @@ class WebDriver:
             driver.quit()
             return html
         except Exception as e:
-            self.logger.debug_log(f"Selenium error: {e}")
+            self.logger.debug_log("Selenium error: %s", e)
             raise
 
     def _fetch_with_playwright(self, url: str, actions: list) -> str:
@@ -92,13 +156,17 @@ class WebDriver:
         :param url: The URL to fetch content from.
         :param actions: Optional list of actions to perform on the page.
         :return: The HTML content as a string.
+        :raises TimeoutError: If the page or an action timed out.
         :raises Exception: For any Playwright-related errors.
         """
+        from playwright.sync_api import sync_playwright
+        import playwright._impl._errors as playwright_error
+
         with sync_playwright() as p:
             try:
                 browser = p.chromium.launch(headless=not self.debug, args=["--no-sandbox"])
                 context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+                    user_agent=self.USER_AGENT,
                     viewport={"width": 800, "height": 500},
                     locale="fr-FR",
                     timezone_id="Europe/Paris",
@@ -111,14 +179,214 @@ class WebDriver:
 
                 html = page.content()
                 return html
+            except playwright_error.TimeoutError as te:
+                raise TimeoutError(str(te))
             except Exception as e:
-                self.logger.debug_log(f"Playwright error: {e}")
+                self.logger.debug_log("Playwright error: %s", e)
                 raise
             finally:
                 page.close()
                 context.close()
                 browser.close()
 
+    def _fetch_with_http(self, url: str, actions: list = None) -> str:
+        """
+        Fetches the HTML served for a URL, without a browser. The connections are kept alive and
+        reused across the fetches of the bookmaker.
+
+        :param url: The URL to fetch content from.
+        :param actions: Ignored, there is no page to act on.
+        :return: The HTML content as a string.
+        :raises TimeoutError: If the request timed out.
+        :raises Exception: For any HTTP error status or client error.
+        """
+        if actions:
+            self.logger.debug_log("%s page actions ignored in http mode.", len(actions))
+        if self.http_client is None:
+            self.http_client = self._open_http_client()
+
+        try:
+            response = self.http_client.get(url, timeout=self.timeout / 1000)
+            response.raise_for_status()
+            return response.text
+        except self.http_timeouts as te:
+            raise TimeoutError(str(te))
+        except Exception as e:
+            self.logger.debug_log("HTTP error: %s", e)
+            raise
+
+    def _open_http_client(self):
+        """
+        Opens the http client: httpx with HTTP/2 when it is installed (with the 'h2' package),
+        a pooled requests session otherwise. Both negotiate the compressed encodings they can decode.
+        """
+        headers = {
+            "User-Agent": self.USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "fr-FR,fr;q=0.9",
+        }
+        try:
+            import httpx
+            import h2  # noqa: F401, required by httpx for HTTP/2
+        except ImportError:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers.update(headers)
+            adapter = HTTPAdapter(pool_connections=self.HTTP_POOL_SIZE, pool_maxsize=self.HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.http_timeouts = (requests.Timeout,)
+            self.logger.debug_log("HTTP client: requests session (HTTP/1.1).")
+            return session
+
+        self.http_timeouts = (httpx.TimeoutException,)
+        self.logger.debug_log("HTTP client: httpx (HTTP/2).")
+        return httpx.Client(http2=True, headers=headers, follow_redirects=True,
+                            limits=httpx.Limits(max_keepalive_connections=self.HTTP_POOL_SIZE))
+
+    def _fetch_with_navigation(self, url: str, actions: list) -> str:
+        """
+        Fetches HTML content using a Playwright page kept open between the fetches. The first url is
+        loaded (and the actions performed, e.g. the cookie consent), the next ones are opened by the
+        client-side routing of the site: only the event list is rendered again. Falls back to a full
+        load if the new events don't show up or the old ones don't go away.
+
+        The playwright objects can only be used by the thread that created them: the fetches of all the
+        threads are run one after the other by the navigator thread of the WebDriver, which owns the page.
+
+        :param url: The URL to fetch content from.
+        :param actions: Actions performed after the first load only.
+        :return: The HTML content as a string.
+        :raises TimeoutError: If the page or an action timed out.
+        :raises Exception: For any Playwright-related errors.
+        """
+        with self.navigator_lock:
+            if self.navigator is None:
+                tasks = queue.Queue()
+                thread = threading.Thread(target=self._run_navigator, args=(tasks,),
+                                          name=f"Navigator-{self.logger.bookmaker}", daemon=True)
+                thread.start()
+                self.navigator = (thread, tasks)
+                # the page is closed at exit if the WebDriver was not closed
+                atexit.register(self.close)
+            # under the lock: a task is never queued after the stop of its navigator
+            future = Future()
+            self.navigator[1].put((future, url, actions))
+        return future.result()
+
+    def _run_navigator(self, tasks: queue.Queue):
+        """
+        The navigator thread: opens, uses and closes the page of the in-app navigation, until close().
+        """
+        while True:
+            task = tasks.get()
+            if task is None:
+                self._close_session()
+                return
+            future, url, actions = task
+            try:
+                future.set_result(self._navigate(url, actions))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _navigate(self, url: str, actions: list) -> str:
+        import playwright._impl._errors as playwright_error
+
+        selector = self.navigation["event_selector"]
+        timeout = self.navigation.get("timeout", self.timeout)
+        try:
+            if self.session is None:
+                page = self._open_session()
+                page.goto(url, timeout=self.timeout)
+                if actions:
+                    self._perform_actions(page, actions)
+                self._wait_for_events(page, selector, timeout)
+            elif page_url_is(self.session["page"], url):
+                page = self.session["page"]
+                page.reload(timeout=self.timeout)
+                self._wait_for_events(page, selector, timeout)
+            else:
+                page = self.session["page"]
+                page.evaluate(self.NAVIGATE_SCRIPT, [url, selector])
+                # the events of the previous tournament must be gone, not to be parsed under this url
+                if (self._wait_for_events(page, f"{selector}:not([data-stale])", timeout)
+                        and self._wait_for_events(page, f"{selector}[data-stale]", timeout, state="detached")):
+                    metrics.NAVIGATIONS.inc(bookmaker=self.logger.bookmaker, kind="in_app")
+                else:
+                    self.logger.debug_log("In-app navigation to %s failed, loading the page.", url)
+                    metrics.NAVIGATIONS.inc(bookmaker=self.logger.bookmaker, kind="full")
+                    page.goto(url, timeout=self.timeout)
+                    self._wait_for_events(page, selector, timeout)
+            return page.content()
+        except playwright_error.TimeoutError as te:
+            self._close_session()
+            raise TimeoutError(str(te))
+        except Exception as e:
+            self.logger.debug_log("Playwright error: %s", e)
+            self._close_session()
+            raise
+
+    def _open_session(self):
+        from playwright.sync_api import sync_playwright
+
+        playwright = sync_playwright().start()
+        browser = playwright.chromium.launch(headless=not self.debug, args=["--no-sandbox"])
+        context = browser.new_context(
+            user_agent=self.USER_AGENT,
+            viewport={"width": 800, "height": 500},
+            locale="fr-FR",
+            timezone_id="Europe/Paris",
+        )
+        self.session = {"playwright": playwright, "browser": browser, "page": context.new_page()}
+        return self.session["page"]
+
+    def _close_session(self):
+        # in the navigator thread only
+        session, self.session = self.session, None
+        if session is None:
+            return
+        for close in (session["browser"].close, session["playwright"].stop):
+            try:
+                close()
+            except Exception as e:
+                self.logger.debug_log("Error closing the browser: %s", e)
+
+    def _wait_for_events(self, page, selector: str, timeout: float, state: str = "visible") -> bool:
+        """
+        Waits for the events to be rendered (or to be detached), then for 'settle_time' ms (default 500)
+        so that the whole list is there.
+
+        :return: False if no event showed up before the timeout (also the case of an empty tournament).
+        """
+        import playwright._impl._errors as playwright_error
+
+        try:
+            page.wait_for_selector(selector, timeout=timeout, state=state)
+        except playwright_error.TimeoutError:
+            return False
+        if state == "visible":
+            page.wait_for_timeout(self.navigation.get("settle_time", 500))
+        return True
+
+    def close(self):
+        """
+        Closes the page kept open for the in-app navigation (in its navigator thread) and the http client.
+        """
+        with self.navigator_lock:
+            navigator, self.navigator = self.navigator, None
+            if navigator is not None:
+                navigator[1].put(None)
+        if navigator is not None:
+            atexit.unregister(self.close)
+            thread = navigator[0]
+            if thread is not threading.current_thread():
+                thread.join(timeout=self.timeout / 1000)
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
+
     def _perform_actions(self, page, actions: list):
         """
         Performs a sequence of actions on the page.
@@ -131,36 +399,43 @@ class WebDriver:
         for index, action in enumerate(actions, start=1):
             try:
                 if "click_on" in action:
-                    self.logger.debug_log(f"Action {index}: Clicking on '{action['click_on']}'")
+                    self.logger.debug_log("Action %s: Clicking on '%s'", index, action['click_on'])
                     # page.click(f"text={action['click_on']}")
                     page.click(action['click_on'])
                 elif "click_mouse" in action:
-                    self.logger.debug_log(f"Action {index}: Mouse Clicking at '{action['click_mouse']}'")
+                    self.logger.debug_log("Action %s: Mouse Clicking at '%s'", index, action['click_mouse'])
                     page.mouse.click(*action["click_mouse"])
                 elif "wait_for_selector" in action:
-                    self.logger.debug_log(f"Action {index}: Waiting for selector '{action['wait_for_selector']}'")
+                    self.logger.debug_log("Action %s: Waiting for selector '%s'", index, action['wait_for_selector'])
                     page.wait_for_selector(action["wait_for_selector"])
                 elif "reload" in action:
-                    self.logger.debug_log(f"Action {index}: Reloading the page")
+                    self.logger.debug_log("Action %s: Reloading the page", index)
                     page.reload()
                 elif "scroll_down" in action:
-                    self.logger.debug_log(f"Action {index}: scroll to the bottom of the page")
+                    self.logger.debug_log("Action %s: scroll to the bottom of the page", index)
                     scroll_to_bottom(page, delay=action["scroll_down"])
                 elif "screen_shot" in action:
-                    self.logger.debug_log(f"Action {index}: take a screen shot of the page")
+                    self.logger.debug_log("Action %s: take a screen shot of the page", index)
                     page.screenshot(path=f"{action['screen_shot']}{time.time()}.png", full_page=True)
                 else:
                     raise ValueError(f"Unknown action type in action {index}: {action}")
                 page.wait_for_timeout(2000)
             except KeyError as e:
-                self.logger.debug_log(f"KeyError in action {index}: {e}")
+                self.logger.debug_log("KeyError in action %s: %s", index, e)
                 raise
             except Exception as e:
-                self.logger.debug_log(f"Error in action {index}: {e}")
+                self.logger.debug_log("Error in action %s: %s", index, e)
                 raise
         page.wait_for_timeout(2000)
 
 
+def page_url_is(page, url: str) -> bool:
+    """
+    Returns True if the page is at the url (ignoring a trailing slash).
+    """
+    return page.url.rstrip("/") == url.rstrip("/")
+
+
 def scroll_to_bottom(page, scroll_step=300, delay=0.1):
     """
     Scrolls to the bottom of the page.
@@ -170,7 +445,6 @@ def scroll_to_bottom(page, scroll_step=300, delay=0.1):
     :param delay: Delay in seconds between scroll steps. Default is 0.1 seconds.
     """
     # print("Scrolling to the bottom of the page...")
-    save_html("scroll_down.html", page.content())
     previous_height = page.evaluate("document.body.scrollHeight")
 
     while True:
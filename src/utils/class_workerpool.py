@@ -0,0 +1,180 @@
+import time
+import queue
+import multiprocessing
+from utils.loaders import load_json
+from utils.class_logger import Logger
+
+
+def get_catalogue(config: dict, bookmaker: str, sport: str = None) -> list:
+    """
+    Returns the tournaments of the url catalogue of a bookmaker.
+
+    :param config: The bookmaker configuration.
+    :param bookmaker: The bookmaker name.
+    :param sport: Optional sport name to keep only its tournaments.
+    :return: [(keys, url)] with keys = {"sport", "category", "tournament"}.
+    """
+    tournaments = []
+    dict_urls = load_json(config["bookmakers"][bookmaker]["url_path"])
+    for sport_name in dict_urls.keys():
+        if sport is not None and sport_name != sport:
+            continue
+        for category_name in dict_urls[sport_name].keys():
+            for tournament_name, url in dict_urls[sport_name][category_name].items():
+                keys = {"sport": sport_name, "category": category_name, "tournament": tournament_name}
+                tournaments.append((keys, url))
+    return tournaments
+
+
+def _scrape_worker(worker_id: str, generation: int, scraper_class, config: dict, tournaments: list, results,
+                   debug: bool):
+    """
+    Runs in its own process: scrapes its tournaments with its own browser and pushes the
+    events to the results queue.
+
+    Messages: ("events", worker_id, generation, url, events) after each tournament,
+    ("finished", worker_id, generation, None, None) at the end. The generation is the start number of
+    the worker, so that the messages of a previous process of the same worker can be told apart.
+    """
+    scraper = scraper_class(config, debug=debug)
+    try:
+        for keys, url in tournaments:
+            events = scraper.extract_event_data(keys, url)
+            results.put(("events", worker_id, generation, url, events))
+    finally:
+        scraper.close()
+    results.put(("finished", worker_id, generation, None, None))
+
+
+class WorkerPool:
+    """
+    Scrapes the url catalogues with one process per shard of the tournaments of a bookmaker.
+
+    The workers push their events to a single queue read by the parent process, which is the only
+    writer (on_events). A supervisor loop restarts the workers that died, with the tournaments
+    they did not report yet, so that a crashed browser does not stop the run.
+    """
+
+    def __init__(self, config: dict, scraper_classes: dict, on_events=None, shards: int = 1,
+                 max_restarts: int = 3, debug: bool = False):
+        """
+        :param config: The bookmaker configuration.
+        :param scraper_classes: {bookmaker name: EventScraper subclass}.
+        :param on_events: Callback on_events(bookmaker, url, events) called in the parent process, with the
+            EventBatch of each tournament.
+        :param shards: Number of worker processes per bookmaker.
+        :param max_restarts: Maximum number of restarts of a worker.
+        :param debug: Enable or disable debug logging.
+        """
+        self.config = config
+        self.scraper_classes = scraper_classes
+        self.on_events = on_events
+        self.shards = shards
+        self.max_restarts = max_restarts
+        self.debug = debug
+        self.logger = Logger("WorkerPool", debug)
+
+        # spawn: every worker starts a clean interpreter, without the browser state of the parent
+        self.context = multiprocessing.get_context("spawn")
+        self.results = self.context.Queue()
+        # worker_id: {"bookmaker", "tournaments", "done", "process", "generation", "restarts", "finished"}
+        self.workers = {}
+
+    def _start(self, worker_id: str):
+        worker = self.workers[worker_id]
+        remaining = [(keys, url) for keys, url in worker["tournaments"] if url not in worker["done"]]
+        worker["generation"] += 1
+        worker["process"] = self.context.Process(
+            target=_scrape_worker, name=worker_id, daemon=True,
+            args=(worker_id, worker["generation"], self.scraper_classes[worker["bookmaker"]], self.config, remaining,
+                  self.results, self.debug))
+        worker["process"].start()
+        self.logger.info_log("Worker %s started with %s tournaments.", worker_id, len(remaining))
+
+    def _handle(self, message: tuple):
+        kind, worker_id, generation, url, events = message
+        worker = self.workers[worker_id]
+        if generation != worker["generation"]:
+            # late message of a previous process of the worker
+            self.logger.debug_log("Message of %s generation %s ignored.", worker_id, generation)
+            return
+        if kind == "finished":
+            worker["finished"] = True
+            return
+
+        worker["done"].add(url)
+        if self.on_events:
+            try:
+                self.on_events(worker["bookmaker"], url, events)
+            except Exception as e:
+                self.logger.error_log(f"Error while storing the events of {url}: {e}")
+
+    def _drain(self):
+        while True:
+            try:
+                self._handle(self.results.get_nowait())
+            except queue.Empty:
+                return
+
+    def _supervise(self):
+        """
+        Restarts the workers that died before finishing.
+        """
+        for worker_id, worker in self.workers.items():
+            process = worker["process"]
+            if worker["finished"] or process is None or process.is_alive():
+                continue
+            if process.exitcode == 0:
+                # exited normally after the last drain: its last messages are still in the queue
+                self._drain()
+                worker["finished"] = True
+                continue
+
+            if worker["restarts"] >= self.max_restarts:
+                self.logger.error_log(f"Worker {worker_id} died (exit code {process.exitcode}), "
+                                      f"{len(worker['tournaments']) - len(worker['done'])} tournaments abandoned.")
+                worker["finished"] = True
+                continue
+
+            worker["restarts"] += 1
+            self.logger.error_log(f"Worker {worker_id} died (exit code {process.exitcode}), "
+                                  f"restart {worker['restarts']}/{self.max_restarts}.")
+            self._start(worker_id)
+
+    def run(self, sport: str = None, poll_interval: float = 1.0) -> dict:
+        """
+        Scrapes the tournaments of all the bookmakers and waits for the end of the workers.
+
+        :param sport: Optional sport name to scrape only its tournaments.
+        :param poll_interval: Seconds between two checks of the workers.
+        :return: {bookmaker: number of tournaments scraped}.
+        """
+        for bookmaker in self.scraper_classes:
+            tournaments = get_catalogue(self.config, bookmaker, sport)
+            for shard in range(min(self.shards, len(tournaments))):
+                worker_id = f"{bookmaker}-{shard}"
+                self.workers[worker_id] = {"bookmaker": bookmaker, "tournaments": tournaments[shard::self.shards],
+                                           "done": set(), "process": None, "generation": 0, "restarts": 0,
+                                           "finished": False}
+                self._start(worker_id)
+
+        start_time = time.time()
+        while not all(worker["finished"] for worker in self.workers.values()):
+            try:
+                self._handle(self.results.get(timeout=poll_interval))
+            except queue.Empty:
+                pass
+            # read the messages sent just before a crash, not to scrape these tournaments again
+            self._drain()
+            self._supervise()
+        self._drain()
+
+        for worker in self.workers.values():
+            worker["process"].join(timeout=5)
+
+        summary = {}
+        for worker in self.workers.values():
+            summary[worker["bookmaker"]] = summary.get(worker["bookmaker"], 0) + len(worker["done"])
+        self.logger.info_log("%s tournaments scraped in %.0f s: %s", sum(summary.values()), time.time() - start_time,
+                             summary)
+        return summary
@@ -2,6 +2,7 @@ import pandas as pd
 
 from utils.class_databasemanager import DatabaseManager
 from utils.loaders import load_yaml
+from utils.class_logger import traced
 from itertools import product, combinations, permutations
 
 
@@ -15,16 +16,32 @@ def calc_esperance(odd_1: float, odd_N: float, odd_2: float) -> float:
     return e
 
 
-def find_arbitrage(df: pd.DataFrame):
+@traced("detect")
+def find_arbitrage(df: pd.DataFrame, max_skew: float = None):
+    """
+    :param df: The database.
+    :param max_skew: If set, only compare the odds of the latest snapshot of each game (see SnapshotSweep),
+        and only if the pages of the game were fetched within 'max_skew' seconds. The rows out of a snapshot
+        are ignored.
+    """
+
+    if max_skew is not None and "snapshot_id" in df.columns:
+        df = df[df["snapshot_id"].notna()]
+        game = ["Date", "Home Team Std", "Away Team Std"]
+        latest_snapshot = df.groupby(game, observed=True)["snapshot_id"].transform("max")
+        df = df[df["snapshot_id"] == latest_snapshot]
+        # skew of a game: spread of the fetch times of its legs in the snapshot
+        offsets = df.groupby(game, observed=True)["snapshot_offset"]
+        df = df[offsets.transform("max") - offsets.transform("min") <= max_skew]
 
     # Sort by Game ID, Bookmaker, and Timestamp (most recent first)
     df_sorted = df.sort_values(by="scrapping_time", ascending=False)
     # Group by unique game details and then take the first row for each bookmaker
-    df_grouped = df_sorted.groupby(["Date", "Home Team Std", "Away Team Std", "Bookmaker"]).first()
+    df_grouped = df_sorted.groupby(["Date", "Home Team Std", "Away Team Std", "Bookmaker"], observed=True).first()
     # print(df_group_game.to_string())        # Debug
 
     # Group by unique game details (excluding Bookmaker) to organize odds
-    for _, events in df_grouped.groupby(["Date", "Home Team Std", "Away Team Std"]):
+    for _, events in df_grouped.groupby(["Date", "Home Team Std", "Away Team Std"], observed=True):
         """
             Example structure of events:
             Date       Home Team Std           Away Team Std          Bookmaker                                                                 
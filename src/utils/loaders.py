@@ -1,10 +1,8 @@
 import json
 import yaml
 import pickle
-from bs4 import BeautifulSoup
 from typing import List, Dict, Any
 import logging
-import pandas
 
 
 # Set up logging
@@ -12,7 +10,7 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def save_html(path: str, soup: BeautifulSoup):
+def save_html(path: str, soup: "BeautifulSoup"):
     """
     Save a BeautifulSoup object to a file using pickle.
 
@@ -28,7 +26,7 @@ def save_html(path: str, soup: BeautifulSoup):
         raise
 
 
-def load_html(path: str) -> BeautifulSoup:
+def load_html(path: str) -> "BeautifulSoup":
     """
     Load a BeautifulSoup object from a file.
 
@@ -149,9 +147,14 @@ def save_json(file_path: str, data: Dict[str, Any], mode: str = "w"):
         raise
 
 
-def load_pandas(path: str) -> pandas.DataFrame:
+def load_pandas(path: str, **kwargs) -> "pandas.DataFrame":
+    """
+    :param kwargs: Passed to pandas.read_csv (dtype, ...).
+    """
+    import pandas   # imported on use: pandas alone doubles the start time of the commands without data
+
     try:
-        data = pandas.read_csv(path)
+        data = pandas.read_csv(path, **kwargs)
         logger.info(f"DataFrame successfully loaded from '{path}'")
         return data
     except FileNotFoundError:
@@ -162,9 +165,12 @@ def load_pandas(path: str) -> pandas.DataFrame:
         raise
 
 
-def save_pandas(data: pandas.DataFrame, path: str):
+def save_pandas(data: "pandas.DataFrame", path: str, **kwargs):
+    """
+    :param kwargs: Passed to DataFrame.to_csv (date_format, ...).
+    """
     try:
-        data.to_csv(path, index=False)
+        data.to_csv(path, index=False, **kwargs)
         logger.info(f"Pandas file saved successfully to '{path}'.")
     except Exception as e:
         logger.error(f"Failed to save Pandas file to '{path}': {e}")
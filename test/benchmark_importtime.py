@@ -0,0 +1,102 @@
+"""
+Start time of the command line subcommands.
+
+Each subcommand is run with '-X importtime' and '--import-only': it imports the modules it needs
+and exits. The import time, the overhead over a bare interpreter start measured in the same run and
+the heaviest modules are reported. The check is on the heavy dependencies a subcommand imports: one
+that the recorded baseline did not import fails (the times depend on the machine).
+
+Usage (from the repository root):
+    python test/benchmark_importtime.py             # check against the baseline
+    python test/benchmark_importtime.py --update    # record a new baseline
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from utils.loaders import load_json, save_json
+
+
+BASELINE_PATH = os.path.join(TEST_DIR, "benchmark_results", "importtime_baseline.json")
+COMMANDS = ["scrape", "discover", "standardise", "match", "detect"]
+# the dependencies whose import is worth keeping out of a subcommand
+HEAVY_MODULES = ["bs4", "httpx", "joblib", "lxml", "matplotlib", "numpy", "pandas", "playwright", "requests",
+                 "scipy", "selenium", "sentence_transformers", "sklearn", "torch"]
+
+
+def measure(arguments: list) -> tuple:
+    """
+    Runs the interpreter with '-X importtime' and the given arguments.
+
+    :return: (wall time in ms, import time in ms, {module: cumulative import time in ms} of the top level imports,
+        set of the heavy modules imported).
+    """
+    start_time = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=ROOT_DIR, capture_output=True,
+                             text=True)
+    wall_time = 1000 * (time.perf_counter() - start_time)
+    if process.returncode != 0:
+        raise RuntimeError(f"[ERROR] {arguments} failed:\n{process.stderr[-2000:]}")
+
+    modules = {}
+    heavy = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        if package in HEAVY_MODULES:
+            heavy.add(package)
+        # the top level imports are not indented
+        if not name.startswith("  "):
+            modules[name.strip()] = int(cumulative) / 1000
+    return wall_time, sum(modules.values()), modules, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start time of the command line subcommands.")
+    parser.add_argument("--update", action="store_true", help="record a new baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per subcommand")
+    args = parser.parse_args()
+
+    baseline = load_json(BASELINE_PATH) if os.path.exists(BASELINE_PATH) else {}
+    # reference of this machine: the start of a bare interpreter
+    startup_time = statistics.median(measure(["-c", "pass"])[0] for _ in range(args.repeat))
+    print(f"{'startup':<12} wall {startup_time:7.1f} ms")
+
+    failures = []
+    results = {}
+    for command in COMMANDS:
+        runs = [measure([os.path.join("src", "cli.py"), "--import-only", command]) for _ in range(args.repeat)]
+        wall_time = statistics.median(run[0] for run in runs)
+        import_time = statistics.median(run[1] for run in runs)
+        heaviest = sorted(runs[-1][2].items(), key=lambda item: item[1], reverse=True)[:3]
+        heavy = sorted(runs[-1][3])
+        results[command] = {"wall": round(wall_time, 1), "import": round(import_time, 1), "heavy": heavy}
+        print(f"{command:<12} wall {wall_time:7.1f} ms   overhead {wall_time - startup_time:7.1f} ms   "
+              f"import {import_time:7.1f} ms   " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in heaviest))
+
+        reference = baseline.get(command, {}).get("heavy")
+        added = sorted(set(heavy) - set(reference)) if reference is not None else []
+        if added:
+            failures.append(f"{command}: now imports {', '.join(added)}")
+
+    if args.update:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        save_json(BASELINE_PATH, results)
+        return
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
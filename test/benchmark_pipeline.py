@@ -0,0 +1,191 @@
+"""
+End-to-end pipeline benchmark on synthetic databases.
+
+Times each stage of the pipeline (database load, add_instance, add_batch, team name mapping, event
+grouping and arbitrage detection) on synthetic databases of increasing size, and reports the
+throughput, the peak memory (tracemalloc) and the scaling exponent between two sizes. The
+results are stored in 'test/benchmark_results/' to be compared over time.
+
+Usage (from the repository root):
+    python test/benchmark_pipeline.py
+    python test/benchmark_pipeline.py --sizes 10000 100000 --stages load mapper find_arbitrage
+"""
+import io
+import os
+import sys
+import math
+import time
+import json
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from utils.loaders import load_yaml
+from utils.class_databasemanager import DatabaseManager
+from utils.class_mapper import Mapper
+from utils.class_eventbatch import EventBatch
+from synthetic_database import generate
+
+
+RESULTS_DIR = os.path.join(TEST_DIR, "benchmark_results")
+MAPPING_PATH = os.path.join(ROOT_DIR, "data", "mapping.yml")
+
+
+def stage_load(context: dict) -> int:
+    context["db"] = DatabaseManager(context["path"])
+    return len(context["db"].data.index)
+
+
+def stage_add_instance(context: dict) -> int:
+    # add_instance is called once per scraped event
+    db = context["db"]
+    rows = db.data.head(context["add_rows"]).to_dict("records")
+    for row in rows:
+        db.add_instance(row)
+    # the added rows are appended when the data is read
+    return len(db.data.index) and len(rows)
+
+
+def stage_add_batch(context: dict) -> int:
+    # add_batch is called once per scraped page, here pages of 50 events
+    db = context["db"]
+    rows = db.data.head(context["add_rows"]).astype(object).to_dict("records")
+    for start in range(0, len(rows), 50):
+        batch = EventBatch(rows[start]["Bookmaker"], {"sport": rows[start]["Sport Unparse"],
+                                                      "category": rows[start]["Category Unparse"],
+                                                      "tournament": rows[start]["Tournament Unparse"]},
+                           rows[start]["url"])
+        for row in rows[start:start + 50]:
+            batch.append(row["Home Team Unparse"], row["Away Team Unparse"], row["Home Odd"], row["Draw Odd"],
+                         row["Away Odd"], row["Date Unparse"])
+        db.add_batch(batch)
+    return len(db.data.index) and len(rows)
+
+
+def stage_mapper(context: dict) -> int:
+    mapper = context["mapper"]
+    nb_names = 0
+    for column in ["Home Team Unparse", "Away Team Unparse"]:
+        for team_name in context["db"].data[column]:
+            try:
+                mapper.map_team_name("NHL", team_name)
+            except ValueError:
+                pass
+            nb_names += 1
+    return nb_names
+
+
+def stage_group_events(context: dict) -> int:
+    from standardisation import group_events
+    data = context["db"].data.head(context["group_rows"])
+    group_events(data, nb_bookmakers=3, n_jobs=context["n_jobs"])
+    return len(data.index)
+
+
+def stage_find_arbitrage(context: dict) -> int:
+    from utils.function_esperance import find_arbitrage
+    find_arbitrage(context["db"].data)
+    return len(context["db"].data.index)
+
+
+STAGES = {
+    "load": stage_load,
+    "add_instance": stage_add_instance,
+    "add_batch": stage_add_batch,
+    "mapper": stage_mapper,
+    "group_events": stage_group_events,
+    "find_arbitrage": stage_find_arbitrage,
+}
+
+
+def run_stage(stage, context: dict) -> dict:
+    """
+    Runs a stage with its output silenced.
+
+    :return: {"rows", "seconds", "rows_per_second", "peak_memory_mb"}.
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        nb_rows = stage(context)
+    seconds = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rows": nb_rows,
+        "seconds": seconds,
+        "rows_per_second": nb_rows / seconds if seconds else float("inf"),
+        "peak_memory_mb": peak / 2 ** 20,
+        # footprint of the loaded database (deep)
+        "data_memory_mb": context["db"].get_memory_report().loc["Total", "MB"] if "db" in context else float("nan"),
+    }
+
+
+def scaling_exponent(a: dict, b: dict) -> float:
+    """
+    Returns k such that time ~ rows^k between two measures (1 is linear).
+    """
+    if a["rows"] == b["rows"] or not a["seconds"] or not b["seconds"]:
+        return float("nan")
+    return math.log(b["seconds"] / a["seconds"]) / math.log(b["rows"] / a["rows"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic databases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--stages", nargs="+", default=list(STAGES.keys()), choices=list(STAGES.keys()))
+    parser.add_argument("--add-rows", type=int, default=1000, help="rows added one by one with add_instance")
+    parser.add_argument("--group-rows", type=int, default=1000, help="maximum rows given to group_events")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="worker processes of group_events")
+    args = parser.parse_args()
+
+    mapping = load_yaml(MAPPING_PATH)
+    mapper = Mapper(MAPPING_PATH)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            path = os.path.join(tmp_dir, f"synthetic_{size}.csv")
+            generate(size, mapping).to_csv(path, index=False)
+
+            context = {"path": path, "mapper": mapper, "add_rows": args.add_rows,
+                       "group_rows": args.group_rows, "n_jobs": args.n_jobs}
+            # the other stages work on the loaded database
+            stages = ["load"] + [stage for stage in args.stages if stage != "load"]
+            for stage in stages:
+                results.setdefault(stage, {})[size] = run_stage(STAGES[stage], context)
+
+    print(f"{'stage':<16}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}{'data MB':>10}{'scaling':>9}")
+    for stage, measures in results.items():
+        previous = None
+        for size, measure in measures.items():
+            scaling = scaling_exponent(previous, measure) if previous else float("nan")
+            print(f"{stage:<16}{measure['rows']:>10}{measure['seconds']:>10.3f}{measure['rows_per_second']:>12.0f}"
+                  f"{measure['peak_memory_mb']:>10.1f}{measure['data_memory_mb']:>10.1f}{scaling:>9.2f}")
+            measure["scaling"] = scaling
+            previous = measure
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    now = datetime.datetime.now()
+    path = os.path.join(RESULTS_DIR, f"pipeline_{now:%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, f, indent=4, allow_nan=True)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local mock of the schedule API and benchmark of the schedule refresh.
+
+The mock serves a game week for any '/<league>/<YYYY-MM-DD>/' url, built from the captured week
+test/2024-12-12.json, with ETag and Last-Modified headers and an artificial network latency.
+The benchmark refreshes a full season of several leagues: serially without cache, concurrently
+without cache, then concurrently with the warm cache (304 responses).
+
+Usage (from the repository root):
+    python test/mock_schedule_api.py
+    python test/mock_schedule_api.py --leagues 4 --latency 0.1
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from utils.class_scheduler import refresh_schedules
+
+
+TEMPLATE_PATH = os.path.join(TEST_DIR, "2024-12-12.json")
+LAST_MODIFIED = "Thu, 12 Dec 2024 00:00:00 GMT"
+
+
+def build_week(template: dict, league: str, date: str) -> dict:
+    """
+    Returns the game week starting at 'date': the days of the template week with shifted dates.
+    """
+    start = datetime.datetime.strptime(date, "%Y-%m-%d").date()
+    template_start = datetime.datetime.strptime(template["gameWeek"][0]["date"], "%Y-%m-%d").date()
+    game_week = []
+    for day in template["gameWeek"]:
+        offset = datetime.datetime.strptime(day["date"], "%Y-%m-%d").date() - template_start
+        day_date = start + offset
+        games = []
+        for game in day["games"]:
+            game = dict(game)
+            game["startTimeUTC"] = f"{day_date + datetime.timedelta(days=1)}{game['startTimeUTC'][10:]}"
+            games.append(game)
+        game_week.append({"date": str(day_date), "games": games})
+    return {"league": league, "nextStartDate": str(start + datetime.timedelta(days=7)), "gameWeek": game_week}
+
+
+class MockScheduleAPI:
+    """
+    Serves the mock schedule API from a local HTTP server in a background thread.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        with open(TEMPLATE_PATH, "r", encoding="utf-8") as f:
+            template = json.load(f)
+        counters = {"200": 0, "304": 0}
+        self.counters = counters
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, as the real API
+
+            def do_GET(self):
+                time.sleep(latency)
+                try:
+                    league, date = self.path.strip("/").split("/")
+                    body = json.dumps(build_week(template, league, date)).encode("utf-8")
+                except ValueError:
+                    self.send_error(404)
+                    return
+
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with lock:
+                        counters["304"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                with lock:
+                    counters["200"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # the default listen backlog (5) would drop the connections of the concurrent requests
+        ThreadingHTTPServer.request_queue_size = 128
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_url(self, league: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{league}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the schedule refresh against a mock API.")
+    parser.add_argument("--leagues", type=int, default=3, help="Number of leagues to refresh.")
+    parser.add_argument("--start", default="2024-10-01", help="First date of the season.")
+    parser.add_argument("--end", default="2025-04-30", help="Last date of the season.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of latency of the mock API.")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent requests of the concurrent runs.")
+    args = parser.parse_args()
+
+    with MockScheduleAPI(args.latency) as api, tempfile.TemporaryDirectory() as tmp:
+        leagues = {f"league{i}": {"url_base": api.get_url(f"league{i}"),
+                                  "schedule_path": os.path.join(tmp, f"schedule_league{i}.csv")}
+                   for i in range(args.leagues)}
+
+        runs = [("serial, no cache", 1, None), ("concurrent, no cache", args.workers, os.path.join(tmp, "cache")),
+                ("concurrent, warm cache", args.workers, os.path.join(tmp, "cache"))]
+        for name, max_workers, cache_dir in runs:
+            api.counters.update({"200": 0, "304": 0})
+            start_time = time.perf_counter()
+            if max_workers == 1:
+                # one league and one week after the other, as the former fetcher
+                updates = {}
+                for league, settings in leagues.items():
+                    updates.update(refresh_schedules({league: settings}, args.start, args.end, cache_dir, 1))
+            else:
+                updates = refresh_schedules(leagues, args.start, args.end, cache_dir, max_workers)
+            print(f"{name:<24} {time.perf_counter() - start_time:6.2f} s   "
+                  f"200: {api.counters['200']:<4} 304: {api.counters['304']:<4} games updated: {sum(updates.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Offline replay harness and parsing benchmark.
+
+The captured pages of this directory are served by a local HTTP server, and each bookmaker
+scraper is run against them without going to the network. For each case the extracted records
+are compared with the expected ones, and the fetch, parse and extract times are compared with
+the recorded baseline.
+
+Usage (from the repository root):
+    python test/replay_harness.py               # check the records and the timings
+    python test/replay_harness.py --update      # record the expected records and a new baseline
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import threading
+import urllib.request
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from bs4 import BeautifulSoup
+from utils.loaders import load_yaml, load_json, save_json
+from utils.class_webdriver import WebDriver
+
+
+REPLAY_DIR = os.path.join(TEST_DIR, "replay")
+BASELINE_PATH = os.path.join(REPLAY_DIR, "benchmark_baseline.json")
+
+# Captured pages replayed through each scraper
+REPLAY_CASES = [
+    {
+        "name": "zebet_nhl",
+        "bookmaker": "Zebet",
+        "page": "zebet_nhl.html",
+        "keys": {"sport": "hockey-sur-glace", "category": "etats-unis", "tournament": "nhl"},
+    },
+]
+
+# Columns that depend on the time or the server of the replay
+VOLATILE_COLUMNS = ["scrapping_time", "url"]
+
+
+class ReplayServer:
+    """
+    Serves the captured pages from a local HTTP server in a background thread.
+    """
+
+    def __init__(self, directory: str = TEST_DIR):
+        handler = partial(QuietHandler, directory=directory)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_url(self, page: str) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{page}"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayWebDriver(WebDriver):
+    """
+    WebDriver reading the pages from the replay server with a plain HTTP request.
+    The fetch and parse times of the last call are kept for the benchmark.
+    """
+
+    def fetch_html(self, url: str, actions: list = None) -> BeautifulSoup:
+        start_time = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            html = response.read().decode("utf-8")
+        self.fetch_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        soup = BeautifulSoup(html, "html.parser")
+        self.parse_time = time.perf_counter() - start_time
+        return soup
+
+
+def get_scraper(config: dict, bookmaker: str):
+    if bookmaker == "Zebet":
+        from bookmakers.zebet import Zebet
+        return Zebet(config)
+    elif bookmaker == "Winamax":
+        from bookmakers.winamax import Winamax
+        return Winamax(config)
+    elif bookmaker == "Netbet":
+        from bookmakers.netbet import Netbet
+        return Netbet(config)
+    raise ValueError(f"[ERROR] Unknown bookmaker name: {bookmaker}")
+
+
+def run_case(config: dict, server: ReplayServer, case: dict, repeat: int) -> (list, dict):
+    """
+    Runs a scraper on a captured page 'repeat' times.
+
+    :return: (records, timings), the records of the last run and the median times in ms.
+    """
+    scraper = get_scraper(config, case["bookmaker"])
+    scraper.webdriver = ReplayWebDriver(config, scraper.logger, "replay", False, scraper.timeout)
+    url = server.get_url(case["page"])
+
+    timings = {"fetch": [], "parse": [], "extract": []}
+    records = []
+    for _ in range(repeat):
+        # every run must parse the page
+        scraper.change_detector.forget(url)
+
+        start_time = time.perf_counter()
+        records = scraper.extract_event_data(case["keys"], url)
+        total_time = time.perf_counter() - start_time
+
+        timings["fetch"].append(scraper.webdriver.fetch_time)
+        timings["parse"].append(scraper.webdriver.parse_time)
+        timings["extract"].append(total_time - scraper.webdriver.fetch_time - scraper.webdriver.parse_time)
+
+    records = [{k: v for k, v in record.to_dict().items() if k not in VOLATILE_COLUMNS} for record in records]
+    return records, {stage: 1000 * statistics.median(times) for stage, times in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the captured pages through the scrapers.")
+    parser.add_argument("--update", action="store_true", help="record the expected records and a new baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs per case")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown against the baseline")
+    parser.add_argument("--min-delta", type=float, default=10.0, help="slowdowns below this (ms) are noise")
+    args = parser.parse_args()
+
+    config = load_yaml(os.path.join(ROOT_DIR, "config", "bookmaker_config.yml"))
+    baseline = load_json(BASELINE_PATH) if os.path.exists(BASELINE_PATH) else {}
+
+    failures = []
+    results = {}
+    with ReplayServer() as server:
+        for case in REPLAY_CASES:
+            records, timings = run_case(config, server, case, args.repeat)
+            results[case["name"]] = timings
+            print(f"{case['name']:<20}{len(records):>5} records   " +
+                  "   ".join(f"{stage} {ms:8.2f} ms" for stage, ms in timings.items()))
+
+            expected_path = os.path.join(REPLAY_DIR, f"{case['name']}.expected.json")
+            if args.update:
+                save_json(expected_path, records)
+                continue
+
+            if records != load_json(expected_path):
+                failures.append(f"{case['name']}: extracted records differ from {expected_path}")
+
+            for stage, ms in timings.items():
+                reference = baseline.get(case["name"], {}).get(stage)
+                if reference is not None and ms > args.tolerance * reference and ms - reference > args.min_delta:
+                    failures.append(f"{case['name']}: {stage} took {ms:.2f} ms, baseline {reference:.2f} ms")
+
+    if args.update:
+        save_json(BASELINE_PATH, results)
+        return
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic odds database generator.
+
+Generates realistic odds records with the columns of 'data/database.csv': several bookmakers
+quoting the same games with their own margin and noise, team names written with the variations
+of 'data/mapping.yml' plus random noise (case, typos, abbreviations), and repeated scrapes.
+
+Usage (from the repository root):
+    python test/synthetic_database.py 100000 data/synthetic_100k.csv
+"""
+import os
+import sys
+import random
+import argparse
+import datetime
+import pandas as pd
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TEST_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from utils.loaders import load_yaml
+
+
+COLUMNS = [
+    "Bookmaker", "Date", "Home Team Unparse", "Away Team Unparse", "Home Odd", "Draw Odd", "Away Odd",
+    "scrapping_time", "Date Unparse", "Sport", "Home Team Std", "Away Team Std", "Sport Unparse",
+    "Category Unparse", "Tournament Unparse", "url", "Category",
+]
+
+BOOKMAKERS = {
+    # name: (margin, odds noise, url base)
+    "Zebet": (1.07, 0.03, "https://www.zebet.fr"),
+    "Winamax": (1.05, 0.02, "https://www.winamax.fr/paris-sportifs/sports"),
+    "Netbet": (1.06, 0.03, "https://www.netbet.fr"),
+    "Pmu": (1.08, 0.04, "https://parisportif.pmu.fr"),
+}
+
+
+def add_noise(name: str, rng: random.Random, noise: float) -> str:
+    """
+    Returns a noisy variation of a team name.
+    """
+    if rng.random() > noise:
+        return name
+
+    choice = rng.randrange(4)
+    if choice == 0:
+        return name.upper() if rng.random() < 0.5 else name.lower()
+    elif choice == 1 and len(name) > 3:
+        # typo: swap two letters
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    elif choice == 2:
+        # abbreviation of the first word
+        words = name.split()
+        return " ".join([words[0][:3].upper()] + words[1:]) if len(words) > 1 else name
+    return name.replace(" ", "-")
+
+
+def get_teams(mapping: dict, nb_extra_leagues: int) -> list:
+    """
+    Returns the leagues: [(sport, category, tournament, [(standard name, [variations])])].
+    The NHL of the mapping file is completed by generated leagues.
+    """
+    leagues = [("hockey", "etats unis", "NHL", [(std, variations or [std.split(" - ")[-1]])
+                                               for std, variations in mapping["teams"]["NHL"].items()])]
+    sports = list(mapping["sports"].keys())
+    categories = list(mapping["category"].keys())
+    rng = random.Random(0)
+    for i in range(nb_extra_leagues):
+        teams = [(f"T{i:03d}{j:02d} - Club {i} {j}", [f"Club {i} {j}", f"CLB {i}-{j}"]) for j in range(20)]
+        leagues.append((rng.choice(sports), rng.choice(categories), f"league {i}", teams))
+    return leagues
+
+
+def generate(nb_rows: int, mapping: dict, seed: int = 42, noise: float = 0.3, nb_scrapes: int = 3,
+             start_date: str = "2025-01-01") -> pd.DataFrame:
+    """
+    Generates a synthetic database.
+
+    :param nb_rows: Number of rows.
+    :param mapping: The mapping file content.
+    :param seed: Random seed.
+    :param noise: Probability to add noise to a team name.
+    :param nb_scrapes: Number of scrapes of each game by each bookmaker.
+    :param start_date: First game date.
+    :return: DataFrame with the columns of the database.
+    """
+    rng = random.Random(seed)
+    nb_games = max(nb_rows // (nb_scrapes * len(BOOKMAKERS)), 1)
+    leagues = get_teams(mapping, nb_extra_leagues=max(nb_games // 500, 1))
+    date_ref = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+
+    rows = []
+    while len(rows) < nb_rows:
+        sport, category, tournament, teams = rng.choice(leagues)
+        (home_std, home_variations), (away_std, away_variations) = rng.sample(teams, 2)
+        date = date_ref + datetime.timedelta(days=rng.randrange(120), hours=rng.randrange(24))
+
+        # true probabilities of the game
+        p_home = rng.uniform(0.2, 0.6)
+        p_draw = rng.uniform(0.1, 0.3) if sport != "tennis" else 0.0
+        p_away = 1 - p_home - p_draw
+
+        for bookmaker, (margin, odds_noise, url_base) in BOOKMAKERS.items():
+            home = add_noise(rng.choice(home_variations), rng, noise)
+            away = add_noise(rng.choice(away_variations), rng, noise)
+            for scrape in range(nb_scrapes):
+                scrapping_time = date - datetime.timedelta(hours=rng.randrange(1, 72), minutes=rng.randrange(60))
+
+                def odd(p):
+                    return round(1 / (p * margin) * rng.gauss(1, odds_noise), 2) if p else float("nan")
+
+                rows.append([
+                    bookmaker, date.strftime("%Y-%m-%d"), home, away, odd(p_home), odd(p_draw), odd(p_away),
+                    scrapping_time.strftime("%Y-%m-%d %H:%M:%S"), f"Le {date:%d/%m} à {date:%Hh%M}", sport,
+                    home_std, away_std, sport, category, tournament,
+                    f"{url_base}/{sport}/{category}/{tournament}".replace(" ", "-"), category,
+                ])
+                if len(rows) == nb_rows:
+                    break
+            if len(rows) == nb_rows:
+                break
+
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic odds database.")
+    parser.add_argument("nb_rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--noise", type=float, default=0.3)
+    args = parser.parse_args()
+
+    mapping = load_yaml(os.path.join(ROOT_DIR, "data", "mapping.yml"))
+    generate(args.nb_rows, mapping, seed=args.seed, noise=args.noise).to_csv(args.path, index=False)
+
+
+if __name__ == "__main__":
+    main()